@@ -0,0 +1,214 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from query import to_numeric
+
+# Configurações globais
+DEBUG = os.environ.get('MEUAGENDAMENTO_DEBUG') == '1'  # Ativar com MEUAGENDAMENTO_DEBUG=1 (nunca em produção)
+
+def debug_print(message):
+    """Função para imprimir mensagens de debug apenas quando DEBUG está ativado"""
+    if DEBUG:
+        print(f"[DEBUG] {message}")
+
+
+class GroupStats:
+    """Resultado do resumo: uma linha por grupo (ex.: plataforma) com quantidade e preços"""
+
+    def __init__(self, groups, counts, priced, minimum, mean, maximum):
+        self.groups = groups  # Nome de cada grupo
+        self.counts = counts  # Linhas do grupo dentro do filtro
+        self.priced = priced  # Linhas com preço válido
+        self.minimum = minimum
+        self.mean = mean
+        self.maximum = maximum
+
+    def rows(self):
+        """(grupo, quantidade, mínimo, média, máximo) dos grupos com ao menos uma linha no filtro"""
+        for i, group in enumerate(self.groups):
+            if self.counts[i]:
+                has_price = self.priced[i] > 0
+                yield (group, int(self.counts[i]),
+                       float(self.minimum[i]) if has_price else None,
+                       float(self.mean[i]) if has_price else None,
+                       float(self.maximum[i]) if has_price else None)
+
+
+class GroupSummary:
+    """
+    Quantidade, preço mínimo, médio e máximo por grupo para qualquer máscara de filtro.
+
+    Os códigos dos grupos (categorias) e a ordem das linhas por (grupo, preço) são
+    preparados uma vez por DataFrame. Cada resumo é então uma contagem com bincount e
+    a leitura das pontas de cada grupo na ordem já classificada: O(n) vetorizado, sem
+    groupby do pandas. A mesma máscara da chamada anterior devolve o resultado guardado.
+    """
+
+    def __init__(self, df, group_col, value_col):
+        self.df = df
+        codes, groups = pd.factorize(df[group_col].astype(str).str.strip(), sort=True)
+        self.groups = list(groups)
+        self.codes = codes
+        self.values = to_numeric(df[value_col])
+        valid = ~np.isnan(self.values)
+        # Linhas com preço, ordenadas por grupo e depois por preço (mínimo e máximo ficam nas pontas)
+        rows = np.flatnonzero(valid & (codes >= 0))
+        self.order = rows[np.lexsort((self.values[rows], codes[rows]))]
+        self._last_mask = None
+        self._last_result = None
+
+    def summarize(self, mask=None):
+        """Resumo das linhas selecionadas pela máscara (None = todas)"""
+        if mask is None:
+            mask = np.ones(len(self.codes), dtype=bool)
+        if self._last_mask is not None and np.array_equal(mask, self._last_mask):
+            return self._last_result
+
+        n_groups = len(self.groups)
+        selected = mask & (self.codes >= 0)
+        counts = np.bincount(self.codes[selected], minlength=n_groups)
+
+        rows = self.order[mask[self.order]]
+        group_codes = self.codes[rows]
+        values = self.values[rows]
+        priced = np.bincount(group_codes, minlength=n_groups)
+        sums = np.bincount(group_codes, weights=values, minlength=n_groups)
+        minimum = np.full(n_groups, np.nan)
+        maximum = np.full(n_groups, np.nan)
+        if len(rows):
+            # Início e fim de cada grupo na sequência ordenada
+            starts = np.flatnonzero(np.r_[True, group_codes[1:] != group_codes[:-1]])
+            ends = np.r_[starts[1:], len(rows)] - 1
+            minimum[group_codes[starts]] = values[starts]
+            maximum[group_codes[starts]] = values[ends]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = sums / priced
+
+        self._last_mask = mask.copy()
+        self._last_result = GroupStats(self.groups, counts, priced, minimum, mean, maximum)
+        return self._last_result
+
+
+class ProductComparison:
+    """
+    Plataforma mais barata de cada produto, com a diferença para a segunda mais barata.
+
+    Guarda uma tabela produto x plataforma com o menor preço de cada par (pivô) e, por
+    produto, o melhor preço, a melhor plataforma e a segunda opção. Consultas são leituras
+    diretas nesses vetores. Ao atualizar o catálogo, apenas os produtos afetados pela
+    diferença (FrameDiff) são recalculados.
+    """
+
+    def __init__(self, df, product_col, platform_col, value_col):
+        self.product_col = product_col
+        self.platform_col = platform_col
+        self.value_col = value_col
+        self._reset(df)
+
+    def _reset(self, df):
+        """Monta o pivô completo a partir do DataFrame"""
+        self.products = []
+        self.platforms = []
+        self.product_index = {}
+        self.platform_index = {}
+        self.prices = np.full((0, 0), np.nan)
+        self.best_price = np.empty(0)
+        self.best_platform = np.empty(0, dtype=np.int64)
+        self.second_price = np.empty(0)
+        self.second_platform = np.empty(0, dtype=np.int64)
+        self._bind(df)
+        self._fill(df, None)
+
+    def _bind(self, df):
+        """Associa a comparação ao DataFrame atual (produto de cada linha, para as máscaras)"""
+        self.df = df
+        self._row_products = df[self.product_col].astype(str)
+
+    def _fill(self, df, affected):
+        """Recalcula o pivô dos produtos afetados (None = todos) a partir das linhas do DataFrame"""
+        products = self._row_products
+        if affected is not None:
+            selected = products.isin(affected).to_numpy()
+            df, products = df[selected], products[selected]
+        grouped = pd.DataFrame({
+            'product': products.to_numpy(),
+            'platform': df[self.platform_col].astype(str).str.strip().to_numpy(),
+            'price': to_numeric(df[self.value_col]),
+        }).dropna(subset=['price']).groupby(['product', 'platform'], sort=False)['price'].min()
+
+        # Produtos e plataformas novos ganham linhas/colunas no pivô
+        for product in (affected if affected is not None else products.unique()):
+            if product not in self.product_index:
+                self.product_index[product] = len(self.products)
+                self.products.append(product)
+        for platform in grouped.index.get_level_values('platform').unique():
+            if platform not in self.platform_index:
+                self.platform_index[platform] = len(self.platforms)
+                self.platforms.append(platform)
+        shape = (len(self.products), len(self.platforms))
+        if self.prices.shape != shape:
+            prices = np.full(shape, np.nan)
+            prices[:self.prices.shape[0], :self.prices.shape[1]] = self.prices
+            self.prices = prices
+            for name in ('best_price', 'second_price'):
+                setattr(self, name, np.r_[getattr(self, name), np.full(shape[0] - len(getattr(self, name)), np.nan)])
+            for name in ('best_platform', 'second_platform'):
+                setattr(self, name, np.r_[getattr(self, name), np.full(shape[0] - len(getattr(self, name)), -1)])
+
+        rows = np.fromiter((self.product_index[p] for p in (affected if affected is not None else self.products)),
+                           dtype=np.int64)
+        self.prices[rows] = np.nan
+        if len(grouped):
+            product_rows = [self.product_index[p] for p in grouped.index.get_level_values('product')]
+            platform_cols = [self.platform_index[p] for p in grouped.index.get_level_values('platform')]
+            self.prices[product_rows, platform_cols] = grouped.to_numpy()
+        self._rank(rows)
+
+    def _rank(self, rows):
+        """Melhor e segunda melhor plataforma das linhas do pivô indicadas"""
+        if not len(rows) or not len(self.platforms):
+            return
+        # Ordem das plataformas por preço (NaN por último) em cada produto
+        order = np.argsort(self.prices[rows], axis=1, kind='stable')
+        ranked = np.take_along_axis(self.prices[rows], order, axis=1)
+        self.best_price[rows] = ranked[:, 0]
+        self.best_platform[rows] = np.where(np.isnan(ranked[:, 0]), -1, order[:, 0])
+        if ranked.shape[1] > 1:
+            self.second_price[rows] = ranked[:, 1]
+            self.second_platform[rows] = np.where(np.isnan(ranked[:, 1]), -1, order[:, 1])
+        else:
+            self.second_price[rows] = np.nan
+            self.second_platform[rows] = -1
+
+    def patch(self, df, diff):
+        """Atualiza para a nova versão do catálogo recalculando só os produtos com linhas alteradas"""
+        keys = diff.changed_keys if diff is not None and not diff.schema_changed else None
+        # Sem chaves PRODUTO/PLATAFORMA (linhas identificadas pela posição) não há como limitar o cálculo
+        if keys is None or not all(isinstance(key, tuple) for key in keys):
+            self._reset(df)
+            return
+        self._bind(df)
+        affected = sorted({str(key[0]) for key in keys})
+        debug_print(f"Comparação de preços: {len(affected)} produto(s) recalculado(s)")
+        if affected:
+            self._fill(df, affected)
+
+    def lookup(self, product):
+        """(melhor preço, plataforma, segunda plataforma, diferença) do produto, ou None"""
+        row = self.product_index.get(str(product))
+        if row is None or self.best_platform[row] < 0:
+            return None
+        second = self.second_platform[row]
+        return (float(self.best_price[row]), self.platforms[self.best_platform[row]],
+                self.platforms[second] if second >= 0 else None,
+                float(self.second_price[row] - self.best_price[row]) if second >= 0 else None)
+
+    def rows(self, mask=None):
+        """Comparação dos produtos presentes no filtro (todas as plataformas entram no preço)"""
+        products = self._row_products if mask is None else self._row_products[mask]
+        for product in products.unique():
+            result = self.lookup(product)
+            if result is not None:
+                yield (product.strip(), *result)
@@ -0,0 +1,297 @@
+import os
+import json
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+
+# Configurações globais
+DEBUG = os.environ.get('MEUAGENDAMENTO_DEBUG') == '1'  # Ativar com MEUAGENDAMENTO_DEBUG=1 (nunca em produção)
+
+# Limite de espaço do cache; acima dele os arquivos menos usados são removidos
+CACHE_QUOTA_BYTES = 200 * 1024 * 1024  # 200 MB
+
+# Nome do arquivo de índice com tamanho e último acesso de cada entrada
+INDEX_FILENAME = 'cache_index.json'
+
+def debug_print(message):
+    """Função para imprimir mensagens de debug apenas quando DEBUG está ativado"""
+    if DEBUG:
+        print(f"[DEBUG] {message}")
+
+
+def candidate_dirs():
+    """Diretórios possíveis para o cache, em ordem de preferência"""
+    dirs = []
+    # 0. Diretório definido pelo usuário (variável de ambiente)
+    if os.environ.get('MEUAGENDAMENTO_CACHE_DIR'):
+        dirs.append(os.environ['MEUAGENDAMENTO_CACHE_DIR'])
+    dirs.extend([
+        # 1. Diretório do usuário (persiste entre execuções e atualizações do aplicativo)
+        os.path.join(os.path.expanduser('~'), 'meuagendamentopro_files', 'cache'),
+        # 2. Diretório 'files' no mesmo diretório do script
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'files', 'cache'),
+        # 3. Diretório 'files' no diretório atual
+        os.path.join(os.getcwd(), 'files', 'cache'),
+        # 4. Diretório temporário do sistema
+        os.path.join(tempfile.gettempdir(), 'meuagendamentopro_cache'),
+    ])
+    return dirs
+
+
+def _is_writable(dir_path):
+    """Verifica (uma única vez) se é possível criar arquivos no diretório"""
+    try:
+        os.makedirs(dir_path, exist_ok=True)
+        fd, probe = tempfile.mkstemp(dir=dir_path, prefix='.probe-')
+        os.close(fd)
+        os.remove(probe)
+        return True
+    except Exception as e:
+        debug_print(f"Erro ao usar diretório {dir_path}: {str(e)}")
+        return False
+
+
+class CacheManager:
+    """
+    Diretório de cache único do aplicativo.
+
+    - A raiz gravável é resolvida uma vez e memorizada
+    - Gravações usam arquivo temporário + renomeação atômica (nunca há arquivo pela metade)
+    - Cada entrada tem tamanho e último acesso registrados em um índice persistente
+    - Acima da cota, as entradas menos usadas recentemente (LRU) são removidas
+    """
+
+    def __init__(self, root_dir=None, quota_bytes=CACHE_QUOTA_BYTES):
+        self._root = root_dir
+        self.quota_bytes = quota_bytes
+        self._lock = threading.RLock()
+        self._index = None
+
+    # ------------------------------------------------------------------
+    # Raiz e índice
+    # ------------------------------------------------------------------
+    @property
+    def root(self):
+        """Diretório raiz do cache (resolvido na primeira utilização)"""
+        with self._lock:
+            if self._root is None:
+                self._root = next((d for d in candidate_dirs() if _is_writable(d)), tempfile.gettempdir())
+                debug_print(f"Diretório de cache: {self._root}")
+            else:
+                os.makedirs(self._root, exist_ok=True)
+            return self._root
+
+    def path(self, name):
+        """Caminho completo de uma entrada do cache (existindo ou não)"""
+        return os.path.join(self.root, name)
+
+    def _load_index(self):
+        if self._index is not None:
+            return self._index
+        index_path = self.path(INDEX_FILENAME)
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                self._index = json.load(f)
+        except FileNotFoundError:
+            self._index = {}
+        except Exception as e:
+            debug_print(f"Índice do cache ilegível, reconstruindo: {str(e)}")
+            self._index = {}
+        self._reconcile()
+        return self._index
+
+    def _reconcile(self):
+        """Sincroniza o índice com os arquivos realmente presentes no disco"""
+        root = self.root
+        for name in list(self._index):
+            if not os.path.isfile(os.path.join(root, name)):
+                del self._index[name]
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                full = os.path.join(dirpath, filename)
+                name = os.path.relpath(full, root).replace(os.sep, '/')
+                # Downloads parciais (.part) não são entradas: viram uma ao terminar (commit_file)
+                if name == INDEX_FILENAME or filename.endswith(('.tmp', '.part', '.part.json')) \
+                        or filename.startswith('.probe-'):
+                    continue
+                if name not in self._index:
+                    stat = os.stat(full)
+                    self._index[name] = {'size': stat.st_size, 'last_access': stat.st_mtime, 'created': stat.st_mtime}
+
+    def _save_index(self):
+        try:
+            data = json.dumps(self._index, ensure_ascii=False).encode('utf-8')
+            self._atomic_replace(self.path(INDEX_FILENAME), data)
+        except Exception as e:
+            debug_print(f"Erro ao salvar índice do cache: {str(e)}")
+
+    def _record(self, name, size=None):
+        index = self._load_index()
+        now = time.time()
+        entry = index.setdefault(name, {'created': now})
+        entry['last_access'] = now
+        if size is not None:
+            entry['size'] = size
+        elif 'size' not in entry:
+            entry['size'] = os.path.getsize(self.path(name))
+
+    # ------------------------------------------------------------------
+    # Leitura e gravação
+    # ------------------------------------------------------------------
+    def _atomic_replace(self, final_path, data):
+        directory = os.path.dirname(final_path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, final_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @contextmanager
+    def atomic_writer(self, name):
+        """
+        Abre um arquivo temporário para gravação; ao sair do bloco sem erro ele
+        substitui a entrada de forma atômica. Em caso de erro, nada é alterado.
+        """
+        final_path = self.path(name)
+        directory = os.path.dirname(final_path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                yield f
+            with self._lock:
+                os.replace(temp_path, final_path)
+                self._record(name, os.path.getsize(final_path))
+                self._save_index()
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.evict(keep=(name,))
+
+    def write_bytes(self, name, content):
+        """Grava o conteúdo na entrada de forma atômica e retorna o caminho final"""
+        with self.atomic_writer(name) as f:
+            f.write(content)
+        return self.path(name)
+
+    def commit_file(self, name, source_path):
+        """Move um arquivo completo (ex.: download retomável) para a entrada, de forma atômica"""
+        final_path = self.path(name)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        with self._lock:
+            os.replace(source_path, final_path)
+            self._record(name, os.path.getsize(final_path))
+            self._save_index()
+        self.evict(keep=(name,))
+        return final_path
+
+    def read_bytes(self, name):
+        """Lê o conteúdo de uma entrada (ou None se não existir), registrando o acesso"""
+        file_path = self.get_path(name)
+        if file_path is None:
+            return None
+        with open(file_path, 'rb') as f:
+            return f.read()
+
+    def get_path(self, name):
+        """Retorna o caminho da entrada se ela existir, registrando o acesso"""
+        file_path = self.path(name)
+        if not os.path.isfile(file_path):
+            return None
+        self.touch(name)
+        return file_path
+
+    def touch(self, name):
+        """Atualiza o último acesso de uma entrada (a data de modificação do arquivo é preservada)"""
+        file_path = self.path(name)
+        if not os.path.isfile(file_path):
+            return
+        with self._lock:
+            self._record(name)
+            self._save_index()
+
+    def remove(self, name):
+        """Remove uma entrada do cache"""
+        with self._lock:
+            try:
+                os.remove(self.path(name))
+            except FileNotFoundError:
+                pass
+            self._load_index().pop(name, None)
+            self._save_index()
+
+    def entries(self):
+        """Retorna uma cópia do índice: {nome: {'size', 'last_access', 'created'}}"""
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._load_index().items()}
+
+    def total_size(self):
+        """Espaço ocupado pelas entradas do cache (em bytes)"""
+        return sum(entry.get('size', 0) for entry in self.entries().values())
+
+    def evict(self, quota_bytes=None, keep=()):
+        """
+        Remove as entradas menos usadas até o cache caber na cota.
+
+        Args:
+            quota_bytes: Cota a respeitar (padrão: a do gerenciador)
+            keep: Nomes que nunca devem ser removidos (ex.: o catálogo em uso)
+
+        Returns:
+            list: Nomes das entradas removidas
+        """
+        quota = self.quota_bytes if quota_bytes is None else quota_bytes
+        removed = []
+        with self._lock:
+            index = self._load_index()
+            total = sum(entry.get('size', 0) for entry in index.values())
+            if total <= quota:
+                return removed
+            for name, entry in sorted(index.items(), key=lambda item: item[1].get('last_access', 0)):
+                if total <= quota:
+                    break
+                if name in keep:
+                    continue
+                try:
+                    os.remove(self.path(name))
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    debug_print(f"Erro ao remover entrada {name} do cache: {str(e)}")
+                    continue
+                total -= entry.get('size', 0)
+                del index[name]
+                removed.append(name)
+            self._save_index()
+        if removed:
+            debug_print(f"Entradas removidas do cache (LRU): {removed}")
+        return removed
+
+    def clean_temp_files(self):
+        """Remove arquivos temporários esquecidos por gravações interrompidas"""
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith('.tmp'):
+                    try:
+                        os.remove(os.path.join(dirpath, filename))
+                    except Exception as e:
+                        debug_print(f"Erro ao remover temporário {filename}: {str(e)}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Retorna o gerenciador de cache compartilhado pelos módulos do aplicativo"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CacheManager()
+        return _cache
@@ -0,0 +1,146 @@
+import os
+import json
+import random
+import threading
+
+# Biblioteca opcional: sem ela o aplicativo continua apenas com a verificação periódica
+try:
+    import websocket
+    websocket_installed = True
+except ImportError:
+    websocket = None
+    websocket_installed = False
+
+from tracing import span
+
+# Configurações globais
+DEBUG = os.environ.get('MEUAGENDAMENTO_DEBUG') == '1'  # Ativar com MEUAGENDAMENTO_DEBUG=1 (nunca em produção)
+
+# Tipo do evento enviado pelo servidor quando files/dados.xlsx é alterado
+CATALOG_EVENT = 'catalog_updated'
+
+def debug_print(message):
+    """Função para imprimir mensagens de debug apenas quando DEBUG está ativado"""
+    if DEBUG:
+        print(f"[DEBUG] {message}")
+
+
+class CatalogNotifier:
+    """
+    Assina o WebSocket do servidor e avisa quando o catálogo de produtos muda.
+
+    Os callbacks são chamados na thread do assinante; quem usa a classe deve
+    repassá-los para a thread da interface (ex.: BackgroundScheduler.post).
+    """
+
+    def __init__(self, url, on_update, on_state=None, cookies=None,
+                 reconnect_min=2, reconnect_max=300, recv_timeout=60):
+        """
+        Args:
+            url: Endereço do WebSocket (ex.: ws://meuagendamentopro.com.br/ws)
+            on_update: Função chamada com (hash, versao) a cada evento de catálogo
+            on_state: Função chamada com True/False quando a conexão abre ou cai (opcional)
+            cookies: Dicionário de cookies da sessão autenticada (opcional)
+            reconnect_min: Espera inicial (segundos) antes de reconectar
+            reconnect_max: Espera máxima (segundos) entre tentativas
+            recv_timeout: Tempo máximo (segundos) de espera por mensagens antes de enviar ping
+        """
+        self.url = url
+        self.on_update = on_update
+        self.on_state = on_state
+        self.cookies = cookies or {}
+        self.reconnect_min = reconnect_min
+        self.reconnect_max = reconnect_max
+        self.recv_timeout = recv_timeout
+        self.connected = False
+        self.events_received = 0
+        self._stop = threading.Event()
+        self._ws = None
+        self._thread = None
+
+    @property
+    def available(self):
+        """Indica se a biblioteca websocket-client está instalada"""
+        return websocket_installed
+
+    def start(self):
+        """Inicia a assinatura em uma thread separada"""
+        if not websocket_installed:
+            debug_print("websocket-client não instalado; notificações de catálogo desativadas")
+            return False
+        if self._thread is not None and self._thread.is_alive():
+            return True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='catalog-notifier', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """Encerra a assinatura e fecha a conexão"""
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception as e:
+                debug_print(f"Erro ao fechar WebSocket: {str(e)}")
+
+    def _set_connected(self, connected):
+        if connected == self.connected:
+            return
+        self.connected = connected
+        if self.on_state is not None:
+            self.on_state(connected)
+
+    def _run(self):
+        delay = self.reconnect_min
+        while not self._stop.is_set():
+            try:
+                cookie = '; '.join(f"{k}={v}" for k, v in self.cookies.items()) or None
+                with span('ws_connect', url=self.url):
+                    self._ws = websocket.create_connection(self.url, timeout=10, cookie=cookie)
+                self._ws.settimeout(self.recv_timeout)
+                debug_print(f"Conectado ao WebSocket de catálogo: {self.url}")
+                self._set_connected(True)
+                delay = self.reconnect_min
+                self._listen()
+            except Exception as e:
+                if not self._stop.is_set():
+                    debug_print(f"Conexão com WebSocket de catálogo perdida: {str(e)}")
+            finally:
+                if self._ws is not None:
+                    try:
+                        self._ws.close()
+                    except Exception:
+                        pass
+                    self._ws = None
+                self._set_connected(False)
+
+            # Reconectar com backoff exponencial e variação aleatória
+            if self._stop.wait(delay * random.uniform(0.5, 1.5)):
+                break
+            delay = min(self.reconnect_max, delay * 2)
+
+    def _listen(self):
+        while not self._stop.is_set():
+            try:
+                message = self._ws.recv()
+            except websocket.WebSocketTimeoutException:
+                # Nenhuma mensagem no período: verificar se a conexão continua viva
+                self._ws.ping()
+                continue
+            if not message:
+                raise ConnectionError("Conexão encerrada pelo servidor")
+            self._handle_message(message)
+
+    def _handle_message(self, message):
+        try:
+            payload = json.loads(message)
+        except (TypeError, ValueError):
+            return
+        if not isinstance(payload, dict) or payload.get('type') != CATALOG_EVENT:
+            return
+        data = payload.get('data') or {}
+        self.events_received += 1
+        debug_print(f"Evento de catálogo recebido: {data}")
+        self.on_update(data.get('hash'), data.get('version'))
@@ -1,12 +1,16 @@
-import requests
 import pandas as pd
 import io
 import os
 import sys
 from tkinter import messagebox
 
+from tracing import span
+from cache_manager import get_cache
+from sheet_loader import load_catalog
+from http_transport import get_session
+
 # Configurações globais
-DEBUG = True  # Definir como False em produção
+DEBUG = os.environ.get('MEUAGENDAMENTO_DEBUG') == '1'  # Ativar com MEUAGENDAMENTO_DEBUG=1 (nunca em produção)
 
 def debug_print(message):
     """Função para imprimir mensagens de debug apenas quando DEBUG está ativado"""
@@ -17,7 +21,8 @@ class DataService:
     """Serviço para acessar dados do arquivo local ou do servidor"""
     
     def __init__(self, session=None, base_url='https://meuagendamentopro.com.br/api'):
-        self.session = session
+        # Sessão autenticada, ou a compartilhada do transporte (conexões e timeouts padronizados)
+        self.session = session or get_session()
         self.base_url = base_url
         
         # Obter o caminho base do aplicativo
@@ -26,12 +31,14 @@ class DataService:
         self.files_dir = os.path.join(self.app_path, 'files')
         debug_print(f"Diretório de arquivos: {self.files_dir}")
         
-    def get_data(self, filename='dados.xlsx'):
+    def get_data(self, filename='dados.xlsx', columns=None, exclude=()):
         """
         Obtém os dados do arquivo local ou do servidor.
         
         Args:
             filename: Nome do arquivo a ser acessado
+            columns: Colunas a carregar (None = todas); as demais ficam no cache para uso posterior
+            exclude: Colunas que não devem ser carregadas
             
         Returns:
             DataFrame: Dados do arquivo XLSX como DataFrame do pandas
@@ -40,23 +47,21 @@ class DataService:
         local_file_path = os.path.join(self.files_dir, filename)
         debug_print(f"Verificando arquivo local: {local_file_path}")
         
+        if not os.path.exists(local_file_path):
+            # Sem arquivo na pasta files: usar a cópia baixada anteriormente, se houver no cache
+            cached_file_path = get_cache().get_path(filename)
+            if cached_file_path:
+                debug_print(f"Usando arquivo do cache: {cached_file_path}")
+                local_file_path = cached_file_path
+        
         if os.path.exists(local_file_path):
             debug_print(f"Arquivo encontrado localmente: {local_file_path}")
             try:
-                # Tentar ler o arquivo com diferentes engines
-                try:
-                    df = pd.read_excel(local_file_path, engine='openpyxl')
-                    debug_print(f"Arquivo lido com sucesso usando openpyxl: {len(df)} registros")
-                    return df
-                except Exception as e:
-                    debug_print(f"Erro ao ler com openpyxl: {str(e)}")
-                    try:
-                        df = pd.read_excel(local_file_path, engine='xlrd')
-                        debug_print(f"Arquivo lido com sucesso usando xlrd: {len(df)} registros")
-                        return df
-                    except Exception as e2:
-                        debug_print(f"Erro ao ler com xlrd: {str(e2)}")
-                        raise Exception(f"Não foi possível ler o arquivo: {str(e2)}")
+                # Todas as abas são lidas (em paralelo); o leitor é escolhido pela assinatura do arquivo
+                with span('data_service', file=filename):
+                    df = load_catalog([local_file_path], columns, exclude)
+                debug_print(f"Arquivo lido com sucesso: {len(df)} registros")
+                return df
             except Exception as e:
                 debug_print(f"Erro ao ler arquivo local: {str(e)}")
                 # Se falhar localmente, criar dados básicos
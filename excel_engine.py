@@ -0,0 +1,127 @@
+import os
+import io
+
+import pandas as pd
+
+from tracing import span
+
+# Leitor opcional escrito em Rust (muito mais rápido que openpyxl); sem ele usamos openpyxl/xlrd
+try:
+    import python_calamine  # noqa: F401
+    calamine_installed = True
+except ImportError:
+    calamine_installed = False
+
+try:
+    import openpyxl  # noqa: F401
+    openpyxl_installed = True
+except ImportError:
+    openpyxl_installed = False
+
+try:
+    import xlrd  # noqa: F401
+    xlrd_installed = True
+except ImportError:
+    xlrd_installed = False
+
+# Configurações globais
+DEBUG = os.environ.get('MEUAGENDAMENTO_DEBUG') == '1'  # Ativar com MEUAGENDAMENTO_DEBUG=1 (nunca em produção)
+
+# Assinaturas dos formatos suportados
+XLSX_SIGNATURE = b'PK\x03\x04'  # Arquivo zip (OOXML: .xlsx)
+XLS_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'  # Documento OLE2 (Excel 97-2003: .xls)
+
+# Leitores preferidos para cada formato, do mais rápido ao mais lento
+ENGINE_PREFERENCE = {
+    'xlsx': ('calamine', 'openpyxl'),
+    'xls': ('calamine', 'xlrd'),
+}
+
+def debug_print(message):
+    """Função para imprimir mensagens de debug apenas quando DEBUG está ativado"""
+    if DEBUG:
+        print(f"[DEBUG] {message}")
+
+
+class ExcelFormatError(ValueError):
+    """O conteúdo não é um arquivo Excel reconhecido ou nenhum leitor conseguiu abri-lo"""
+
+
+def installed_engines():
+    """Leitores disponíveis nesta instalação"""
+    engines = []
+    if calamine_installed:
+        engines.append('calamine')
+    if openpyxl_installed:
+        engines.append('openpyxl')
+    if xlrd_installed:
+        engines.append('xlrd')
+    return engines
+
+
+def sniff_format(source):
+    """
+    Identifica o formato pela assinatura do arquivo, sem abri-lo com um leitor.
+
+    Args:
+        source: Caminho do arquivo ou conteúdo em bytes
+
+    Returns:
+        str: 'xlsx', 'xls' ou None (ex.: página HTML ou JSON de erro)
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        header = bytes(source[:8])
+    else:
+        with open(source, 'rb') as f:
+            header = f.read(8)
+    if header.startswith(XLSX_SIGNATURE):
+        return 'xlsx'
+    if header.startswith(XLS_SIGNATURE):
+        return 'xls'
+    return None
+
+
+def select_engines(file_format):
+    """Leitores instalados para o formato, em ordem de preferência"""
+    available = installed_engines()
+    return [engine for engine in ENGINE_PREFERENCE.get(file_format, ()) if engine in available]
+
+
+def read_excel(source, engine=None, **kwargs):
+    """
+    Lê um arquivo Excel escolhendo o leitor pelo formato detectado.
+
+    O leitor preferido é usado diretamente; os demais só são tentados se ele falhar.
+
+    Args:
+        source: Caminho do arquivo ou conteúdo em bytes
+        engine: Força um leitor específico (ex.: para comparações de desempenho)
+        **kwargs: Repassados para pandas.read_excel (ex.: nrows, usecols, sheet_name)
+
+    Returns:
+        DataFrame: Dados da planilha
+
+    Raises:
+        ExcelFormatError: Assinatura desconhecida ou nenhum leitor conseguiu ler o conteúdo
+    """
+    file_format = sniff_format(source)
+    if file_format is None:
+        raise ExcelFormatError("O conteúdo não é um arquivo Excel (.xlsx ou .xls)")
+
+    engines = [engine] if engine else select_engines(file_format)
+    if not engines:
+        raise ExcelFormatError(f"Nenhum leitor instalado para arquivos .{file_format}")
+
+    last_error = None
+    for candidate in engines:
+        data = io.BytesIO(source) if isinstance(source, (bytes, bytearray, memoryview)) else source
+        try:
+            with span('parse', engine=candidate, format=file_format) as sp:
+                df = pd.read_excel(data, engine=candidate, **kwargs)
+                if isinstance(df, pd.DataFrame):
+                    sp.set(rows=len(df))
+            return df
+        except Exception as e:
+            debug_print(f"Erro ao carregar com {candidate}: {str(e)}")
+            last_error = e
+    raise ExcelFormatError(f"Não foi possível ler o arquivo .{file_format}: {str(last_error)}")
@@ -0,0 +1,160 @@
+import os
+import csv
+import tempfile
+import threading
+
+import numpy as np
+
+# Biblioteca opcional: sem ela apenas a exportação em CSV fica disponível
+try:
+    from openpyxl import Workbook
+    openpyxl_installed = True
+except ImportError:
+    Workbook = None
+    openpyxl_installed = False
+
+from tracing import span
+
+# Configurações globais
+DEBUG = os.environ.get('MEUAGENDAMENTO_DEBUG') == '1'  # Ativar com MEUAGENDAMENTO_DEBUG=1 (nunca em produção)
+
+# Linhas copiadas do DataFrame por vez (a memória usada não depende do tamanho da exportação)
+EXPORT_CHUNK_ROWS = 5000
+# Separador do CSV: ';' é o padrão do Excel em português (a vírgula é o separador decimal)
+CSV_DELIMITER = ';'
+
+def debug_print(message):
+    """Função para imprimir mensagens de debug apenas quando DEBUG está ativado"""
+    if DEBUG:
+        print(f"[DEBUG] {message}")
+
+
+class ExportCancelled(Exception):
+    """Exportação interrompida pelo usuário"""
+
+
+def export_format(path):
+    """'xlsx' ou 'csv', pela extensão do arquivo de destino"""
+    return 'xlsx' if os.path.splitext(path)[1].lower() == '.xlsx' else 'csv'
+
+
+def _clean(value):
+    """Valor pronto para gravação (NaN vira célula vazia; tipos NumPy viram tipos Python)"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+class CatalogExporter:
+    """
+    Exporta as linhas filtradas de um DataFrame para CSV ou XLSX em uma thread separada.
+
+    Apenas as posições das linhas (máscara do filtro) são guardadas; as linhas são
+    copiadas em blocos de EXPORT_CHUNK_ROWS, e o XLSX é gravado com uma planilha
+    write-only do openpyxl, que envia cada linha ao disco sem manter a planilha na memória.
+    O arquivo final só aparece quando a exportação termina (temporário + os.replace).
+
+    Os callbacks são chamados na thread da exportação; quem usa a classe deve
+    repassá-los para a thread da interface (ex.: BackgroundScheduler.post).
+    """
+
+    def __init__(self, df, mask, path, on_progress=None, on_done=None, on_error=None,
+                 chunk_rows=EXPORT_CHUNK_ROWS):
+        """
+        Args:
+            df: DataFrame exibido (não é copiado; uma atualização substitui self.df sem alterá-lo)
+            mask: Máscara booleana do filtro atual (None = todas as linhas)
+            path: Arquivo de destino (.xlsx ou .csv)
+            on_progress: Função chamada com (linhas gravadas, total) a cada bloco
+            on_done: Função chamada com (caminho, linhas gravadas) ao terminar
+            on_error: Função chamada com a exceção (ExportCancelled se cancelada)
+        """
+        self.df = df
+        self.positions = np.flatnonzero(mask) if mask is not None else np.arange(len(df))
+        self.path = path
+        self.format = export_format(path)
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.chunk_rows = chunk_rows
+        self.written = 0
+        self._cancel = threading.Event()
+        self._thread = None
+
+    @property
+    def total(self):
+        return len(self.positions)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Inicia a exportação em uma thread separada"""
+        if self.format == 'xlsx' and not openpyxl_installed:
+            raise RuntimeError("openpyxl não instalado; exporte em CSV")
+        self._thread = threading.Thread(target=self._run, name='export', daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """Pede a interrupção; o arquivo de destino não é criado nem alterado"""
+        self._cancel.set()
+
+    def _rows(self):
+        """Linhas selecionadas, copiadas do DataFrame um bloco por vez"""
+        for start in range(0, self.total, self.chunk_rows):
+            if self._cancel.is_set():
+                raise ExportCancelled()
+            chunk = self.df.iloc[self.positions[start:start + self.chunk_rows]]
+            for row in chunk.itertuples(index=False, name=None):
+                yield [_clean(value) for value in row]
+            self.written = min(start + self.chunk_rows, self.total)
+            if self.on_progress is not None:
+                self.on_progress(self.written, self.total)
+
+    def _write_csv(self, temp_path):
+        # utf-8-sig: o Excel reconhece os acentos ao abrir o arquivo
+        with open(temp_path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f, delimiter=CSV_DELIMITER)
+            writer.writerow([str(col).strip() for col in self.df.columns])
+            # Números decimais com vírgula, como o Excel em português espera
+            writer.writerows([str(value).replace('.', ',') if isinstance(value, float) else value for value in row]
+                             for row in self._rows())
+
+    def _write_xlsx(self, temp_path):
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Produtos')
+        sheet.append([str(col).strip() for col in self.df.columns])
+        for row in self._rows():
+            sheet.append(row)
+        workbook.save(temp_path)
+
+    def _run(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        error = None
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            os.close(fd)
+            try:
+                with span('export', format=self.format, rows=self.total) as sp:
+                    if self.format == 'xlsx':
+                        self._write_xlsx(temp_path)
+                    else:
+                        self._write_csv(temp_path)
+                    os.replace(temp_path, self.path)
+                    sp.set(written=self.written)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        except Exception as e:
+            debug_print(f"Exportação interrompida: {e!r}")
+            error = e
+        # Callbacks apenas depois de remover o temporário
+        if error is None:
+            debug_print(f"Exportação concluída: {self.written} linhas em {self.path}")
+            if self.on_done is not None:
+                self.on_done(self.path, self.written)
+        elif self.on_error is not None:
+            self.on_error(error)
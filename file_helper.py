@@ -4,11 +4,14 @@ import requests
 import pandas as pd
 from tkinter import messagebox
 
+from cache_manager import get_cache
+from resumable_download import download_resumable, validate_catalog_file
+
 # Nome do arquivo XLSX
 XLSX_FILENAME = 'dados.xlsx'
 
 # Configurações globais
-DEBUG = True  # Definir como False em produção
+DEBUG = os.environ.get('MEUAGENDAMENTO_DEBUG') == '1'  # Ativar com MEUAGENDAMENTO_DEBUG=1 (nunca em produção)
 
 def debug_print(message):
     """Função para imprimir mensagens de debug apenas quando DEBUG está ativado"""
@@ -17,57 +20,28 @@ def debug_print(message):
 
 def get_file_path():
     """
-    Determina o melhor caminho para o arquivo XLSX.
-    Tenta vários diretórios em ordem de preferência e retorna o primeiro que funciona.
+    Determina o caminho para o arquivo XLSX dentro do cache do aplicativo.
+    O diretório gravável é resolvido uma única vez pelo gerenciador de cache.
     """
-    # Lista de possíveis locais para o arquivo, em ordem de preferência
-    possible_dirs = [
-        # 1. Diretório 'files' no mesmo diretório do script
-        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'files'),
-        # 2. Diretório 'files' no diretório atual
-        os.path.join(os.getcwd(), 'files'),
-        # 3. Diretório temporário do sistema
-        os.path.join(tempfile.gettempdir(), 'meuagendamentopro_files'),
-        # 4. Diretório raiz do usuário
-        os.path.join(os.path.expanduser('~'), 'meuagendamentopro_files'),
-        # 5. Diretório temporário do sistema (sem subdiretório)
-        tempfile.gettempdir()
-    ]
-    
-    # Testar cada diretório
-    for dir_path in possible_dirs:
-        try:
-            # Tentar criar o diretório se não existir
-            if not os.path.exists(dir_path):
-                os.makedirs(dir_path, exist_ok=True)
-                debug_print(f"Diretório criado: {dir_path}")
-            
-            # Verificar se podemos escrever no diretório
-            test_file = os.path.join(dir_path, 'test_write.tmp')
-            with open(test_file, 'w') as f:
-                f.write('test')
-            
-            # Se chegou aqui, podemos escrever no diretório
-            os.remove(test_file)
-            debug_print(f"Diretório com permissão de escrita: {dir_path}")
-            
-            # Retornar o caminho completo para o arquivo XLSX
-            return os.path.join(dir_path, XLSX_FILENAME)
-            
-        except Exception as e:
-            debug_print(f"Erro ao usar diretório {dir_path}: {str(e)}")
-    
-    # Se nenhum diretório funcionar, retornar um caminho no diretório temporário
-    last_resort = os.path.join(tempfile.gettempdir(), XLSX_FILENAME)
-    debug_print(f"Usando caminho de último recurso: {last_resort}")
-    return last_resort
+    return get_cache().path(XLSX_FILENAME)
+
+def _download(session, download_url, file_path):
+    """
+    Baixa o arquivo sem deixar arquivos pela metade: os bytes recebidos ficam em um .part,
+    continuado (Range) após quedas, e o arquivo só é substituído depois de conferido
+    (tamanho, hash e planilha válida; uma página de erro mantém o arquivo anterior).
+    """
+    # Arquivo do cache: substituição atômica com registro no índice
+    commit = (lambda part_path: get_cache().commit_file(XLSX_FILENAME, part_path)) \
+        if file_path == get_file_path() else None
+    download_resumable(download_url, file_path, session=session, validate=validate_catalog_file, commit=commit)
 
 def download_xlsx_from_server(session=None, file_urls=None):
     """
     Baixa o arquivo XLSX do servidor.
     
     Args:
-        session: Sessão de requests para fazer o download (opcional)
+        session: Sessão autenticada para fazer o download (opcional; sem ela, a sessão compartilhada do transporte)
         file_urls: Lista de URLs para tentar baixar o arquivo (opcional)
     
     Returns:
@@ -93,34 +67,23 @@ def download_xlsx_from_server(session=None, file_urls=None):
             download_url = f"{base_url}/{XLSX_FILENAME}"
             debug_print(f"Tentando baixar arquivo de: {download_url}")
             
-            # Se temos uma sessão autenticada, usamos ela para fazer o download
-            if session:
-                response = session.get(download_url, stream=True)
-            else:
-                # Caso contrário, criamos uma nova sessão
-                response = requests.get(download_url, stream=True)
-            
-            # Verificar se a resposta foi bem-sucedida
-            response.raise_for_status()
-            
-            # Salvar o arquivo localmente
+            # Se temos uma sessão autenticada, usamos ela; caso contrário, a sessão compartilhada
+            # (conexões reaproveitadas entre as URLs e timeouts de conexão e leitura)
             try:
-                with open(file_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
+                _download(session, download_url, file_path)
                 
                 debug_print(f"Arquivo baixado com sucesso para: {file_path}")
                 return True, file_path
-            except Exception as write_error:
+            except requests.exceptions.RequestException:
+                raise  # Falha de rede (também é um OSError): tentar a próxima URL
+            except OSError as write_error:
                 debug_print(f"Erro ao escrever arquivo: {str(write_error)}")
                 # Tentar um caminho alternativo
                 try:
                     temp_path = os.path.join(tempfile.gettempdir(), XLSX_FILENAME)
                     debug_print(f"Tentando salvar em caminho alternativo: {temp_path}")
                     
-                    with open(temp_path, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            f.write(chunk)
+                    _download(session, download_url, temp_path)
                     
                     debug_print(f"Arquivo salvo em caminho alternativo: {temp_path}")
                     return True, temp_path
@@ -134,30 +97,21 @@ def download_xlsx_from_server(session=None, file_urls=None):
             download_url = f"{base_url}/download/{XLSX_FILENAME}"
             debug_print(f"Tentando caminho alternativo: {download_url}")
             
-            if session:
-                response = session.get(download_url, stream=True)
-            else:
-                response = requests.get(download_url, stream=True)
-            
-            response.raise_for_status()
-            
             try:
-                with open(file_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
+                _download(session, download_url, file_path)
                 
                 debug_print(f"Arquivo baixado com sucesso (caminho alternativo) para: {file_path}")
                 return True, file_path
-            except Exception as write_error:
+            except requests.exceptions.RequestException:
+                raise  # Falha de rede (também é um OSError): tentar a próxima URL
+            except OSError as write_error:
                 debug_print(f"Erro ao escrever arquivo (caminho alternativo): {str(write_error)}")
                 # Tentar um caminho alternativo
                 try:
                     temp_path = os.path.join(tempfile.gettempdir(), XLSX_FILENAME)
                     debug_print(f"Tentando salvar em caminho alternativo: {temp_path}")
                     
-                    with open(temp_path, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            f.write(chunk)
+                    _download(session, download_url, temp_path)
                     
                     debug_print(f"Arquivo salvo em caminho alternativo: {temp_path}")
                     return True, temp_path
@@ -166,7 +120,12 @@ def download_xlsx_from_server(session=None, file_urls=None):
         except Exception as alt_e:
             debug_print(f"Erro ao baixar arquivo de {download_url}: {str(alt_e)}")
     
-    # Se todas as tentativas falharem, criar um arquivo local com dados básicos
+    # Se todas as tentativas falharem, manter o arquivo de um download anterior, se houver
+    if os.path.exists(file_path):
+        debug_print(f"Todas as tentativas de download falharam. Mantendo o arquivo anterior: {file_path}")
+        return True, file_path
+    
+    # Sem arquivo anterior, criar um arquivo local com dados básicos
     debug_print("Todas as tentativas de download falharam. Criando arquivo local com dados básicos.")
     try:
         # Criar um DataFrame com algumas colunas básicas
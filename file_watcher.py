@@ -0,0 +1,255 @@
+import os
+import sys
+import time
+import select
+import struct
+import hashlib
+import zipfile
+import threading
+import ctypes
+import ctypes.util
+
+from tracing import span
+
+# Configurações globais
+DEBUG = os.environ.get('MEUAGENDAMENTO_DEBUG') == '1'  # Ativar com MEUAGENDAMENTO_DEBUG=1 (nunca em produção)
+
+# Extensões acompanhadas nas pastas observadas
+WATCHED_EXTENSIONS = ('.xlsx', '.xls')
+# Tempo sem alterações (segundos) antes de considerar a gravação concluída.
+# O Excel salva em um temporário e depois renomeia, gerando vários eventos seguidos.
+DEBOUNCE_DELAY = 1.0
+# Intervalo (segundos) da verificação por polling quando o inotify não está disponível
+POLL_INTERVAL = 2.0
+
+# Constantes do inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+def debug_print(message):
+    """Função para imprimir mensagens de debug apenas quando DEBUG está ativado"""
+    if DEBUG:
+        print(f"[DEBUG] {message}")
+
+
+def _load_inotify():
+    """Funções do inotify da libc (None fora do Linux ou se indisponíveis)"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError) as e:
+        debug_print(f"inotify indisponível: {str(e)}")
+        return None
+
+
+def file_digest(path):
+    """Hash SHA-256 do conteúdo do arquivo"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_complete(path):
+    """
+    Indica se o arquivo está inteiro: um .xlsx é um zip, cujo índice fica no fim do arquivo,
+    e só fica válido quando a gravação termina.
+    """
+    try:
+        if path.lower().endswith('.xlsx'):
+            return zipfile.is_zipfile(path)
+        return os.path.getsize(path) > 0
+    except OSError:
+        return False
+
+
+class FileWatcher:
+    """
+    Avisa quando arquivos do catálogo são alterados no disco.
+
+    Usa inotify no Linux (eventos da pasta de cada arquivo, pois o Excel salva por
+    renomeação) e, nos demais sistemas, a comparação periódica de tamanho e data.
+    Rajadas de eventos são agrupadas: o arquivo só é avisado depois de DEBOUNCE_DELAY
+    segundos sem mudanças, quando está completo e com conteúdo (hash) diferente do último.
+
+    O callback é chamado na thread do observador; quem usa a classe deve
+    repassá-lo para a thread da interface (ex.: BackgroundScheduler.post).
+    """
+
+    def __init__(self, on_change, files=(), directories=(), debounce=DEBOUNCE_DELAY,
+                 poll_interval=POLL_INTERVAL, use_inotify=True):
+        """
+        Args:
+            on_change: Função chamada com (caminho, hash) quando um arquivo muda
+            files: Arquivos observados
+            directories: Pastas observadas (arquivos .xlsx/.xls dentro delas)
+            debounce: Tempo sem eventos (segundos) antes de verificar o arquivo
+            poll_interval: Intervalo (segundos) do polling, sem inotify
+            use_inotify: Se False, força o polling
+        """
+        self.on_change = on_change
+        self.files = {os.path.abspath(path) for path in files}
+        self.directories = {os.path.abspath(path) for path in directories}
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.mode = None  # 'inotify' ou 'polling'
+        self.changes_reported = 0
+        self._libc = _load_inotify() if use_inotify else None
+        self._hashes = {}  # Último conteúdo conhecido de cada arquivo
+        self._stats = {}  # (tamanho, data) de cada arquivo, para o polling
+        self._pending = {}  # Arquivo -> instante do último evento
+        self._stop = threading.Event()
+        self._thread = None
+
+    def watches(self, path):
+        """Indica se o arquivo é observado (diretamente ou por estar em uma pasta observada)"""
+        name = os.path.basename(path)
+        if name.startswith('~$') or name.startswith('.~'):
+            return False  # Arquivos de trava do Excel/LibreOffice
+        if path in self.files:
+            return True
+        return os.path.dirname(path) in self.directories and name.lower().endswith(WATCHED_EXTENSIONS)
+
+    def _scan(self):
+        """Arquivos observados que existem agora, com (tamanho, data)"""
+        found = {}
+        candidates = set(self.files)
+        for directory in self.directories:
+            try:
+                candidates.update(os.path.join(directory, name) for name in os.listdir(directory))
+            except OSError:
+                continue
+        for path in candidates:
+            if not self.watches(path):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            found[path] = (stat.st_size, stat.st_mtime_ns)
+        return found
+
+    def start(self):
+        """Registra o conteúdo atual dos arquivos e inicia a observação em uma thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stats = self._scan()
+        for path in self._stats:
+            try:
+                self._hashes[path] = file_digest(path)
+            except OSError:
+                pass
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='file-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def set_known_hash(self, path, digest):
+        """Informa o conteúdo já carregado (evita avisar de um arquivo que o aplicativo já leu)"""
+        self._hashes[os.path.abspath(path)] = digest
+
+    def _run(self):
+        fd = self._open_inotify()
+        self.mode = 'inotify' if fd is not None else 'polling'
+        debug_print(f"Observando arquivos do catálogo ({self.mode}): "
+                    f"{sorted(self.files)} {sorted(self.directories)}")
+        try:
+            while not self._stop.is_set():
+                if fd is not None:
+                    self._read_events(fd)
+                else:
+                    self._poll()
+                self._flush()
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def _open_inotify(self):
+        if self._libc is None:
+            return None
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            debug_print(f"inotify_init1 falhou (errno {ctypes.get_errno()}), usando polling")
+            return None
+        self._watch_dirs = {}
+        for directory in {os.path.dirname(path) for path in self.files} | self.directories:
+            wd = self._libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                debug_print(f"Não foi possível observar {directory} (errno {ctypes.get_errno()}), usando polling")
+                os.close(fd)
+                return None
+            self._watch_dirs[wd] = directory
+        return fd
+
+    def _read_events(self, fd):
+        # Espera curta para verificar a parada e os arquivos aguardando o fim das gravações
+        ready, _, _ = select.select([fd], [], [], min(self.debounce / 2, 0.5))
+        if not ready:
+            return
+        try:
+            data = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0')
+            offset += EVENT_HEADER.size + length
+            directory = self._watch_dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if self.watches(path):
+                self._pending[path] = time.monotonic()
+
+    def _poll(self):
+        self._stop.wait(self.poll_interval)
+        current = self._scan()
+        now = time.monotonic()
+        for path, stat in current.items():
+            if self._stats.get(path) != stat:
+                self._pending[path] = now
+        self._stats = current
+
+    def _flush(self):
+        """Verifica os arquivos cujas gravações terminaram (sem eventos há DEBOUNCE_DELAY)"""
+        now = time.monotonic()
+        for path, last_event in list(self._pending.items()):
+            if now - last_event < self.debounce:
+                continue
+            del self._pending[path]
+            if not os.path.exists(path):
+                continue  # Removido, ou ainda entre o temporário e a renomeação
+            if not is_complete(path):
+                debug_print(f"Arquivo ainda incompleto, aguardando: {path}")
+                self._pending[path] = now
+                continue
+            try:
+                with span('file_watch', file=os.path.basename(path)):
+                    digest = file_digest(path)
+            except OSError as e:
+                debug_print(f"Erro ao ler {path}: {str(e)}")
+                self._pending[path] = now
+                continue
+            if digest == self._hashes.get(path):
+                debug_print(f"Arquivo salvo sem alterações: {path}")
+                continue
+            self._hashes[path] = digest
+            self.changes_reported += 1
+            debug_print(f"Arquivo alterado: {path}")
+            self.on_change(path, digest)
@@ -0,0 +1,131 @@
+import os
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+# Configurações globais
+DEBUG = os.environ.get('MEUAGENDAMENTO_DEBUG') == '1'  # Ativar com MEUAGENDAMENTO_DEBUG=1 (nunca em produção)
+
+# Colunas que identificam uma linha do catálogo (um produto em uma plataforma)
+KEY_COLUMNS = ('PRODUTO', 'PLATAFORMA')
+# O mesmo PRODUTO aparece várias vezes por plataforma; a descrição separa os anúncios
+DETAIL_KEY_COLUMNS = ('DESCRIÇÃO DO SITE',)
+
+def debug_print(message):
+    """Função para imprimir mensagens de debug apenas quando DEBUG está ativado"""
+    if DEBUG:
+        print(f"[DEBUG] {message}")
+
+
+def content_hash(content):
+    """Hash SHA-256 dos bytes baixados (o mesmo enviado pelo servidor nas notificações)"""
+    return hashlib.sha256(content).hexdigest()
+
+
+def find_key_columns(columns):
+    """
+    Retorna os nomes reais das colunas-chave (tolerando espaços e maiúsculas), ou None
+    se PRODUTO ou PLATAFORMA não existirem. A descrição entra na chave quando existe.
+    """
+    def find(key):
+        return next((c for c in columns if str(c).upper().strip() == key), None)
+
+    found = [find(key) for key in KEY_COLUMNS]
+    if None in found:
+        return None
+    return found + [col for col in map(find, DETAIL_KEY_COLUMNS) if col is not None]
+
+
+def row_keys(df, key_cols):
+    """
+    Chave de cada linha: (PRODUTO, PLATAFORMA, descrição, ocorrência). A ocorrência diferencia
+    linhas repetidas com a mesma chave, mantendo todas as chaves únicas.
+    """
+    if key_cols is None:
+        return list(range(len(df)))
+    keys = df[key_cols].astype(str)
+    occurrence = keys.groupby(key_cols, sort=False).cumcount()
+    return list(zip(*(keys[c] for c in key_cols), occurrence))
+
+
+class FrameFingerprint:
+    """Impressão digital de um DataFrame: um hash por linha, um hash por coluna e o hash geral"""
+
+    def __init__(self, df):
+        self.columns = tuple(df.columns)
+        self.key_cols = find_key_columns(self.columns)
+        # Hash vetorizado de cada linha (independente do índice)
+        hashes = pd.util.hash_pandas_object(df, index=False).to_numpy(dtype=np.uint64) if len(df) else \
+            np.empty(0, dtype=np.uint64)
+        self.row_hashes = pd.Series(hashes, index=pd.Index(row_keys(df, self.key_cols), tupleize_cols=False))
+        self.column_hashes = {
+            col: hashlib.sha256(pd.util.hash_pandas_object(df[col], index=False).to_numpy().tobytes()).hexdigest()
+            for col in df.columns
+        }
+        digest = hashlib.sha256(repr(self.columns).encode('utf-8'))
+        digest.update(hashes.tobytes())
+        self.digest = digest.hexdigest()
+
+    def __len__(self):
+        return len(self.row_hashes)
+
+
+class FrameDiff:
+    """Diferença entre duas versões do catálogo, identificada pelas chaves das linhas"""
+
+    def __init__(self, added, removed, changed, changed_columns, schema_changed):
+        self.added = added  # Chaves presentes apenas na versão nova
+        self.removed = removed  # Chaves presentes apenas na versão antiga
+        self.changed = changed  # Chaves presentes nas duas, com conteúdo diferente
+        self.changed_columns = changed_columns  # Colunas cujo conteúdo mudou
+        self.schema_changed = schema_changed  # Colunas adicionadas, removidas ou reordenadas
+
+    @property
+    def empty(self):
+        return not (self.added or self.removed or self.changed or self.schema_changed)
+
+    @property
+    def changed_keys(self):
+        """Chaves afetadas de qualquer forma (inclusão, remoção ou alteração)"""
+        return set(self.added) | set(self.removed) | set(self.changed)
+
+    def summary(self):
+        """Descrição curta para a barra de status (ex.: '3 alterados, 1 novo')"""
+        if self.schema_changed:
+            return "colunas alteradas"
+        parts = []
+        if self.changed:
+            parts.append(f"{len(self.changed)} alterado(s)")
+        if self.added:
+            parts.append(f"{len(self.added)} novo(s)")
+        if self.removed:
+            parts.append(f"{len(self.removed)} removido(s)")
+        return ', '.join(parts) if parts else "nenhuma alteração"
+
+
+def diff_fingerprints(old, new):
+    """
+    Compara duas impressões digitais sem reler os DataFrames.
+
+    Returns:
+        FrameDiff: Linhas incluídas, removidas e alteradas (pelas chaves PRODUTO+PLATAFORMA,
+                   ou pela posição quando essas colunas não existem)
+    """
+    if old.columns != new.columns or old.key_cols != new.key_cols:
+        return FrameDiff([], [], [], list(new.columns), True)
+    if old.digest == new.digest:
+        return FrameDiff([], [], [], [], False)
+
+    changed_columns = [col for col in new.columns if old.column_hashes.get(col) != new.column_hashes.get(col)]
+    old_index, new_index = old.row_hashes.index, new.row_hashes.index
+    # Posição de cada chave nova na versão antiga (-1 quando a linha é nova)
+    positions = old_index.get_indexer(new_index)
+    present = positions >= 0
+    differs = np.zeros(len(new_index), dtype=bool)
+    differs[present] = new.row_hashes.to_numpy()[present] != old.row_hashes.to_numpy()[positions[present]]
+    changed = list(new_index[differs])
+    added = list(new_index[~present])
+    removed = list(old_index[new_index.get_indexer(old_index) < 0])
+    debug_print(f"Diferença do catálogo: {len(changed)} alteradas, {len(added)} novas, {len(removed)} removidas")
+    return FrameDiff(added, removed, changed, changed_columns, False)
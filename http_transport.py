@@ -0,0 +1,184 @@
+import os
+import time
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Bibliotecas opcionais: com elas o servidor pode responder comprimido em Brotli/Zstandard
+# (o urllib3 descomprime sozinho quando estão instaladas); sem elas, gzip/deflate
+try:
+    import brotli  # noqa: F401
+    brotli_installed = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        brotli_installed = True
+    except ImportError:
+        brotli_installed = False
+try:
+    import zstandard  # noqa: F401
+    zstd_installed = True
+except ImportError:
+    zstd_installed = False
+
+# Configurações globais
+DEBUG = os.environ.get('MEUAGENDAMENTO_DEBUG') == '1'  # Ativar com MEUAGENDAMENTO_DEBUG=1 (nunca em produção)
+
+# Timeouts (em segundos) aplicados quando a chamada não informa um: conexão e leitura
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+# Conexões mantidas abertas (keep-alive) por servidor
+POOL_MAXSIZE = 8
+# Novas tentativas de GET/HEAD (requisições idempotentes) após falha de conexão ou erro temporário
+GET_RETRIES = 3
+RETRY_BACKOFF = 0.5  # Espera de 0,5 s, 1 s, 2 s... entre as tentativas (respeita Retry-After)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+USER_AGENT = 'MeuAgendamentoPRO-Produtos'
+
+def debug_print(message):
+    """Função para imprimir mensagens de debug apenas quando DEBUG está ativado"""
+    if DEBUG:
+        print(f"[DEBUG] {message}")
+
+
+def accept_encoding():
+    """Compressões aceitas nas respostas, conforme as bibliotecas instaladas"""
+    encodings = ['gzip', 'deflate']
+    if brotli_installed:
+        encodings.append('br')
+    if zstd_installed:
+        encodings.append('zstd')
+    return ', '.join(encodings)
+
+
+class HostMetrics:
+    """Contadores das requisições feitas a um servidor"""
+
+    def __init__(self, host):
+        self.host = host
+        self.requests = 0
+        self.failures = 0  # Sem resposta (conexão recusada, timeout...) depois das novas tentativas
+        self.retries = 0
+        self.errors = 0  # Respostas com status >= 400
+        self.bytes = 0  # Bytes transferidos (Content-Length, ou seja, já comprimidos)
+        self.total_time = 0.0  # Tempo até os cabeçalhos da resposta, somado
+
+    def snapshot(self, connections=0):
+        return {
+            'host': self.host,
+            'requests': self.requests,
+            'connections': connections,
+            'retries': self.retries,
+            'failures': self.failures,
+            'errors': self.errors,
+            'bytes': self.bytes,
+            'avg_ms': round(self.total_time * 1000 / self.requests, 1) if self.requests else None,
+        }
+
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+_adapters = []  # Adaptadores criados (para contar as conexões abertas de cada servidor)
+
+
+def _record(host, elapsed, status=None, retries=0, size=0):
+    with _metrics_lock:
+        stats = _metrics.get(host)
+        if stats is None:
+            stats = _metrics[host] = HostMetrics(host)
+        stats.requests += 1
+        stats.total_time += elapsed
+        stats.retries += retries
+        stats.bytes += size
+        if status is None:
+            stats.failures += 1
+        elif status >= 400:
+            stats.errors += 1
+
+
+def metrics():
+    """Contadores por servidor, com as conexões abertas até agora (requisições / conexões = reaproveitamento)"""
+    connections = {}
+    with _metrics_lock:
+        for adapter in _adapters:
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    host = f"{pool.host}:{pool.port}" if pool.port else pool.host
+                    connections[host] = connections.get(host, 0) + pool.num_connections
+        return [stats.snapshot(connections.get(host, 0)) for host, stats in sorted(_metrics.items())]
+
+
+def _host(url):
+    parts = urlsplit(url)
+    return f"{parts.hostname}:{parts.port or (443 if parts.scheme == 'https' else 80)}"
+
+
+class TransportAdapter(HTTPAdapter):
+    """
+    Adaptador do requests com conexões reaproveitadas, timeout padrão, novas tentativas
+    para GET/HEAD e registro das métricas por servidor.
+    """
+
+    def __init__(self, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), retries=GET_RETRIES, pool_maxsize=POOL_MAXSIZE):
+        self.timeout = timeout
+        retry = Retry(
+            total=retries, connect=retries, read=retries, status=retries,
+            backoff_factor=RETRY_BACKOFF, status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({'GET', 'HEAD'}),  # POST (login) nunca é repetido
+            respect_retry_after_header=True, raise_on_status=False
+        )
+        super().__init__(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=retry)
+        with _metrics_lock:
+            _adapters.append(self)
+
+    def send(self, request, **kwargs):
+        # Sem timeout a requisição poderia ficar pendurada indefinidamente
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        host = _host(request.url)
+        started = time.perf_counter()
+        try:
+            response = super().send(request, **kwargs)
+        except Exception:
+            _record(host, time.perf_counter() - started)
+            raise
+        history = getattr(getattr(response.raw, 'retries', None), 'history', ())
+        size = response.headers.get('Content-Length', '')
+        _record(host, time.perf_counter() - started, response.status_code, len(history),
+                int(size) if size.isdigit() else 0)
+        return response
+
+
+def create_session(retries=GET_RETRIES):
+    """
+    Nova sessão (cookies próprios) com o transporte compartilhado: use uma por login.
+    As requisições sem autenticação devem usar get_session().
+
+    Args:
+        retries: Novas tentativas de GET/HEAD feitas pelo transporte (0 = o chamador decide)
+    """
+    session = requests.Session()
+    adapter = TransportAdapter(retries=retries)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    session.headers['Accept-Encoding'] = accept_encoding()
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Sessão compartilhada para requisições sem autenticação (downloads públicos)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+        return _session
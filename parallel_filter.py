@@ -0,0 +1,147 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Biblioteca opcional: as funções de texto do Arrow liberam o GIL e rodam em paralelo de fato.
+# Sem ela os blocos são avaliados em sequência (ainda com resultados parciais para a primeira página).
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    arrow_installed = True
+except ImportError:
+    pa = None
+    pc = None
+    arrow_installed = False
+
+# Configurações globais
+DEBUG = os.environ.get('MEUAGENDAMENTO_DEBUG') == '1'  # Ativar com MEUAGENDAMENTO_DEBUG=1 (nunca em produção)
+
+# Catálogos menores que isso são filtrados em sequência (dividir em blocos custaria mais que ganharia)
+PARALLEL_MIN_ROWS = 200_000
+# Linhas por bloco (cada bloco é uma tarefa da thread pool)
+CHUNK_ROWS = 64 * 1024
+# Threads usadas na avaliação (uma por núcleo)
+MAX_WORKERS = os.cpu_count() or 1
+
+def debug_print(message):
+    """Função para imprimir mensagens de debug apenas quando DEBUG está ativado"""
+    if DEBUG:
+        print(f"[DEBUG] {message}")
+
+
+class ArrowUnsupported(Exception):
+    """Operação ou expressão que o Arrow não avalia (ex.: regex fora do RE2): usar o Python"""
+
+
+def chunk_bounds(size, chunk_rows=CHUNK_ROWS):
+    """Limites (início, fim) de cada bloco de linhas, em ordem"""
+    return [(start, min(start + chunk_rows, size)) for start in range(0, size, chunk_rows)]
+
+
+# Classes de caracteres que o RE2 (Arrow) interpreta só em ASCII e o re do Python em Unicode:
+# expressões com elas são avaliadas pelo Python, para não mudar o resultado com acentos
+_UNICODE_CLASSES = re.compile(r'\\[wWbBdDsS]')
+# Início de palavra para a busca por prefixo (equivalente ao \b do Python com letras acentuadas)
+_WORD_START = r'(?:^|[^\p{L}\p{N}_])'
+
+
+def arrow_text(text):
+    """Coluna de texto (já em minúsculas) convertida para Arrow, preparada uma vez por carga"""
+    return pa.array(text.to_numpy(dtype=object), type=pa.large_string(), from_pandas=True)
+
+
+def arrow_supports(op, value):
+    """Indica se a operação de texto tem o mesmo resultado no Arrow e no Python"""
+    if op == 'regex':
+        return not _UNICODE_CLASSES.search(value)
+    if op == 'prefix':
+        # \b antes de um caractere que não é de palavra tem outro sentido no Python
+        return value[:1].isalnum() or value[:1] == '_'
+    return op in ('contains', 'exact')
+
+
+def arrow_text_mask(array, op, value):
+    """
+    Máscara de uma operação de texto sobre um bloco Arrow (executada fora do GIL).
+
+    Raises:
+        ArrowUnsupported: Expressão não suportada pelo RE2 (ex.: lookbehind, referências)
+    """
+    try:
+        if op == 'contains':
+            result = pc.match_substring(array, value)
+        elif op == 'prefix':
+            result = pc.match_substring_regex(array, _WORD_START + _re2_escape(value))
+        elif op == 'regex':
+            result = pc.match_substring_regex(array, value, ignore_case=True)
+        elif op == 'exact':
+            result = pc.equal(pc.utf8_trim_whitespace(array), value)
+        else:
+            raise ArrowUnsupported(op)
+    except pa.ArrowInvalid as e:
+        raise ArrowUnsupported(str(e))
+    return pc.fill_null(result, False).to_numpy(zero_copy_only=False)
+
+
+def _re2_escape(text):
+    """Escapa o texto para uso literal em uma expressão RE2"""
+    return ''.join('\\' + char if ord(char) < 128 and not char.isalnum() and char != ' ' else char for char in text)
+
+
+class ChunkedExecutor:
+    """
+    Avalia uma função por blocos de linhas em uma thread pool e entrega os resultados em ordem.
+
+    Os blocos são enviados todos de uma vez; a entrega segue a ordem das linhas, de modo que
+    o chamador pode exibir a primeira página assim que os primeiros blocos terminam.
+    """
+
+    def __init__(self, workers=MAX_WORKERS, chunk_rows=CHUNK_ROWS):
+        self.workers = workers if arrow_installed else 1
+        self.chunk_rows = chunk_rows
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='filter')
+            return self._pool
+
+    def imap(self, func, size):
+        """
+        Executa func(início, fim) para cada bloco.
+
+        Yields:
+            tuple: (início, fim, resultado), na ordem das linhas
+        """
+        bounds = chunk_bounds(size, self.chunk_rows)
+        if self.workers <= 1 or len(bounds) <= 1:
+            for start, end in bounds:
+                yield start, end, func(start, end)
+            return
+        futures = [self._get_pool().submit(func, start, end) for start, end in bounds]
+        try:
+            for (start, end), future in zip(bounds, futures):
+                yield start, end, future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+_executor = None
+
+
+def get_executor():
+    """Executor compartilhado pelo aplicativo"""
+    global _executor
+    if _executor is None:
+        _executor = ChunkedExecutor()
+    return _executor
@@ -0,0 +1,306 @@
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from fingerprint import DETAIL_KEY_COLUMNS, KEY_COLUMNS, find_key_columns
+from query import to_numeric
+from sheet_loader import SheetLoader, normalize_column
+from tracing import span
+
+# Configurações globais
+DEBUG = os.environ.get('MEUAGENDAMENTO_DEBUG') == '1'  # Ativar com MEUAGENDAMENTO_DEBUG=1 (nunca em produção)
+
+# Colunas da chave de cada série no banco (produto, plataforma, descrição e ocorrência, como em fingerprint.row_keys)
+SERIES_KEY = ('product', 'platform', 'detail', 'occurrence')
+
+# Colunas lidas do catálogo para o histórico (a chave completa e o preço, mesmo se ocultas na tabela)
+HISTORY_COLUMNS = KEY_COLUMNS + DETAIL_KEY_COLUMNS + ('PREÇO',)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    product TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    detail TEXT NOT NULL,
+    occurrence INTEGER NOT NULL,
+    price REAL,
+    UNIQUE (product, platform, detail, occurrence)
+);
+CREATE TABLE IF NOT EXISTS versions (
+    id INTEGER PRIMARY KEY,
+    recorded_at REAL NOT NULL,
+    catalog_hash TEXT,
+    changes INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS prices (
+    series_id INTEGER NOT NULL,
+    version_id INTEGER NOT NULL,
+    price REAL,
+    PRIMARY KEY (series_id, version_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS prices_by_version ON prices (version_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def debug_print(message):
+    """Função para imprimir mensagens de debug apenas quando DEBUG está ativado"""
+    if DEBUG:
+        print(f"[DEBUG] {message}")
+
+
+def _price_column(columns):
+    return next((col for col in columns if str(col).upper().strip() == 'PREÇO'), None)
+
+
+def _key_schema(key_cols):
+    """Colunas da chave gravadas no banco (comparadas a cada versão)"""
+    return '|'.join(normalize_column(col) for col in key_cols)
+
+
+def _same_price(old, new):
+    """Preços iguais, considerando iguais dois valores ausentes (NaN)"""
+    return (old == new) | (np.isnan(old) & np.isnan(new))
+
+
+def _nullable(values):
+    """Preços para o SQLite (NaN vira NULL)"""
+    return [None if np.isnan(v) else float(v) for v in values]
+
+
+class PriceHistory:
+    """
+    Histórico local dos preços do catálogo (SQLite, somente acréscimos).
+
+    Cada linha do catálogo é uma série identificada pela mesma chave da impressão digital
+    (PRODUTO, PLATAFORMA, descrição e ocorrência). A cada versão nova do catálogo são gravados
+    apenas os pontos das séries cujo preço mudou (ou que entraram/saíram do catálogo; NULL =
+    sem preço ou fora do catálogo), então o banco cresce com a quantidade de alterações e não
+    com a de versões. O preço atual de cada série fica na própria tabela de séries, e a
+    comparação com a versão nova é uma junção vetorizada do pandas.
+
+    As gravações rodam em uma única thread própria, na ordem em que as versões chegaram;
+    as consultas podem ser feitas de qualquer thread (cada uma abre sua conexão).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._writer = None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')  # Leituras não esperam pelas gravações
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with conn:  # Transação: confirmada no fim do bloco ou desfeita em caso de erro
+                yield conn
+        finally:
+            conn.close()
+
+    def submit(self, df, catalog_hash=None, timestamp=None, sources=None):
+        """
+        Agenda a gravação de uma versão do catálogo (retorna imediatamente).
+
+        Apenas as colunas da chave e o preço são copiados, então o DataFrame pode continuar
+        sendo usado (e substituído) pela interface. Se faltar alguma dessas colunas no DataFrame
+        (ex.: DESCRIÇÃO DO SITE oculta na tabela) e os arquivos do catálogo forem informados em
+        sources, elas são lidas do cache de colunas na thread de gravação, para que a chave das
+        séries não dependa das colunas exibidas. Retorna o Future da gravação, ou None se o
+        catálogo não tiver PRODUTO, PLATAFORMA e PREÇO.
+        """
+        present = {normalize_column(col) for col in df.columns}
+        if sources and not present.issuperset(HISTORY_COLUMNS):
+            frame = None
+            sources = list(sources)
+        else:
+            key_cols = find_key_columns(tuple(df.columns))
+            price_col = _price_column(df.columns)
+            if key_cols is None or price_col is None:
+                return None
+            frame = df[key_cols + [price_col]]
+        with self._lock:
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='price-history')
+            return self._writer.submit(self._record_safely, frame, sources, catalog_hash, timestamp or time.time())
+
+    def _record_safely(self, frame, sources, catalog_hash, timestamp):
+        try:
+            if frame is None:
+                # Leitor próprio: as colunas lidas aqui não ficam na memória do leitor da interface
+                frame = SheetLoader(max_workers=1).load(sources, columns=HISTORY_COLUMNS)
+            key_cols = find_key_columns(tuple(frame.columns))
+            price_col = _price_column(frame.columns)
+            if key_cols is None or price_col is None:
+                return None
+            return self._record(frame, key_cols, price_col, catalog_hash, timestamp)
+        except Exception as e:
+            # O histórico nunca impede a atualização dos dados exibidos
+            debug_print(f"Erro ao gravar histórico de preços: {str(e)}")
+            raise
+
+    def record(self, df, catalog_hash=None, timestamp=None):
+        """
+        Grava uma versão do catálogo imediatamente (na thread atual).
+
+        Returns:
+            int: Quantidade de séries alteradas, ou None se a versão já era a última
+                 gravada, se o catálogo não tiver as colunas necessárias ou se a chave
+                 (com ou sem descrição) for diferente da usada nas versões já gravadas
+        """
+        key_cols = find_key_columns(tuple(df.columns))
+        price_col = _price_column(df.columns)
+        if key_cols is None or price_col is None:
+            return None
+        return self._record(df, key_cols, price_col, catalog_hash, timestamp or time.time())
+
+    def _record(self, df, key_cols, price_col, catalog_hash, timestamp):
+        with span('history', mode='record', rows=len(df)) as sp, self._connect() as conn:
+            if catalog_hash is not None:
+                last = conn.execute("SELECT value FROM meta WHERE key = 'last_hash'").fetchone()
+                if last is not None and last[0] == catalog_hash:
+                    sp.set(changes=0, skipped=True)
+                    return None
+
+            # Com outras colunas na chave todas as séries pareceriam removidas e recriadas
+            schema = _key_schema(key_cols)
+            stored = conn.execute("SELECT value FROM meta WHERE key = 'key_columns'").fetchone()
+            if stored is None:
+                conn.execute("INSERT INTO meta (key, value) VALUES ('key_columns', ?)", (schema,))
+            elif stored[0] != schema:
+                debug_print(f"Histórico de preços: chave {schema} diferente da gravada ({stored[0]}), versão ignorada")
+                sp.set(changes=0, skipped='key_columns')
+                return None
+
+            # Mesma chave de fingerprint.row_keys, montada de forma vetorizada
+            keys = df[key_cols].astype(str)
+            new = pd.DataFrame({
+                'product': keys.iloc[:, 0].to_numpy(),
+                'platform': keys.iloc[:, 1].to_numpy(),
+                'detail': keys.iloc[:, 2].to_numpy() if len(key_cols) > 2 else '',
+                'occurrence': keys.groupby(key_cols, sort=False).cumcount().to_numpy(dtype=np.int64),
+                'new_price': to_numeric(df[price_col]),
+            })
+            old = pd.read_sql_query('SELECT id, product, platform, detail, occurrence, price FROM series', conn)
+            old['price'] = old['price'].astype(float)
+            merged = old.merge(new, on=list(SERIES_KEY), how='outer')
+
+            # Séries novas recebem ids em sequência depois do maior existente
+            added = merged['id'].isna().to_numpy()
+            next_id = int(old['id'].max()) + 1 if len(old) else 1
+            ids = merged['id'].to_numpy(dtype=float, copy=True)
+            ids[added] = np.arange(next_id, next_id + int(added.sum()))
+            merged['id'] = ids.astype(np.int64)
+
+            # Linhas que saíram do catálogo passam a não ter preço (NaN, gravado como NULL)
+            old_price = merged['price'].to_numpy(dtype=float)
+            new_price = merged['new_price'].to_numpy(dtype=float)
+            changed = added | ~_same_price(old_price, new_price)
+            sp.set(changes=int(changed.sum()), added=int(added.sum()))
+
+            if changed.any():
+                version_id = conn.execute(
+                    'INSERT INTO versions (recorded_at, catalog_hash, changes) VALUES (?, ?, ?)',
+                    (timestamp, catalog_hash, int(changed.sum()))
+                ).lastrowid
+                rows = merged[changed]
+                series_ids = rows['id'].tolist()
+                prices = _nullable(rows['new_price'].to_numpy(dtype=float))
+                is_new = added[changed]
+                inserted = rows[is_new]
+                conn.executemany(
+                    'INSERT INTO series (id, product, platform, detail, occurrence, price) VALUES (?, ?, ?, ?, ?, ?)',
+                    zip(inserted['id'].tolist(), inserted['product'].tolist(), inserted['platform'].tolist(),
+                        inserted['detail'].tolist(), inserted['occurrence'].astype(np.int64).tolist(),
+                        _nullable(inserted['new_price'].to_numpy(dtype=float)))
+                )
+                conn.executemany('INSERT INTO prices (series_id, version_id, price) VALUES (?, ?, ?)',
+                                 ((sid, version_id, price) for sid, price in zip(series_ids, prices)))
+                conn.executemany('UPDATE series SET price = ? WHERE id = ?',
+                                 ((price, sid) for sid, price, new_series in zip(series_ids, prices, is_new)
+                                  if not new_series))
+            if catalog_hash is not None:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_hash', ?)", (catalog_hash,))
+            debug_print(f"Histórico de preços: {int(changed.sum())} alterações em {len(df)} linhas")
+            return int(changed.sum())
+
+    def series(self, product, platform=None):
+        """
+        Evolução do preço de um produto (em todas as plataformas ou em uma).
+
+        Returns:
+            list: (momento, plataforma, descrição, preço) em ordem cronológica; preço None
+                  significa sem preço ou fora do catálogo a partir daquele momento
+        """
+        query = ('SELECT v.recorded_at, s.platform, s.detail, p.price FROM series s '
+                 'JOIN prices p ON p.series_id = s.id JOIN versions v ON v.id = p.version_id '
+                 'WHERE s.product = ?')
+        params = [str(product)]
+        if platform is not None:
+            query += ' AND s.platform = ?'
+            params.append(str(platform))
+        with span('history', mode='series'), self._connect() as conn:
+            return conn.execute(query + ' ORDER BY p.version_id, s.platform, s.detail', params).fetchall()
+
+    def changed_since(self, since):
+        """
+        Séries com preço diferente do que tinham no momento since (ex.: ontem).
+
+        A referência é a última versão gravada até since; se o histórico começou depois,
+        a primeira versão gravada (os produtos que já estavam nela não contam como novos).
+
+        Returns:
+            list: (produto, plataforma, descrição, preço anterior, preço atual, momento da última
+                  alteração), da alteração mais recente para a mais antiga; preço anterior None
+                  significa produto novo ou sem preço
+        """
+        with span('history', mode='changes') as sp, self._connect() as conn:
+            base = conn.execute('SELECT MAX(id) FROM versions WHERE recorded_at <= ?', (since,)).fetchone()[0]
+            if base is None:
+                base = conn.execute('SELECT MIN(id) FROM versions').fetchone()[0]
+            if base is None:
+                return []
+            rows = conn.execute(
+                'SELECT s.product, s.platform, s.detail, '
+                '  (SELECT p.price FROM prices p WHERE p.series_id = s.id AND p.version_id <= :base '
+                '   ORDER BY p.version_id DESC LIMIT 1), '
+                '  s.price, '
+                '  (SELECT v.recorded_at FROM prices p JOIN versions v ON v.id = p.version_id '
+                '   WHERE p.series_id = s.id ORDER BY p.version_id DESC LIMIT 1) AS changed_at '
+                'FROM series s WHERE s.id IN (SELECT series_id FROM prices WHERE version_id > :base) '
+                'ORDER BY changed_at DESC, s.product, s.platform',
+                {'base': base}
+            ).fetchall()
+            # Preços que mudaram e voltaram ao valor anterior não contam
+            rows = [row for row in rows if row[3] != row[4]]
+            sp.set(changes=len(rows))
+            return rows
+
+    def stats(self):
+        """Tamanho do histórico: séries, pontos gravados, versões com alterações e bytes em disco"""
+        with self._connect() as conn:
+            series, points, versions = conn.execute(
+                'SELECT (SELECT COUNT(*) FROM series), (SELECT COUNT(*) FROM prices), (SELECT COUNT(*) FROM versions)'
+            ).fetchone()
+        size = sum(os.path.getsize(self.path + suffix) for suffix in ('', '-wal')
+                   if os.path.exists(self.path + suffix))
+        return {'series': series, 'points': points, 'versions': versions, 'bytes': size}
+
+    def close(self):
+        """Encerra a thread de gravação (uma gravação em andamento é concluída ou desfeita por inteiro)"""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.shutdown(wait=False, cancel_futures=True)
@@ -1,12 +1,35 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, font as tkfont
+from tkinter import ttk, messagebox, filedialog, font as tkfont
 import pandas as pd
+import numpy as np
 import requests
 import os
 import sys
+import time
 import tempfile
+import hashlib
+import multiprocessing
 from datetime import datetime
 
+import tracing
+from tracing import span
+from scheduler import BackgroundScheduler
+from catalog_notifier import CatalogNotifier
+from cache_manager import get_cache
+from fingerprint import FrameFingerprint, content_hash, diff_fingerprints
+from excel_engine import ExcelFormatError, sniff_format
+from sheet_loader import CatalogSource, get_loader, load_catalog, normalize_column
+from aggregates import GroupSummary, ProductComparison
+from exporter import CatalogExporter, ExportCancelled
+from file_watcher import FileWatcher
+from stall_watchdog import StallWatchdog
+from data_service import DataService
+from http_transport import CONNECT_TIMEOUT, create_session, get_session, metrics as transport_metrics
+from resumable_download import DownloadError, download_resumable, validate_catalog_file
+from parallel_filter import get_executor
+from price_history import PriceHistory
+from query import QueryContext, QueryError, Term, compile_query, parse_number, resolve_column, split_keys
+
 # Verificar se as dependências necessárias estão instaladas
 openpyxl_installed = True
 xlrd_installed = True
@@ -33,7 +56,7 @@ if not openpyxl_installed and not xlrd_installed:
     sys.exit(1)
 
 # Configurações globais
-DEBUG = True  # Definir como False em produção
+DEBUG = os.environ.get('MEUAGENDAMENTO_DEBUG') == '1'  # Ativar com MEUAGENDAMENTO_DEBUG=1 (nunca em produção)
 OFFLINE_MODE = False  # Permite usar o aplicativo sem autenticação (True = modo offline, False = requer login)
 
 def debug_print(message):
@@ -41,12 +64,33 @@ def debug_print(message):
     if DEBUG:
         print(f"[DEBUG] {message}")
 
+# Configurações de rastreamento de desempenho (spans)
+TRACING_ENABLED = True  # Se False, os spans não têm custo perceptível
+TRACE_LOG_PATH = os.path.join(os.path.expanduser('~'), 'meuagendamentopro_files', 'logs', 'trace.jsonl')
+TRACE_BUFFER = None  # Buffer em memória com os últimos spans (configurado na inicialização)
+# Registro de travamentos da interface (callbacks que seguraram o laço do Tk por mais de 0,5 s)
+STALL_WATCHDOG_ENABLED = True
+STALL_LOG_PATH = os.path.join(os.path.expanduser('~'), 'meuagendamentopro_files', 'logs', 'stalls.jsonl')
+
 # Configure os seus endpoints aqui:
 AUTH_URL = 'http://meuagendamentopro.com.br/api/login'  # Endpoint de login do sistema Meu Agendamento PRO
+STATUS_URL = 'http://meuagendamentopro.com.br/api/user'  # Endpoint leve que valida o cookie da sessão
+
+# Configurações da verificação periódica de status (heartbeat)
+HEARTBEAT_MODE = True  # Se True, reaproveita o cookie da sessão; o login completo só é refeito se o cookie for rejeitado
+HEARTBEAT_MIN_INTERVAL = 30000  # Intervalo inicial e após falhas (30 segundos)
+HEARTBEAT_MAX_INTERVAL = 120000  # Intervalo máximo com a sessão estável (2 minutos)
+STATUS_TIMEOUT = 10  # Timeout (em segundos) das requisições de status
 
 # Configurações do arquivo Excel
 USE_REMOTE_FILE = True  # Se True, tenta baixar o arquivo do servidor
 CHECK_FILE_ON_STARTUP = False  # Se False, não verifica o arquivo no início
+# Arquivos adicionais do catálogo (ex.: um por fornecedor), lidos junto com o arquivo principal.
+# Todas as abas de todos os arquivos são lidas em paralelo e identificadas na coluna ORIGEM.
+EXTRA_CATALOG_FILES = []
+# Colunas ocultas ao iniciar: não são carregadas até serem exibidas pelo botão 'Colunas'
+# (ex.: 'DESCRIÇÃO DO SITE', texto longo que domina o tempo de preparo da tabela)
+HIDDEN_COLUMNS = ()
 # URL do arquivo Excel no servidor (agora usando a rota criada no servidor local)
 # Temos três opções para acessar o arquivo:
 # 1. Pela rota API específica: http://localhost:3003/api/dados/dados.xlsx
@@ -56,66 +100,151 @@ CHECK_FILE_ON_STARTUP = False  # Se False, não verifica o arquivo no início
 # Em produção, substitua 'localhost:3003' pelo domínio real do servidor
 EXCEL_URL = 'http://meuagendamentopro.com.br/api/dados/dados.xlsx'  # URL da API específica
 
+# Notificações de alteração do catálogo via WebSocket (requer: pip install websocket-client)
+CATALOG_PUSH_ENABLED = True  # Se True, recarrega os dados assim que o servidor avisar de uma alteração
+CATALOG_WS_URL = 'ws://meuagendamentopro.com.br/ws'  # Mesmo endpoint WebSocket usado pelo aplicativo web
+PUSH_FALLBACK_INTERVAL = 1800000  # Intervalo da verificação periódica enquanto o WebSocket está conectado (30 minutos)
+
+# Destaque das linhas alteradas por uma atualização do catálogo
+HIGHLIGHT_CHANGES = True  # Se False, as linhas são atualizadas sem destaque
+HIGHLIGHT_DURATION = 3000  # Tempo (em milissegundos) que o destaque permanece visível
+HIGHLIGHT_COLOR = '#fff3b0'  # Amarelo claro
+
+# Busca por código exato (leitor de código de barras)
+SCANNER_KEY_INTERVAL = 30  # Teclas mais próximas que isso (ms) são do leitor, não de uma pessoa
+SCANNER_IDLE_DELAY = 150  # Se o leitor não enviar Enter, buscar após esse tempo (ms) sem teclas
+
+# Catálogos grandes são filtrados por blocos em vários núcleos (ver parallel_filter); a primeira
+# página, com esta quantidade de linhas, aparece assim que os primeiros blocos terminam
+FIRST_PAGE_ROWS = 100
+
+# Cópia persistente do último catálogo válido (no cache do aplicativo), exibida imediatamente na
+# próxima inicialização enquanto a versão do servidor é verificada em segundo plano (stale-while-revalidate)
+CATALOG_CACHE_NAME = 'catalogo.xlsx'
+
+# Histórico local dos preços (SQLite): a cada versão nova do catálogo, só os preços alterados são gravados
+PRICE_HISTORY_ENABLED = True
+PRICE_HISTORY_PATH = os.path.join(os.path.expanduser('~'), 'meuagendamentopro_files', 'history', 'precos.sqlite')
+PRICE_CHANGES_WINDOW = 24 * 3600  # Janela 'alterados desde ontem' (em segundos)
+PRICE_CHANGES_SHOWN = 2000  # Máximo de alterações listadas na janela (as mais recentes)
+
+class CatalogFetchError(Exception):
+    """Erro ao obter ou validar o catálogo do servidor"""
+
+def read_excel_bytes(content, exclude=()):
+    """Lê todas as abas de um arquivo Excel em memória (abas inalteradas vêm do cache)"""
+    try:
+        return load_catalog([CatalogSource(content, 'catalogo')], exclude=exclude)
+    except ExcelFormatError as e:
+        raise CatalogFetchError(f"Conteúdo não é um Excel válido: {str(e)}")
+
+def fetch_catalog(url, timeout=30, known_hash=None, exclude=(), session=None):
+    """
+    Baixa e valida o catálogo do servidor. Não acessa a interface, podendo rodar em outra thread.
+    
+    Args:
+        url: Endereço do arquivo Excel
+        timeout: Timeout da requisição (em segundos)
+        known_hash: Hash do catálogo já carregado; se o conteúdo baixado for idêntico,
+                    a leitura do Excel é pulada e o DataFrame retornado é None
+        exclude: Colunas que não devem ser carregadas (continuam disponíveis no cache)
+        session: Sessão autenticada (None = sessão compartilhada do transporte)
+    
+    Returns:
+        tuple: (DataFrame ou None, hash SHA-256 do conteúdo, conteúdo em bytes)
+    
+    Raises:
+        requests.exceptions.RequestException: Falha de conexão
+        CatalogFetchError: Resposta inválida (erro HTTP, JSON, arquivo truncado ou ilegível)
+    """
+    with span('download', url=url) as sp:
+        response = (session or get_session()).get(url, timeout=(CONNECT_TIMEOUT, timeout))
+        sp.set(status=response.status_code, bytes=len(response.content))
+    
+    if response.status_code != 200:
+        raise CatalogFetchError(f"Erro ao acessar URL. Status code: {response.status_code}")
+    
+    content = response.content
+    # Verificar se o conteúdo é JSON (indica erro do servidor)
+    if content.lstrip().startswith(b'{'):
+        raise CatalogFetchError(f"O servidor retornou JSON em vez de um arquivo Excel: {content[:100]!r}")
+    # Arquivo Excel válido deve ser maior que isso (evita páginas de erro)
+    if len(content) < 100:
+        raise CatalogFetchError(f"O servidor retornou um arquivo muito pequeno ({len(content)} bytes)")
+    
+    digest = content_hash(content)
+    if known_hash is not None and digest == known_hash:
+        # Bytes idênticos ao catálogo carregado: nada a ler nem a redesenhar
+        debug_print("Conteúdo baixado idêntico ao catálogo carregado")
+        return None, digest, content
+    
+    df = read_excel_bytes(content, exclude)
+    if len(df.columns) == 0 and not exclude:
+        raise CatalogFetchError("O arquivo recebido não possui colunas")
+    return df, digest, content
+
+def save_catalog_cache(content):
+    """Grava o catálogo validado no cache persistente (arquivo temporário + renomeação atômica)"""
+    try:
+        file_path = get_cache().write_bytes(CATALOG_CACHE_NAME, content)
+        debug_print(f"Catálogo salvo no cache: {file_path}")
+    except Exception as e:
+        debug_print(f"Erro ao salvar catálogo no cache: {str(e)}")
+
+def describe_age(timestamp):
+    """Descreve há quanto tempo os dados foram obtidos (ex.: 'há 2 h 5 min')"""
+    seconds = max(0, int(time.time() - timestamp))
+    if seconds < 60:
+        return "há menos de 1 min"
+    minutes = seconds // 60
+    if minutes < 60:
+        return f"há {minutes} min"
+    hours = minutes // 60
+    if hours < 24:
+        return f"há {hours} h {minutes % 60} min"
+    return f"há {hours // 24} dia(s)"
+
+def file_sha256(file_path):
+    """Calcula o hash SHA-256 do conteúdo de um arquivo (o mesmo enviado pelo servidor nas notificações)"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def sources_digest(paths):
+    """Hash do catálogo local: o do arquivo principal, ou a combinação dos hashes de todos os arquivos"""
+    if len(paths) == 1:
+        return file_sha256(paths[0])
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(file_sha256(path).encode('ascii'))
+    return digest.hexdigest()
+
 # Função para baixar o arquivo Excel do servidor e salvá-lo em uma pasta temporária
 def download_excel_file(use_local_fallback=True):
     try:
-        # Criar diretório temporário para o aplicativo se não existir
-        temp_dir = tempfile.gettempdir()
-        temp_app_dir = os.path.join(temp_dir, 'meuagendamentopro')
-        os.makedirs(temp_app_dir, exist_ok=True)
-        
-        # Caminho para salvar o arquivo temporariamente
-        file_path = os.path.join(temp_app_dir, 'dados.xlsx')
+        # O arquivo baixado fica no cache persistente do aplicativo
+        cache = get_cache()
+        file_path = cache.path(CATALOG_CACHE_NAME)
         
         debug_print(f"Verificando arquivo Excel do servidor: {EXCEL_URL}")
         
         try:
-            # Baixar o arquivo do servidor
-            response = requests.get(EXCEL_URL, stream=True, timeout=30)
-            
-            if response.status_code == 200:
-                # Verificar se o conteúdo é realmente um arquivo Excel
-                content_type = response.headers.get('Content-Type', '')
-                
-                # Verificar se o conteúdo é JSON (indica erro do servidor)
-                if 'application/json' in content_type or response.text.strip().startswith('{'):
-                    debug_print(f"Erro: O servidor retornou JSON em vez de um arquivo Excel. Resposta: {response.text[:100]}")
-                    if use_local_fallback:
-                        debug_print("Problema no servidor. Usando arquivo local como fallback...")
-                        return use_local_file_fallback()
-                    return None
-                
-                # Verificar tamanho mínimo do arquivo (para evitar páginas de erro HTML)
-                if len(response.content) < 100:  # Arquivo Excel válido deve ser maior que isso
-                    debug_print(f"Erro: O servidor retornou um arquivo muito pequeno ({len(response.content)} bytes)")
-                    if use_local_fallback:
-                        debug_print("Arquivo inválido. Usando arquivo local como fallback...")
-                        return use_local_file_fallback()
-                    return None
-                
-                # Salvar o arquivo no diretório temporário
-                with open(file_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                
-                # Verificar se o arquivo salvo é um arquivo Excel válido
-                try:
-                    pd.read_excel(file_path, nrows=1)  # Tenta ler apenas a primeira linha para validar
-                    debug_print(f"Arquivo Excel baixado e validado com sucesso: {file_path}")
-                    return file_path
-                except Exception as e:
-                    debug_print(f"O arquivo baixado não é um Excel válido: {str(e)}")
-                    if use_local_fallback:
-                        debug_print("Arquivo inválido. Usando arquivo local como fallback...")
-                        return use_local_file_fallback()
-                    return None
-            else:
-                debug_print(f"Erro ao baixar arquivo Excel. Status code: {response.status_code}")
-                if use_local_fallback:
-                    debug_print("Tentando usar arquivo local como fallback...")
-                    return use_local_file_fallback()
-                return None
-                
+            # Download retomável: após uma queda, continua de onde parou (mesmo em outra execução);
+            # o arquivo só substitui o do cache depois de conferido (tamanho, hash e planilha válida)
+            download_resumable(EXCEL_URL, file_path, timeout=(CONNECT_TIMEOUT, 30),
+                               validate=validate_catalog_file,
+                               commit=lambda part_path: cache.commit_file(CATALOG_CACHE_NAME, part_path))
+            debug_print(f"Arquivo Excel baixado e validado com sucesso: {file_path}")
+            return file_path
+        
+        except DownloadError as e:
+            debug_print(f"Erro: {str(e)}")
+            if use_local_fallback:
+                debug_print("Arquivo inválido. Usando arquivo local como fallback...")
+                return use_local_file_fallback()
+            return None
         except requests.exceptions.RequestException as e:
             debug_print(f"Erro de conexão ao baixar arquivo: {str(e)}")
             if use_local_fallback:
@@ -188,7 +317,7 @@ base_path = os.path.dirname(os.path.abspath(__file__))
 XLSX_FILE_PATH = os.path.join(base_path, 'files', 'dados.xlsx')
 
 # Configurações globais
-DEBUG = True  # Definir como False em produção
+DEBUG = os.environ.get('MEUAGENDAMENTO_DEBUG') == '1'  # Ativar com MEUAGENDAMENTO_DEBUG=1 (nunca em produção)
 OFFLINE_MODE = False  # Permite usar o aplicativo sem autenticação (True = modo offline, False = requer login)
 
 def debug_print(message):
@@ -254,8 +383,8 @@ class LoginWindow:
         debug_print(f"Tentando login com usuário: {username}")
         debug_print(f"Endpoint de autenticação: {AUTH_URL}")
         
-        # Criar uma sessão para manter cookies
-        self.session = requests.Session()
+        # Criar uma sessão para manter cookies (conexões reaproveitadas e timeouts do transporte)
+        self.session = create_session()
         
         # Preparar dados e cabeçalhos
         login_data = {
@@ -276,17 +405,12 @@ class LoginWindow:
         
         try:
             debug_print(f"Enviando requisição para: {AUTH_URL}")
-            response = self.session.post(AUTH_URL, json=login_data, headers=headers)
+            with span('auth', mode='login') as sp:
+                response = self.session.post(AUTH_URL, json=login_data, headers=headers)
+                sp.set(status=response.status_code)
             
+            # Não registrar cabeçalhos, corpo ou cookies: contêm dados sensíveis da sessão
             debug_print(f"Status da resposta: {response.status_code}")
-            debug_print(f"Headers da resposta: {response.headers}")
-            
-            # Tentar analisar a resposta como JSON
-            try:
-                response_data = response.json()
-                debug_print(f"Corpo da resposta: {response_data}")
-            except Exception as e:
-                debug_print(f"Resposta não é JSON: {response.text}")
             
             # Verificar se o login foi bem-sucedido
             if response.status_code == 200:
@@ -295,9 +419,7 @@ class LoginWindow:
                     user_data = response.json()
                     debug_print("Login bem-sucedido com resposta JSON!")
                     
-                    # Armazenar cookies da sessão e dados do usuário
-                    debug_print(f"Cookies da sessão: {self.session.cookies.get_dict()}")
-                    debug_print(f"Dados do usuário: {user_data}")
+                    debug_print(f"Cookies de sessão recebidos: {len(self.session.cookies)}")
                     
                     # Verificar se o usuário está ativo
                     if user_data.get('isActive') is False:
@@ -481,24 +603,61 @@ class CSVFilterApp:
         self.user_data = user_data
         self.credentials = credentials
         self.is_closing = False  # Flag para controlar o encerramento da aplicação
-        self.status_check_id = None  # ID da verificação de status agendada
         self.excel_file_path = excel_file_path or XLSX_FILE_PATH  # Usar o caminho passado ou o padrão
         self.root.title('Visualizador de Produtos - Sistema de Verificação de Preços')
         self.root.geometry('1000x700')
         
-        # Intervalo de verificação do status do usuário (em milissegundos)
-        self.check_interval = 30000  # 30 segundos
+        # Intervalo de verificação do status do usuário (em milissegundos), ajustado conforme as respostas
+        self.check_interval = HEARTBEAT_MIN_INTERVAL
         
         # Intervalo para verificação de atualizações do arquivo (em milissegundos)
         self.file_check_interval = 300000  # 5 minutos
-        self.file_check_id = None  # ID da verificação de atualização do arquivo
         
-        # Configurar verificação periódica do status do usuário (apenas no modo online)
-        if not OFFLINE_MODE and self.session:
-            self.schedule_status_check()
-            
-        # Configurar verificação periódica de atualizações do arquivo
-        self.schedule_file_update_check()
+        # Agendador único das tarefas periódicas (jitter, backoff offline e pausa ao minimizar)
+        self.scheduler = BackgroundScheduler(self.root)
+        self.setup_scheduler()
+        
+        # Hash do conteúdo carregado, comparado com o das notificações do servidor
+        self.catalog_hash = None
+        # Hashes por linha e por coluna dos dados exibidos, usados para detectar o que mudou
+        self.catalog_fingerprint = None
+        self.last_diff = None
+        
+        # Arquivos de onde vieram os dados exibidos (caminhos ou conteúdo baixado), usados para
+        # carregar do cache as colunas ocultas quando o usuário decide exibi-las
+        self.catalog_sources = []
+        self.hidden_columns = {normalize_column(col) for col in HIDDEN_COLUMNS}
+        
+        # Linhas exibidas na Treeview: chave (PRODUTO+PLATAFORMA) -> [iid, hash da linha, tag de cor]
+        self.rendered_rows = {}
+        self.row_ids = 0  # Contador usado para gerar os iids da Treeview
+        self.pending_highlight = set()  # Chaves incluídas pela última atualização, destacadas ao aparecer
+        self.last_download_hash = None
+        self.catalog_timestamp = None  # Momento em que os dados exibidos foram obtidos
+        
+        # Assinatura opcional das notificações de catálogo (a verificação periódica continua como reserva)
+        self.catalog_notifier = None
+        if CATALOG_PUSH_ENABLED and USE_REMOTE_FILE:
+            self.start_catalog_notifier()
+        
+        # Histórico dos preços entre as versões do catálogo (gravado em segundo plano)
+        self.price_history = None
+        if PRICE_HISTORY_ENABLED:
+            try:
+                self.price_history = PriceHistory(PRICE_HISTORY_PATH)
+            except Exception as e:
+                debug_print(f"Histórico de preços indisponível: {str(e)}")
+        
+        # Detecção de travamentos da interface (qual callback, por quanto tempo e com quantos dados)
+        self.watchdog = None
+        if STALL_WATCHDOG_ENABLED:
+            self.watchdog = StallWatchdog(self.root, STALL_LOG_PATH)
+            self.watchdog.start()
+        
+        # No modo local, recarregar assim que a planilha for salva (em vez de verificar a cada 30 minutos)
+        self.file_watcher = None
+        if not USE_REMOTE_FILE:
+            self.start_file_watcher()
         
         # Tratamento do evento de fechamento da janela
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -534,14 +693,80 @@ class CSVFilterApp:
         reload_btn = ttk.Button(top_frame, text='Recarregar Dados', command=self.load_data)
         reload_btn.pack(side='right', padx=10)
         
+        # Botão para visualizar os tempos registrados e as estatísticas das tarefas
+        trace_btn = ttk.Button(top_frame, text='Desempenho', command=self.show_trace_viewer)
+        trace_btn.pack(side='right', padx=10)
+        
+        # Botão para comparar a plataforma mais barata de cada produto
+        compare_btn = ttk.Button(top_frame, text='Comparar Preços', command=self.show_price_comparison)
+        compare_btn.pack(side='right', padx=10)
+        
+        # Botão para ver os preços alterados desde ontem e a evolução do preço de um produto
+        history_btn = ttk.Button(top_frame, text='Histórico de Preços', command=self.show_price_history)
+        history_btn.pack(side='right', padx=10)
+        
+        # Botão para exportar as linhas filtradas (CSV ou XLSX, em segundo plano)
+        export_btn = ttk.Button(top_frame, text='Exportar', command=self.export_filtered)
+        export_btn.pack(side='right', padx=10)
+        self.exporter = None
+        
+        # Menu para exibir/ocultar colunas (colunas ocultas não são carregadas)
+        columns_btn = ttk.Menubutton(top_frame, text='Colunas')
+        self.columns_menu = tk.Menu(columns_btn, tearoff=False)
+        columns_btn['menu'] = self.columns_menu
+        columns_btn.pack(side='right', padx=10)
+        self.column_menu_vars = {}  # Nome da coluna -> BooleanVar (reaproveitadas entre recargas)
+        
         # Informações do arquivo
         file_frame = ttk.Frame(main_frame)
         file_frame.pack(fill='x', pady=(0, 10))
         
         file_name = os.path.basename(self.excel_file_path)
 
-        
+        # Colunas PRODUTO, PLATAFORMA e PREÇO (definidas em build_filters ao carregar os dados); os campos
+        # abaixo atualizam a tabela a cada tecla, inclusive antes da primeira carga ou após uma falha
+        self.produto_col = self.plataforma_col = self.preco_col = None
+
         # Frame para os filtros
+        # Consulta avançada (ex.: motorola preço<1000 plat:americanas, "moto g24" OR samsung, -usado)
+        query_frame = ttk.Frame(main_frame)
+        query_frame.pack(fill='x', padx=10, pady=(0, 10))
+        ttk.Label(query_frame, text="Consulta:", font=("Arial", 10, "bold")).pack(side='left')
+        self.query_var = tk.StringVar()
+        ttk.Entry(query_frame, textvariable=self.query_var, width=80).pack(side='left', padx=5, fill='x', expand=True)
+        ttk.Label(query_frame, text='ex.: motorola preço<1000 plat:americanas  |  "moto g" OR samsung  |  -usado',
+                  foreground='gray').pack(side='left', padx=5)
+        self.query_var.trace_add('write', lambda *args: self.update_table())
+        self.query_context = None  # Colunas preparadas e máscaras memorizadas do DataFrame atual
+        self.first_page_rendered = False  # Primeira página já exibida durante a avaliação por blocos
+        
+        # Faixa de preço (busca binária no índice ordenado da coluna PREÇO)
+        price_frame = ttk.Frame(main_frame)
+        price_frame.pack(fill='x', padx=10, pady=(0, 10))
+        ttk.Label(price_frame, text="Preço de:", font=("Arial", 10, "bold")).pack(side='left')
+        self.price_min_var = tk.StringVar()
+        ttk.Entry(price_frame, textvariable=self.price_min_var, width=12).pack(side='left', padx=5)
+        ttk.Label(price_frame, text="até:").pack(side='left')
+        self.price_max_var = tk.StringVar()
+        ttk.Entry(price_frame, textvariable=self.price_max_var, width=12).pack(side='left', padx=5)
+        self.price_bounds_var = tk.StringVar()
+        ttk.Label(price_frame, textvariable=self.price_bounds_var, foreground='gray').pack(side='left', padx=5)
+        self.price_min_var.trace_add('write', lambda *args: self.update_table())
+        self.price_max_var.trace_add('write', lambda *args: self.update_table())
+        
+        # Busca por código exato do PRODUTO (digitado, lido pelo leitor ou uma lista colada)
+        ttk.Label(price_frame, text="Código:", font=("Arial", 10, "bold")).pack(side='left', padx=(20, 0))
+        self.code_var = tk.StringVar()
+        code_entry = ttk.Entry(price_frame, textvariable=self.code_var, width=30)
+        code_entry.pack(side='left', padx=5)
+        code_entry.bind('<KeyPress>', self.on_code_key)
+        code_entry.bind('<Return>', lambda event: self.apply_codes())
+        ttk.Button(price_frame, text='Colar lista...', command=self.show_batch_lookup).pack(side='left', padx=5)
+        self.active_codes = []  # Códigos aplicados ao filtro
+        self.last_code_key = 0.0  # Momento da última tecla (detecção do leitor)
+        self.scanner_burst = False  # Leitura do leitor em andamento: aguardar o Enter
+        self.code_timer = None
+        
         filter_label = ttk.Label(main_frame, text="Filtros:", font=("Arial", 10, "bold"))
         filter_label.pack(anchor='w', padx=10, pady=(0, 5))
         
@@ -576,13 +801,40 @@ class CSVFilterApp:
         table_frame.grid_columnconfigure(0, weight=1)
         table_frame.grid_rowconfigure(0, weight=1)
         
+        # Ao selecionar uma linha, mostrar onde o produto está mais barato
+        self.tree.bind('<<TreeviewSelect>>', self.on_row_selected)
+        # Salvar as larguras das colunas quando o usuário redimensioná-las (registrado uma única vez:
+        # cada bind cria um novo comando Tcl, que só seria liberado ao destruir a tabela)
+        self.tree.bind('<ButtonRelease-1>', self.save_column_widths)
+        
+        # Resumo por plataforma do que está filtrado (quantidade e preços)
+        summary_frame = ttk.Frame(main_frame)
+        summary_frame.pack(fill='x', padx=10, pady=(5, 0))
+        summary_columns = ('plataforma', 'quantidade', 'minimo', 'media', 'maximo')
+        self.summary_tree = ttk.Treeview(summary_frame, columns=summary_columns, show='headings', height=4)
+        for key, title, anchor in zip(summary_columns, ("Plataforma", "Qtd.", "Mínimo", "Média", "Máximo"),
+                                      ('w', 'e', 'e', 'e', 'e')):
+            self.summary_tree.heading(key, text=title)
+            self.summary_tree.column(key, anchor=anchor, width=200 if key == 'plataforma' else 110)
+        self.summary_tree.pack(fill='x')
+        self.group_summary = None  # Códigos das plataformas e ordem por preço do DataFrame atual
+        self.rendered_summary = None  # Último resumo exibido (evita redesenhar o mesmo)
+        self.price_comparison = None  # Plataforma mais barata por produto (pivô produto x plataforma)
+        self.comparison_tree = None  # Tabela da janela de comparação, quando aberta
+        self.last_mask = None  # Máscara do filtro aplicado à tabela principal
+        
         # Status bar
         self.status_var = tk.StringVar()
-        status_bar = ttk.Label(main_frame, textvariable=self.status_var, relief=tk.SUNKEN, anchor='w')
-        status_bar.pack(fill='x', padx=10, pady=(5, 0))
+        status_frame = ttk.Frame(main_frame)
+        status_frame.pack(fill='x', padx=10, pady=(5, 0))
+        status_bar = ttk.Label(status_frame, textvariable=self.status_var, relief=tk.SUNKEN, anchor='w')
+        status_bar.pack(side='left', fill='x', expand=True)
+        # Visível apenas durante uma exportação
+        self.cancel_export_btn = ttk.Button(status_frame, text='Cancelar exportação', command=self.cancel_export)
         
         self.df = pd.DataFrame()
-        self.filter_vars = {}
+        self.filter_vars = {}  # Coluna -> StringVar do filtro (reaproveitadas entre recargas)
+        self.filter_traces = {}  # Coluna -> id do trace da StringVar (removido quando a coluna sai)
         
         # Agora carregamos os dados apenas após a inicialização da interface
         self.root.after(100, self.load_data)  # Carrega os dados após 100ms
@@ -596,65 +848,152 @@ class CSVFilterApp:
             self.root.update_idletasks()
             
             debug_print(f"Tentando carregar Excel diretamente da URL: {url}")
-            
-            # Tentar carregar o Excel diretamente da URL
-            try:
-                # Usar um timeout para evitar que a aplicação fique travada
-                response = requests.get(url, timeout=30)
-                
-                if response.status_code == 200:
-                    # Verificar se o conteúdo é JSON (indica erro do servidor)
-                    if response.text.strip().startswith('{'):
-                        debug_print(f"Erro: O servidor retornou JSON em vez de um arquivo Excel: {response.text[:100]}")
-                        return None
-                    
-                    # Carregar o Excel diretamente do conteúdo da resposta
-                    import io
-                    excel_data = io.BytesIO(response.content)
-                    
-                    try:
-                        # Tentar carregar com openpyxl
-                        debug_print("Tentando carregar dados da URL com engine='openpyxl'")
-                        df = pd.read_excel(excel_data, engine='openpyxl')
-                        debug_print(f"Excel carregado com sucesso da URL. {len(df)} registros encontrados.")
-                        return df
-                    except Exception as openpyxl_error:
-                        debug_print(f"Erro ao carregar com openpyxl da URL: {str(openpyxl_error)}")
-                        try:
-                            # Resetar o ponteiro do BytesIO
-                            excel_data.seek(0)
-                            # Tentar com xlrd
-                            debug_print("Tentando carregar dados da URL com engine='xlrd'")
-                            df = pd.read_excel(excel_data, engine='xlrd')
-                            debug_print(f"Excel carregado com sucesso da URL com xlrd. {len(df)} registros encontrados.")
-                            return df
-                        except Exception as xlrd_error:
-                            debug_print(f"Erro ao carregar com xlrd da URL: {str(xlrd_error)}")
-                            return None
-                else:
-                    debug_print(f"Erro ao acessar URL. Status code: {response.status_code}")
-                    return None
-            except requests.exceptions.RequestException as e:
-                debug_print(f"Erro de conexão ao acessar URL: {str(e)}")
-                return None
+            df, digest, content = fetch_catalog(url, exclude=tuple(self.hidden_columns), session=self.session)
+            self.last_download_hash = digest
+            self.catalog_sources = [CatalogSource(content, 'catalogo')]
+            save_catalog_cache(content)
+            debug_print(f"Excel carregado com sucesso da URL. {len(df)} registros encontrados.")
+            return df
+        except requests.exceptions.RequestException as e:
+            debug_print(f"Erro de conexão ao acessar URL: {str(e)}")
+            return None
         except Exception as e:
-            debug_print(f"Erro inesperado ao carregar dados da URL: {str(e)}")
+            debug_print(f"Erro ao carregar dados da URL: {str(e)}")
             return None
     
+    def load_cached_catalog(self):
+        """Exibe o catálogo salvo no cache persistente, informando a idade dos dados"""
+        cache = get_cache()
+        try:
+            with span('parse', source='cache'):
+                content = cache.read_bytes(CATALOG_CACHE_NAME)
+                if content is None:
+                    return False
+                df = read_excel_bytes(content, tuple(self.hidden_columns))
+        except Exception as e:
+            debug_print(f"Erro ao ler catálogo do cache: {str(e)}")
+            return False
+        
+        self.df = df
+        self.catalog_sources = [CatalogSource(content, 'catalogo')]
+        self.catalog_hash = content_hash(content)
+        self.catalog_fingerprint = FrameFingerprint(df)
+        # A data de modificação indica quando o conteúdo foi obtido/confirmado pelo servidor
+        self.catalog_timestamp = os.path.getmtime(cache.path(CATALOG_CACHE_NAME))
+        self.build_filters()
+        self.update_table()
+        self.status_var.set(f"Exibindo dados salvos {describe_age(self.catalog_timestamp)} "
+                            f"({len(self.df)} registros). Verificando atualizações do servidor...")
+        debug_print(f"Catálogo carregado do cache: {len(self.df)} registros")
+        return True
+    
+    def fetch_remote_catalog(self):
+        """Baixa e valida o catálogo do servidor (executada pelo agendador fora da thread da interface)"""
+        with span('refresh', trigger='revalidate'):
+            df, digest, content = fetch_catalog(EXCEL_URL, known_hash=self.catalog_hash,
+                                                exclude=tuple(self.hidden_columns), session=self.session)
+            if df is None:
+                # Conteúdo igual: apenas renovar a data do cache
+                if os.path.exists(get_cache().path(CATALOG_CACHE_NAME)):
+                    os.utime(get_cache().path(CATALOG_CACHE_NAME))
+                return None, digest, None, None
+            save_catalog_cache(content)
+            with span('fingerprint', rows=len(df)):
+                fingerprint = FrameFingerprint(df)
+        return df, digest, fingerprint, [CatalogSource(content, 'catalogo')]
+    
+    def apply_remote_catalog(self, result):
+        """Substitui os dados exibidos pela versão validada do servidor (thread da interface)"""
+        if self.is_closing:
+            return
+        df, digest, fingerprint, sources = result
+        self.catalog_timestamp = time.time()
+        
+        if df is None or digest == self.catalog_hash:
+            debug_print("Catálogo do servidor idêntico ao exibido")
+            self.status_var.set(f"Dados atualizados. {len(self.df)} registros encontrados.")
+            return
+        
+        # Colunas exibidas/ocultadas enquanto o download acontecia: recarregar com as atuais
+        if set(map(normalize_column, df.columns)) & self.hidden_columns or \
+                set(map(normalize_column, self.df.columns)) - set(map(normalize_column, df.columns)):
+            df = load_catalog(sources, exclude=tuple(self.hidden_columns))
+            fingerprint = FrameFingerprint(df)
+        self.catalog_sources = sources
+        
+        # Bytes diferentes não significam dados diferentes (ex.: planilha salva novamente)
+        diff = diff_fingerprints(self.catalog_fingerprint, fingerprint) if self.catalog_fingerprint else None
+        if diff is not None and diff.empty:
+            debug_print("Catálogo do servidor com os mesmos registros, mantendo a tabela")
+            self.catalog_hash = digest
+            self.catalog_fingerprint = fingerprint
+            self.status_var.set(f"Dados atualizados. {len(self.df)} registros encontrados.")
+            return
+        
+        with span('refresh', trigger='swap') as sp:
+            self.df = df
+            self.catalog_hash = digest
+            self.catalog_fingerprint = fingerprint
+            self.last_diff = diff
+            self.record_price_history(df, digest)
+            self.pending_highlight = set(diff.added) if diff is not None else set()
+            if self.price_comparison is not None and diff is not None and not diff.schema_changed:
+                # Recalcular apenas os produtos com linhas alteradas
+                with span('comparison', mode='patch'):
+                    self.price_comparison.patch(df, diff)
+            if diff is None or diff.schema_changed:
+                self.build_filters()
+            else:
+                # Mesmas colunas: manter os filtros digitados e atualizar apenas as opções
+                self.refresh_filter_values()
+                sp.set(changed=len(diff.changed), added=len(diff.added), removed=len(diff.removed))
+            self.update_table()
+        if diff is not None:
+            self.status_var.set(f"Dados atualizados com sucesso ({diff.summary()}). {len(self.df)} registros encontrados.")
+        else:
+            self.status_var.set(f"Dados atualizados com sucesso. {len(self.df)} registros encontrados.")
+    
+    def on_remote_catalog_error(self, error):
+        """Mantém os dados atuais na tela e informa que o servidor não respondeu"""
+        if self.is_closing:
+            return
+        debug_print(f"Erro ao verificar atualizações: {str(error)}")
+        if not self.df.empty and self.catalog_timestamp:
+            self.status_var.set(f"Servidor indisponível. Exibindo dados obtidos {describe_age(self.catalog_timestamp)} "
+                                f"({len(self.df)} registros).")
+        else:
+            self.status_var.set("Não foi possível verificar atualizações do servidor")
+    
     def load_data(self):
         """Carrega os dados do arquivo Excel"""
+        with span('refresh', trigger='load_data'):
+            self._load_data()
+
+    def _load_data(self):
+        """Implementação de load_data, executada dentro do span de atualização"""
         try:
             self.status_var.set("Carregando dados...")
             self.root.update_idletasks()
             
             # Tentar carregar diretamente da URL primeiro se estiver no modo remoto
             if USE_REMOTE_FILE:
+                # Exibir imediatamente o último catálogo válido e atualizar em segundo plano
+                if self.df.empty:
+                    self.load_cached_catalog()
+                if not self.df.empty:
+                    self.scheduler.run_now('file_update')
+                    return
+                
                 debug_print("Tentando carregar dados diretamente da URL...")
                 df = self.load_data_from_url(EXCEL_URL)
                 
                 if df is not None:
                     # Se conseguiu carregar da URL, usar esses dados
                     self.df = df
+                    self.catalog_hash = self.last_download_hash
+                    self.catalog_fingerprint = FrameFingerprint(df)
+                    self.record_price_history(df, self.catalog_hash)
+                    self.catalog_timestamp = time.time()
                     self.status_var.set(f"Dados carregados com sucesso do servidor. {len(self.df)} registros encontrados.")
                     debug_print(f"Dados carregados com sucesso diretamente da URL. {len(self.df)} registros encontrados.")
                     
@@ -694,71 +1033,72 @@ class CSVFilterApp:
             debug_print(f"Usando arquivo Excel: {self.excel_file_path}")
             debug_print(f"Tentando carregar o arquivo Excel: {self.excel_file_path}")
             
-            # Verificar se o arquivo está corrompido ou não é um arquivo Excel válido
+            # Ler todas as abas (e os arquivos adicionais) com o leitor adequado ao formato detectado
             try:
-                # Primeiro tenta com engine='openpyxl'
-                debug_print("Tentando carregar com engine='openpyxl'")
-                self.df = pd.read_excel(self.excel_file_path, engine='openpyxl')
-            except Exception as openpyxl_error:
-                debug_print(f"Erro ao carregar com openpyxl: {str(openpyxl_error)}")
-                try:
-                    # Se falhar, tenta com engine='xlrd'
-                    debug_print("Tentando carregar com engine='xlrd'")
-                    self.df = pd.read_excel(self.excel_file_path, engine='xlrd')
-                except Exception as xlrd_error:
-                    debug_print(f"Erro ao carregar com xlrd: {str(xlrd_error)}")
+                self.catalog_sources = [self.excel_file_path] + list(EXTRA_CATALOG_FILES)
+                self.df = load_catalog(self.catalog_sources, exclude=tuple(self.hidden_columns))
+            except ExcelFormatError as load_error:
+                debug_print(f"Erro ao carregar o arquivo Excel: {str(load_error)}")
+                
+                # Verificar se o arquivo está corrompido (assinatura desconhecida ou zip/OLE2 danificado)
+                if sniff_format(self.excel_file_path) is None or "zip" in str(load_error) or "corrupt" in str(load_error):
+                    # Arquivo provavelmente está corrompido, perguntar se deseja baixar novamente
+                    redownload = messagebox.askyesno(
+                        'Arquivo corrompido', 
+                        f"O arquivo Excel parece estar corrompido ou não é um arquivo Excel válido.\n\n" +
+                        f"Erro: {str(load_error)}\n\n" +
+                        f"Deseja tentar baixar o arquivo novamente do servidor?"
+                    )
+                
+                    if redownload:
+                        # Remover o arquivo corrompido
+                        try:
+                            os.remove(self.excel_file_path)
+                            debug_print(f"Arquivo corrompido removido: {self.excel_file_path}")
+                        except Exception as e:
+                            debug_print(f"Erro ao remover arquivo corrompido: {str(e)}")
                     
-                    # Verificar se o arquivo está corrompido
-                    if "not a zip file" in str(openpyxl_error) or "corrupt file" in str(xlrd_error):
-                        # Arquivo provavelmente está corrompido, perguntar se deseja baixar novamente
-                        redownload = messagebox.askyesno(
-                            'Arquivo corrompido', 
-                            f"O arquivo Excel parece estar corrompido ou não é um arquivo Excel válido.\n\n" +
-                            f"Erro: {str(openpyxl_error)}\n\n" +
-                            f"Deseja tentar baixar o arquivo novamente do servidor?"
-                        )
-                        
-                        if redownload:
-                            # Remover o arquivo corrompido
+                        # Baixar novamente
+                        self.status_var.set("Baixando arquivo do servidor...")
+                        self.root.update_idletasks()
+                    
+                        downloaded_file = download_excel_file()
+                    
+                        if downloaded_file and os.path.exists(downloaded_file):
+                            # Tentar carregar novamente
                             try:
-                                os.remove(self.excel_file_path)
-                                debug_print(f"Arquivo corrompido removido: {self.excel_file_path}")
+                                self.catalog_sources = [downloaded_file] + list(EXTRA_CATALOG_FILES)
+                                self.df = load_catalog(self.catalog_sources, exclude=tuple(self.hidden_columns))
+                                debug_print(f"Arquivo baixado e carregado com sucesso!")
                             except Exception as e:
-                                debug_print(f"Erro ao remover arquivo corrompido: {str(e)}")
-                            
-                            # Baixar novamente
-                            self.status_var.set("Baixando arquivo do servidor...")
-                            self.root.update_idletasks()
-                            
-                            downloaded_file = download_excel_file()
-                            
-                            if downloaded_file and os.path.exists(downloaded_file):
-                                # Tentar carregar novamente
-                                try:
-                                    self.df = pd.read_excel(downloaded_file, engine='openpyxl')
-                                    debug_print(f"Arquivo baixado e carregado com sucesso!")
-                                except Exception as e:
-                                    error_msg = f"O arquivo foi baixado, mas ainda não foi possível carregá-lo.\n\nErro: {str(e)}"
-                                    messagebox.showerror('Erro ao carregar arquivo', error_msg)
-                                    self.status_var.set("Erro ao carregar arquivo.")
-                                    return
-                            else:
-                                error_msg = "Não foi possível baixar o arquivo do servidor. Verifique sua conexão."
-                                messagebox.showerror('Erro ao baixar arquivo', error_msg)
-                                self.status_var.set("Erro: Não foi possível baixar o arquivo.")
+                                error_msg = f"O arquivo foi baixado, mas ainda não foi possível carregá-lo.\n\nErro: {str(e)}"
+                                messagebox.showerror('Erro ao carregar arquivo', error_msg)
+                                self.status_var.set("Erro ao carregar arquivo.")
                                 return
                         else:
-                            self.status_var.set("Operação cancelada pelo usuário.")
+                            error_msg = "Não foi possível baixar o arquivo do servidor. Verifique sua conexão."
+                            messagebox.showerror('Erro ao baixar arquivo', error_msg)
+                            self.status_var.set("Erro: Não foi possível baixar o arquivo.")
                             return
                     else:
-                        # Se não for problema de arquivo corrompido, exibe mensagem de erro detalhada
-                        error_msg = f"Não foi possível determinar o formato do arquivo Excel.\n\nErro openpyxl: {str(openpyxl_error)}\n\nErro xlrd: {str(xlrd_error)}\n\nVerifique se as bibliotecas 'openpyxl' e 'xlrd' estão instaladas:\npip install openpyxl xlrd"
-                        messagebox.showerror('Erro ao carregar arquivo Excel', error_msg)
-                        self.status_var.set("Erro ao carregar arquivo Excel. Verifique as dependências.")
+                        self.status_var.set("Operação cancelada pelo usuário.")
                         return
+                else:
+                    # Se não for problema de arquivo corrompido, exibe mensagem de erro detalhada
+                    error_msg = f"Não foi possível determinar o formato do arquivo Excel.\n\nErro: {str(load_error)}\n\nVerifique se as bibliotecas 'openpyxl' e 'xlrd' estão instaladas:\npip install openpyxl xlrd"
+                    messagebox.showerror('Erro ao carregar arquivo Excel', error_msg)
+                    self.status_var.set("Erro ao carregar arquivo Excel. Verifique as dependências.")
+                    return
             
             # Se chegou aqui, o arquivo foi carregado com sucesso
             debug_print(f"Arquivo carregado com sucesso. {len(self.df)} registros encontrados.")
+            try:
+                self.catalog_hash = sources_digest(self.catalog_sources)
+            except Exception as e:
+                debug_print(f"Erro ao calcular hash do arquivo: {str(e)}")
+                self.catalog_hash = None
+            self.catalog_fingerprint = FrameFingerprint(self.df)
+            self.record_price_history(self.df, self.catalog_hash)
             self.status_var.set(f"Dados carregados com sucesso. {len(self.df)} registros encontrados.")
             
             # Construir filtros e atualizar tabela
@@ -776,10 +1116,17 @@ class CSVFilterApp:
             return
 
     def build_filters(self):
-        # Limpa filtros antigos
+        with span('build_filters', columns=len(self.df.columns)):
+            self._build_filters()
+
+    def _build_filters(self):
+        # Limpa filtros antigos (destruir os widgets libera os comandos Tcl registrados por eles)
         for w in self.filter_frame.winfo_children():
             w.destroy()
-        self.filter_vars.clear()
+        self.filter_widgets = {}
+        # Variáveis de colunas que não existem mais: remover o trace e a variável
+        for col in [col for col in self.filter_vars if col not in self.df.columns]:
+            self.release_filter_var(col)
         
         # Imprimir os nomes das colunas para debug
         debug_print(f"Colunas no DataFrame: {list(self.df.columns)}")
@@ -809,7 +1156,7 @@ class CSVFilterApp:
         # Cria widgets de filtro para cada coluna
         for col in self.df.columns:
             ttk.Label(self.filter_frame, text=col).pack(side='left', padx=5)
-            var = tk.StringVar()
+            var = self.filter_var(col)
             
             # Usar Combobox com pesquisa para PRODUTO e PLATAFORMA (ou variações)
             if (self.produto_col and col == self.produto_col) or (self.plataforma_col and col == self.plataforma_col):
@@ -824,20 +1171,20 @@ class CSVFilterApp:
                 combo.pack(side='left', padx=5)
                 
                 # Configurar para permitir pesquisa (padrão do Combobox)
-                # Atualizar a tabela quando o valor mudar
-                var.trace_add('write', lambda *args, c=col: self.update_table())
+                # A tabela é atualizada quando o valor muda (trace da variável, criado uma única vez)
                 
                 # Também atualizar quando o usuário selecionar um item da lista
                 combo.bind('<<ComboboxSelected>>', lambda event, c=col: self.update_table())
+                self.filter_widgets[col] = combo
             else:
                 # Para outras colunas, usar Entry normal
                 ent = ttk.Entry(self.filter_frame, textvariable=var)
                 ent.pack(side='left', padx=5)
-                # Atualiza tabela sempre que variável muda
-                var.trace_add('write', lambda *args, c=col: self.update_table())
-            
-            self.filter_vars[col] = var
 
+        # Colunas novas: as linhas exibidas precisam ser recriadas
+        self.tree.delete(*self.tree.get_children())
+        self.rendered_rows.clear()
+        
         # Configura colunas da Treeview
         self.tree['columns'] = list(self.df.columns)
         
@@ -863,9 +1210,192 @@ class CSVFilterApp:
                 self.tree.column(col, width=100, minwidth=50, stretch=False, anchor='w')
             else:
                 self.tree.column(col, width=100, minwidth=50, stretch=False, anchor='w')
-                
-        # Adicionar evento para salvar as larguras das colunas quando o usuário redimensioná-las
-        self.tree.bind('<ButtonRelease-1>', self.save_column_widths)
+        
+        self.build_column_menu()
+
+    def filter_var(self, col):
+        """StringVar do filtro da coluna, criada (com o trace que atualiza a tabela) apenas na primeira vez"""
+        var = self.filter_vars.get(col)
+        if var is None:
+            var = self.filter_vars[col] = tk.StringVar()
+            self.filter_traces[col] = var.trace_add('write', lambda *args: self.update_table())
+        return var
+
+    def release_filter_var(self, col):
+        """Remove o trace (e o comando Tcl dele) e descarta a variável do filtro"""
+        var = self.filter_vars.pop(col)
+        trace_id = self.filter_traces.pop(col, None)
+        if trace_id is not None:
+            var.trace_remove('write', trace_id)
+
+    def build_column_menu(self):
+        """Lista todas as colunas do catálogo no menu 'Colunas', inclusive as ocultas (ainda não carregadas)"""
+        self.columns_menu.delete(0, 'end')  # Também libera os comandos Tcl das opções
+        try:
+            names = get_loader().available_columns(self.catalog_sources) if self.catalog_sources else list(self.df.columns)
+        except Exception as e:
+            debug_print(f"Erro ao listar as colunas do catálogo: {str(e)}")
+            names = list(self.df.columns)
+        for name in names:
+            # Manter a referência (o Tk não guarda a variável); a mesma variável serve às próximas recargas
+            var = self.column_menu_vars.get(name)
+            if var is None:
+                var = self.column_menu_vars[name] = tk.BooleanVar()
+            var.set(normalize_column(name) not in self.hidden_columns)
+            self.columns_menu.add_checkbutton(label=str(name).strip(), variable=var,
+                                              command=lambda n=name: self.toggle_column(n))
+        # Colunas que deixaram de existir no catálogo
+        for name in [name for name in self.column_menu_vars if name not in names]:
+            del self.column_menu_vars[name]
+
+    def toggle_column(self, name):
+        """Exibe ou oculta uma coluna; ao exibir, ela é carregada do cache, sem reler a planilha"""
+        key = normalize_column(name)
+        saved_filters = {normalize_column(col): var.get() for col, var in self.filter_vars.items()}
+        with span('toggle_column', column=key, show=key in self.hidden_columns):
+            if key in self.hidden_columns:
+                self.hidden_columns.discard(key)
+                try:
+                    self.df = load_catalog(self.catalog_sources, exclude=tuple(self.hidden_columns))
+                except Exception as e:
+                    debug_print(f"Erro ao carregar a coluna {name}: {str(e)}")
+                    self.hidden_columns.add(key)
+                    self.status_var.set(f"Não foi possível carregar a coluna {str(name).strip()}")
+                    self.build_column_menu()
+                    return
+            else:
+                self.hidden_columns.add(key)
+                self.df = self.df[[col for col in self.df.columns if normalize_column(col) != key]]
+            self.catalog_fingerprint = FrameFingerprint(self.df)
+            self.build_filters()
+            # Restaurar os filtros digitados nas colunas que continuam visíveis
+            for col, var in self.filter_vars.items():
+                if saved_filters.get(normalize_column(col)):
+                    var.set(saved_filters[normalize_column(col)])
+            self.update_table()
+
+    def refresh_filter_values(self):
+        """Atualiza as opções dos comboboxes sem recriar os filtros (o texto digitado é mantido)"""
+        for col, combo in getattr(self, 'filter_widgets', {}).items():
+            if col in self.df.columns:
+                combo['values'] = sorted(self.df[col].dropna().unique().tolist())
+
+    def show_trace_viewer(self):
+        """Exibe as tarefas agendadas e os últimos spans registrados (do mais recente ao mais antigo)"""
+        window = tk.Toplevel(self.root)
+        window.title('Desempenho - Últimas operações')
+        window.geometry('800x550')
+        
+        # Estatísticas das tarefas periódicas do agendador
+        jobs_label = ttk.Label(window, text='Tarefas agendadas', font=("Arial", 10, "bold"))
+        job_columns = ('tarefa', 'execucoes', 'falhas', 'agrupadas', 'offline', 'media', 'proxima', 'erro')
+        jobs_tree = ttk.Treeview(window, columns=job_columns, show='headings', height=4)
+        for col, text, width in (('tarefa', 'Tarefa', 110), ('execucoes', 'Execuções', 80),
+                                 ('falhas', 'Falhas', 60), ('agrupadas', 'Agrupadas', 80),
+                                 ('offline', 'Puladas (offline)', 110), ('media', 'Média (ms)', 80),
+                                 ('proxima', 'Próxima (s)', 80), ('erro', 'Último erro', 200)):
+            jobs_tree.heading(col, text=text)
+            jobs_tree.column(col, width=width, anchor='w')
+        
+        # Requisições HTTP por servidor (requisições muito acima das conexões = keep-alive funcionando)
+        hosts_label = ttk.Label(window, text='Conexões por servidor', font=("Arial", 10, "bold"))
+        host_columns = ('servidor', 'requisicoes', 'conexoes', 'tentativas', 'falhas', 'erros', 'media', 'kb')
+        hosts_tree = ttk.Treeview(window, columns=host_columns, show='headings', height=3)
+        for col, text, width in (('servidor', 'Servidor', 220), ('requisicoes', 'Requisições', 80),
+                                 ('conexoes', 'Conexões', 70), ('tentativas', 'Novas tentativas', 100),
+                                 ('falhas', 'Sem resposta', 90), ('erros', 'Erros HTTP', 70),
+                                 ('media', 'Média (ms)', 80), ('kb', 'KB', 70)):
+            hosts_tree.heading(col, text=text)
+            hosts_tree.column(col, width=width, anchor='w')
+        
+        columns = ('operacao', 'duracao', 'thread', 'detalhes')
+        tree = ttk.Treeview(window, columns=columns, show='headings')
+        tree.heading('operacao', text='Operação')
+        tree.heading('duracao', text='Duração (ms)')
+        tree.heading('thread', text='Thread')
+        tree.heading('detalhes', text='Detalhes')
+        tree.column('operacao', width=200, anchor='w')
+        tree.column('duracao', width=100, anchor='e')
+        tree.column('thread', width=120, anchor='w')
+        tree.column('detalhes', width=360, anchor='w')
+        
+        vsb = ttk.Scrollbar(window, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        
+        def refresh():
+            stats = self.scheduler.stats()
+            jobs_label.config(text=f"Tarefas agendadas (conexão: {'offline' if stats['circuit'] == 'open' else 'online'}"
+                                   f"{', pausado' if stats['paused'] else ''})")
+            jobs_tree.delete(*jobs_tree.get_children())
+            for job in stats['jobs']:
+                jobs_tree.insert('', 'end', values=(
+                    job['name'], job['runs'], job['failures'], job['coalesced'], job['skipped_offline'],
+                    job['avg_duration_ms'] if job['avg_duration_ms'] is not None else '-',
+                    job['next_in_s'] if job['next_in_s'] is not None else '-',
+                    job['last_error'] or ''
+                ))
+            
+            hosts_tree.delete(*hosts_tree.get_children())
+            for host in transport_metrics():
+                hosts_tree.insert('', 'end', values=(
+                    host['host'], host['requests'], host['connections'], host['retries'], host['failures'],
+                    host['errors'], host['avg_ms'] if host['avg_ms'] is not None else '-', round(host['bytes'] / 1024)
+                ))
+            
+            tree.delete(*tree.get_children())
+            if TRACE_BUFFER is None:
+                return
+            for record in reversed(TRACE_BUFFER.records()):
+                # Recuo proporcional à profundidade para mostrar o aninhamento
+                name = '  ' * record['depth'] + record['name']
+                details = ', '.join(f"{k}={v}" for k, v in record['attrs'].items())
+                if record['error']:
+                    details = f"{details} ERRO: {record['error']}".strip()
+                tree.insert('', 'end', values=(name, f"{record['duration_ms']:.1f}", record['thread'], details))
+        
+        buttons = ttk.Frame(window)
+        buttons.pack(side='bottom', pady=5)
+        ttk.Button(buttons, text='Atualizar', command=refresh).pack(side='left', padx=5)
+        ttk.Button(buttons, text='Travamentos da interface', command=self.show_stall_viewer).pack(side='left', padx=5)
+        jobs_label.pack(anchor='w', padx=5, pady=(5, 0))
+        jobs_tree.pack(fill='x', padx=5, pady=(0, 5))
+        hosts_label.pack(anchor='w', padx=5)
+        hosts_tree.pack(fill='x', padx=5, pady=(0, 5))
+        tree.pack(side='left', fill='both', expand=True)
+        vsb.pack(side='right', fill='y')
+        refresh()
+
+    def show_stall_viewer(self):
+        """Exibe os travamentos da interface registrados nesta sessão, com a pilha de cada um"""
+        window = tk.Toplevel(self.root)
+        window.title('Desempenho - Travamentos da interface')
+        window.geometry('900x600')
+        
+        ttk.Label(window, text=f"Registro completo: {STALL_LOG_PATH}", foreground='gray').pack(anchor='w', padx=5, pady=5)
+        columns = ('quando', 'duracao', 'callback', 'operacao')
+        tree = ttk.Treeview(window, columns=columns, show='headings', height=10)
+        for col, text, width, anchor in (('quando', 'Quando', 150, 'w'), ('duracao', 'Duração (ms)', 90, 'e'),
+                                         ('callback', 'Callback', 220, 'w'), ('operacao', 'Operação', 420, 'w')):
+            tree.heading(col, text=text)
+            tree.column(col, width=width, anchor=anchor)
+        tree.pack(fill='x', padx=5)
+        stack_text = tk.Text(window, height=18, font=('Courier', 9))
+        stack_text.pack(fill='both', expand=True, padx=5, pady=5)
+        
+        records = list(reversed(self.watchdog.records())) if self.watchdog else []
+        for i, record in enumerate(records):
+            tree.insert('', 'end', iid=str(i), values=(record['ts'].replace('T', ' '), record['duration_ms'],
+                                                       record['callback'] or '-', record['operation'] or '-'))
+        
+        def show_stack(event=None):
+            selection = tree.selection()
+            stack_text.delete('1.0', 'end')
+            if selection:
+                stack_text.insert('1.0', records[int(selection[0])]['stack'])
+        
+        tree.bind('<<TreeviewSelect>>', show_stack)
+        if not records:
+            stack_text.insert('1.0', 'Nenhum travamento registrado nesta sessão.')
 
     def save_column_widths(self, event=None):
         """Salva as larguras das colunas quando o usuário as redimensiona"""
@@ -876,6 +1406,10 @@ class CSVFilterApp:
         
     def calculate_column_widths(self):
         """Calcula a largura ideal para cada coluna com base no conteúdo"""
+        with span('column_widths', columns=len(self.df.columns)):
+            return self._calculate_column_widths()
+
+    def _calculate_column_widths(self):
         column_widths = {}
         font = tkfont.Font(family="TkDefaultFont", size=10)  # Fonte padrão do tkinter
         
@@ -943,146 +1477,617 @@ class CSVFilterApp:
         return column_widths
         
     def update_table(self):
-        df = self.df.copy()
+        with span('update_table', rows=len(self.df)):
+            self._update_table()
+
+    def _update_table(self):
+        # Máscaras memorizadas por termo: ao editar um filtro, só ele é avaliado novamente
+        if self.query_context is None or self.query_context.df is not self.df:
+            self.query_context = QueryContext(self.df, get_executor())
+            self.update_price_bounds()
+            self.group_summary = GroupSummary(self.df, self.plataforma_col, self.preco_col) \
+                if self.plataforma_col and self.preco_col and len(self.df) else None
+        if self.price_comparison is None or self.price_comparison.df is not self.df:
+            with span('comparison', mode='build'):
+                self.price_comparison = ProductComparison(self.df, self.produto_col, self.plataforma_col,
+                                                          self.preco_col) \
+                    if self.produto_col and self.plataforma_col and self.preco_col and len(self.df) else None
+        
         # Aplica filtros
-        for col, var in self.filter_vars.items():
-            val = var.get().strip()
-            if val:
-                df = df[df[col].astype(str).str.contains(val, case=False, na=False)]
+        with span('filter') as sp:
+            nodes = [Term(col, 'contains', var.get().strip().lower())
+                     for col, var in self.filter_vars.items() if var.get().strip()]
+            query_node = self.query_node()
+            self.first_page_rendered = False
+            mask = self.query_context.combined_mask(nodes + [query_node],
+                                                    [self.price_range_mask(), self.code_mask()],
+                                                    on_partial=self.render_first_page)
+            if mask is None:
+                mask = np.ones(len(self.df), dtype=bool)
+            if query_node is not None and not self.active_codes:
+                matched = int(self.query_context.mask(query_node).sum())
+                self.status_var.set(f"Consulta: {matched} registros encontrados.")
+            df = self.df[mask]
+            sp.set(matched=len(df), evaluated=self.query_context.evaluated)
+
+        self.last_mask = mask
+        with span('summary'):
+            self.update_summary(mask)
+        if self.comparison_tree is not None:
+            self.update_comparison_view()
 
         # Configurar as tags para as cores alternadas (se ainda não estiverem configuradas)
         if not hasattr(self, 'tags_configured'):
             # Configurar as cores para as linhas alternadas
             self.tree.tag_configure('odd', background='#f0f0f0')  # Cinza claro para linhas ímpares
             self.tree.tag_configure('even', background='white')   # Branco para linhas pares
+            self.tree.tag_configure('changed', background=HIGHLIGHT_COLOR)  # Linhas alteradas (temporário)
             self.tags_configured = True
 
-        # Atualiza Treeview
-        self.tree.delete(*self.tree.get_children())
+        with span('render', rows=len(df)) as sp:
+            sp.set(**self._render_rows(df))
+
+    def render_first_page(self, mask, end):
+        """
+        Exibe as primeiras linhas do resultado enquanto os demais blocos do catálogo ainda
+        são avaliados (chamado pela avaliação por blocos a cada bloco concluído, em ordem).
+        A renderização final mantém essas linhas e acrescenta as demais.
+        """
+        if self.first_page_rendered or end >= len(self.df):
+            return
+        positions = np.flatnonzero(mask[:end])
+        if len(positions) < FIRST_PAGE_ROWS:
+            return
+        self.first_page_rendered = True
+        # Os destaques pendentes valem também para as linhas que só entram na renderização final
+        pending = self.pending_highlight
+        with span('render', rows=FIRST_PAGE_ROWS, partial=True):
+            self._render_rows(self.df.iloc[positions[:FIRST_PAGE_ROWS]])
+        self.pending_highlight = pending
+        self.root.update_idletasks()
+
+    def query_node(self):
+        """Condição da consulta avançada (None se vazia ou inválida; o erro aparece na barra de status)"""
+        text = self.query_var.get().strip()
+        if not text:
+            return None
+        try:
+            node = compile_query(text)
+            if node is None:
+                return None
+            # Coluna oculta pesquisada: carregá-la do cache e filtrar em seguida
+            for field in node.fields():
+                if resolve_column(field, self.df.columns) is None:
+                    col = resolve_column(field, get_loader().available_columns(self.catalog_sources)) \
+                        if self.catalog_sources else None
+                    if col is not None and normalize_column(col) in self.hidden_columns:
+                        self.status_var.set(f"Carregando a coluna {col.strip()}...")
+                        self.root.after_idle(lambda c=col: self.toggle_column(c))
+                        return None
+                    self.query_context.column(field)
+        except QueryError as e:
+            self.status_var.set(f"Consulta inválida: {str(e)}")
+            return None
+        return node
+
+    def update_summary(self, mask):
+        """Atualiza o resumo por plataforma (nada é recalculado se o filtro não mudou)"""
+        stats = self.group_summary.summarize(mask) if self.group_summary else None
+        if stats is self.rendered_summary:
+            return
+        self.rendered_summary = stats
+        self.summary_tree.delete(*self.summary_tree.get_children())
+        if stats is None:
+            return
+        for group, count, minimum, mean, maximum in stats.rows():
+            prices = [self.format_price(v) if v is not None else '-' for v in (minimum, mean, maximum)]
+            self.summary_tree.insert('', 'end', values=(group, count, *prices))
+
+    def describe_cheapest(self, product):
+        """Texto curto com a plataforma mais barata do produto (ou None sem comparação)"""
+        result = self.price_comparison.lookup(product) if self.price_comparison else None
+        if result is None:
+            return None
+        price, platform, second, spread = result
+        text = f"{str(product).strip()}: mais barato em {platform} ({self.format_price(price)})"
+        if second is not None:
+            text += f", {self.format_price(spread)} a menos que {second}"
+        return text
+
+    def selected_product(self):
+        """PRODUTO da linha selecionada na tabela principal (ou None)"""
+        selection = self.tree.selection()
+        if not selection or not self.produto_col or self.produto_col not in self.df.columns:
+            return None
+        values = self.tree.item(selection[0], 'values')
+        position = list(self.df.columns).index(self.produto_col)
+        return values[position] if position < len(values) else None
+
+    def on_row_selected(self, event=None):
+        """Mostra na barra de status onde o produto da linha selecionada está mais barato"""
+        product = self.selected_product()
+        if product is not None:
+            text = self.describe_cheapest(product)
+            if text:
+                self.status_var.set(text)
+
+    def show_price_comparison(self):
+        """Janela com a plataforma mais barata de cada produto do filtro atual"""
+        if self.comparison_tree is not None:
+            self.comparison_tree.winfo_toplevel().lift()
+            return
+        window = tk.Toplevel(self.root)
+        window.title('Comparação de preços por plataforma')
+        window.geometry('800x450')
+        
+        columns = ('produto', 'melhor', 'plataforma', 'segunda', 'diferenca')
+        tree = ttk.Treeview(window, columns=columns, show='headings')
+        for key, text, width, anchor in (('produto', 'Produto', 240, 'w'), ('melhor', 'Melhor preço', 110, 'e'),
+                                         ('plataforma', 'Plataforma', 150, 'w'),
+                                         ('segunda', 'Segunda opção', 150, 'w'), ('diferenca', 'Diferença', 110, 'e')):
+            tree.heading(key, text=text)
+            tree.column(key, width=width, anchor=anchor)
+        vsb = ttk.Scrollbar(window, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        tree.pack(side='left', fill='both', expand=True)
+        vsb.pack(side='right', fill='y')
+        
+        def close():
+            self.comparison_tree = None
+            window.destroy()
+        
+        window.protocol("WM_DELETE_WINDOW", close)
+        self.comparison_tree = tree
+        self.update_comparison_view()
+
+    def update_comparison_view(self):
+        """Preenche a janela de comparação com os produtos presentes no filtro atual"""
+        tree = self.comparison_tree
+        tree.delete(*tree.get_children())
+        if self.price_comparison is None:
+            return
+        with span('comparison', mode='view'):
+            for product, price, platform, second, spread in self.price_comparison.rows(self.last_mask):
+                tree.insert('', 'end', values=(product, self.format_price(price), platform, second or '-',
+                                               self.format_price(spread) if spread is not None else '-'))
+
+    def record_price_history(self, df, digest):
+        """
+        Agenda a gravação dos preços alterados nesta versão do catálogo (fora da thread da interface).
+        Colunas da chave ocultas na tabela são lidas dos arquivos do catálogo pelo próprio histórico.
+        """
+        if self.price_history is None or df is None or df.empty:
+            return
+        try:
+            self.price_history.submit(df, digest, sources=self.catalog_sources)
+        except Exception as e:
+            debug_print(f"Erro ao agendar gravação do histórico de preços: {str(e)}")
+
+    def show_price_history(self):
+        """Janela com os preços alterados desde ontem e a evolução do preço do produto escolhido"""
+        if self.price_history is None:
+            messagebox.showinfo('Histórico de Preços', 'O histórico de preços está desativado ou indisponível.')
+            return
+        window = tk.Toplevel(self.root)
+        window.title('Histórico de preços')
+        window.geometry('950x600')
         
-        # Contador para alternar as cores das linhas
-        row_count = 0
+        def when(timestamp):
+            return datetime.fromtimestamp(timestamp).strftime("%d/%m/%Y %H:%M")
         
-        for _, row in df.iterrows():
-            vals = []
-            for c in self.df.columns:
-                # Formatar a coluna PREÇO no padrão brasileiro (R$ com pontos e vírgulas)
-                if self.preco_col and c == self.preco_col:
-                    try:
-                        # Converter para float caso seja string
-                        if isinstance(row[c], str):
-                            # Remover caracteres não numéricos exceto ponto decimal
-                            price_str = ''.join(char for char in row[c] if char.isdigit() or char == '.')
-                            price_value = float(price_str)
-                        else:
-                            price_value = float(row[c])
-                            
-                        # Formatar no padrão brasileiro
-                        formatted_price = f"R$ {price_value:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-                        vals.append(formatted_price)
-                    except (ValueError, TypeError):
-                        # Se não conseguir converter, manter o valor original
-                        vals.append(str(row[c]))
-                else:
-                    vals.append(row[c])
-            
-            # Determinar a tag com base no número da linha (par ou ímpar)
-            tag = 'odd' if row_count % 2 == 1 else 'even'
-            
-            # Inserir a linha com a tag apropriada
-            self.tree.insert('', 'end', values=vals, tags=(tag,))
-            
-            # Incrementar o contador de linhas
-            row_count += 1
-            
-    def schedule_status_check(self):
-        """Agenda a próxima verificação de status do usuário"""
-        # Não agendar nova verificação se a aplicação estiver sendo encerrada
+        def price(value):
+            return self.format_price(value) if value is not None else '-'
+        
+        since = time.time() - PRICE_CHANGES_WINDOW
+        try:
+            changes = self.price_history.changed_since(since)
+        except Exception as e:
+            debug_print(f"Erro ao consultar histórico de preços: {str(e)}")
+            changes = []
+        shown = f", exibindo as {PRICE_CHANGES_SHOWN} mais recentes" if len(changes) > PRICE_CHANGES_SHOWN else ''
+        ttk.Label(window, text=f"Preços alterados desde {when(since)} ({len(changes)}{shown})",
+                  font=("Arial", 10, "bold")).pack(anchor='w', padx=5, pady=(5, 0))
+        columns = ('produto', 'plataforma', 'descricao', 'anterior', 'atual', 'variacao', 'quando')
+        changes_tree = ttk.Treeview(window, columns=columns, show='headings', height=12)
+        for key, text, width, anchor in (('produto', 'Produto', 120, 'w'), ('plataforma', 'Plataforma', 120, 'w'),
+                                         ('descricao', 'Descrição', 250, 'w'), ('anterior', 'Anterior', 100, 'e'),
+                                         ('atual', 'Atual', 100, 'e'), ('variacao', 'Variação', 100, 'e'),
+                                         ('quando', 'Alterado em', 120, 'w')):
+            changes_tree.heading(key, text=text)
+            changes_tree.column(key, width=width, anchor=anchor)
+        changes_tree.pack(fill='x', padx=5)
+        for i, (product, platform, detail, before, after, changed_at) in enumerate(changes[:PRICE_CHANGES_SHOWN]):
+            if before is None:
+                variation = 'novo' if after is not None else '-'
+            elif after is None:
+                variation = 'removido'
+            else:
+                variation = ('+' if after > before else '-') + self.format_price(abs(after - before))
+            changes_tree.insert('', 'end', iid=str(i), values=(product, platform, detail, price(before), price(after),
+                                                              variation, when(changed_at)))
+        
+        series_label = ttk.Label(window, text='Evolução do preço: selecione um produto acima ou na tabela principal',
+                                 font=("Arial", 10, "bold"))
+        series_label.pack(anchor='w', padx=5, pady=(10, 0))
+        series_columns = ('quando', 'plataforma', 'descricao', 'preco')
+        series_tree = ttk.Treeview(window, columns=series_columns, show='headings')
+        for key, text, width, anchor in (('quando', 'Quando', 130, 'w'), ('plataforma', 'Plataforma', 150, 'w'),
+                                         ('descricao', 'Descrição', 400, 'w'), ('preco', 'Preço', 110, 'e')):
+            series_tree.heading(key, text=text)
+            series_tree.column(key, width=width, anchor=anchor)
+        series_tree.pack(fill='both', expand=True, padx=5, pady=(0, 5))
+        
+        def show_series(product):
+            series_tree.delete(*series_tree.get_children())
+            series_label.config(text=f"Evolução do preço: {product}")
+            for timestamp, platform, detail, value in self.price_history.series(product):
+                series_tree.insert('', 'end', values=(when(timestamp), platform, detail, price(value)))
+        
+        def on_change_selected(event=None):
+            selection = changes_tree.selection()
+            if selection:
+                show_series(changes[int(selection[0])][0])
+        
+        changes_tree.bind('<<TreeviewSelect>>', on_change_selected)
+        product = self.selected_product()
+        if product is not None:
+            show_series(product)
+
+    def on_code_key(self, event):
+        """
+        Teclas no campo de código. Digitação humana filtra a cada tecla; rajadas de teclas
+        (leitor de código de barras) só são aplicadas no Enter ou após uma pausa.
+        """
+        if event.keysym == 'Return':
+            return
+        now = time.perf_counter()
+        self.scanner_burst = (now - self.last_code_key) * 1000 < SCANNER_KEY_INTERVAL
+        self.last_code_key = now
+        if self.code_timer is not None:
+            self.root.after_cancel(self.code_timer)
+        # Após a tecla ser inserida no campo: ao fim da rajada (leitor) ou, para uma tecla isolada,
+        # depois de SCANNER_KEY_INTERVAL. A primeira tecla de uma leitura também parece isolada e
+        # só a seguinte revela a rajada: sem a espera, cada leitura começaria filtrando pelo 1º dígito
+        delay = SCANNER_IDLE_DELAY if self.scanner_burst else SCANNER_KEY_INTERVAL
+        self.code_timer = self.root.after(delay, self.apply_codes)
+
+    def apply_codes(self, text=None):
+        """Aplica os códigos do campo (ou de uma lista colada) ao filtro"""
+        if self.code_timer is not None:
+            self.root.after_cancel(self.code_timer)
+            self.code_timer = None
+        self.scanner_burst = False
+        if text is not None:
+            self.code_var.set(text)
+        codes = split_keys(self.code_var.get())
+        if codes == self.active_codes:
+            return
+        self.active_codes = codes
+        self.update_table()
+
+    def code_mask(self):
+        """Máscara das linhas dos códigos aplicados (None se nenhum código)"""
+        if not self.active_codes or not self.produto_col:
+            return None
+        with span('code_lookup', codes=len(self.active_codes)):
+            mask, missing = self.query_context.key_index(self.produto_col).mask(self.active_codes)
+        if len(self.active_codes) > 1 or missing:
+            found = len(self.active_codes) - len(missing)
+            text = f"Códigos: {found} de {len(self.active_codes)} encontrados"
+            if missing:
+                text += f" (não encontrados: {', '.join(missing[:10])}{'...' if len(missing) > 10 else ''})"
+            self.status_var.set(text)
+        return mask
+
+    def show_batch_lookup(self):
+        """Janela para colar uma lista de códigos (um por linha) e filtrar todos de uma vez"""
+        window = tk.Toplevel(self.root)
+        window.title('Buscar lista de códigos')
+        window.geometry('400x450')
+        ttk.Label(window, text="Cole os códigos (um por linha, ou separados por ';'):").pack(anchor='w', padx=10, pady=5)
+        text = tk.Text(window, height=20)
+        text.pack(fill='both', expand=True, padx=10)
+        text.insert('1.0', '\n'.join(self.active_codes))
+        
+        def apply():
+            self.apply_codes('; '.join(split_keys(text.get('1.0', 'end'))))
+            window.destroy()
+        
+        buttons = ttk.Frame(window)
+        buttons.pack(fill='x', padx=10, pady=10)
+        ttk.Button(buttons, text='Buscar', command=apply).pack(side='right', padx=5)
+        ttk.Button(buttons, text='Limpar', command=lambda: text.delete('1.0', 'end')).pack(side='right', padx=5)
+        text.focus_set()
+
+    def export_filtered(self):
+        """Exporta as linhas do filtro atual para CSV ou XLSX sem travar a interface"""
+        if self.exporter is not None and self.exporter.running:
+            self.status_var.set("Já existe uma exportação em andamento")
+            return
+        if self.df.empty:
+            self.status_var.set("Nenhum dado para exportar")
+            return
+        path = filedialog.asksaveasfilename(
+            parent=self.root, title='Exportar produtos filtrados', defaultextension='.xlsx',
+            initialfile=f"produtos_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
+            filetypes=[('Planilha do Excel', '*.xlsx'), ('CSV (separado por ;)', '*.csv')])
+        if not path:
+            return
+        post = self.scheduler.post
+        self.exporter = CatalogExporter(
+            self.df, self.last_mask, path,
+            on_progress=lambda written, total: post(self.on_export_progress, written, total),
+            on_done=lambda path, written: post(self.on_export_done, path, written),
+            on_error=lambda error: post(self.on_export_error, error))
+        try:
+            self.exporter.start()
+        except RuntimeError as e:
+            self.status_var.set(f"Erro ao exportar: {str(e)}")
+            return
+        self.cancel_export_btn.pack(side='right', padx=(5, 0))
+        self.status_var.set(f"Exportando {self.exporter.total} registros...")
+
+    def on_export_progress(self, written, total):
+        if self.is_closing or self.exporter is None or not self.exporter.running:
+            return
+        self.status_var.set(f"Exportando: {written} de {total} registros ({written * 100 // max(total, 1)}%)")
+
+    def on_export_done(self, path, written):
         if self.is_closing:
-            debug_print("Aplicação está sendo encerrada, não agendando nova verificação")
             return
-            
-        # Cancelar qualquer verificação anterior que possa estar pendente
-        if self.status_check_id is not None:
-            try:
-                self.root.after_cancel(self.status_check_id)
-            except Exception as e:
-                debug_print(f"Erro ao cancelar verificação anterior: {str(e)}")
-            
-        debug_print(f"Agendando próxima verificação de status em {self.check_interval/1000} segundos")
-        self.status_check_id = self.root.after(self.check_interval, self.check_user_status)
-    
-    def schedule_file_update_check(self):
-        """Agenda a próxima verificação de atualizações do arquivo no servidor"""
-        # Não agendar nova verificação se a aplicação estiver sendo encerrada
+        self.cancel_export_btn.pack_forget()
+        self.status_var.set(f"Exportação concluída: {written} registros em {os.path.basename(path)}")
+
+    def on_export_error(self, error):
         if self.is_closing:
-            debug_print("Aplicação está sendo encerrada, não agendando nova verificação de arquivo")
             return
+        self.cancel_export_btn.pack_forget()
+        if isinstance(error, ExportCancelled):
+            self.status_var.set("Exportação cancelada")
+        else:
+            self.status_var.set(f"Erro ao exportar: {str(error)}")
+
+    def cancel_export(self):
+        if self.exporter is not None:
+            self.exporter.cancel()
+            self.status_var.set("Cancelando exportação...")
+
+    def update_price_bounds(self):
+        """Mostra a faixa de preços do catálogo ao lado dos campos de/até"""
+        low, high = (None, None)
+        if self.preco_col:
+            low, high = self.query_context.sorted_index(self.preco_col).bounds()
+        if low is None:
+            self.price_bounds_var.set("")
+        else:
+            self.price_bounds_var.set(f"(catálogo: {self.format_price(low)} a {self.format_price(high)})")
+
+    def price_range_mask(self):
+        """Máscara da faixa de preço digitada (None se vazia ou inválida)"""
+        if not self.preco_col:
+            return None
+        try:
+            low, high = (parse_number(var.get()) if var.get().strip() else None
+                         for var in (self.price_min_var, self.price_max_var))
+        except QueryError as e:
+            self.status_var.set(f"Faixa de preço inválida: {str(e)}")
+            return None
+        return self.query_context.range_mask(self.preco_col, low, high)
+
+    def format_price(self, value):
+        """Preço no padrão brasileiro (R$ 1.029,90)"""
+        return f"R$ {value:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+
+    def format_row_values(self, values):
+        """Formata os valores de uma linha para exibição (PREÇO no padrão brasileiro)"""
+        vals = []
+        for c, value in zip(self.df.columns, values):
+            # Formatar a coluna PREÇO no padrão brasileiro (R$ com pontos e vírgulas)
+            if self.preco_col and c == self.preco_col:
+                try:
+                    # Converter para float caso seja string
+                    if isinstance(value, str):
+                        # Remover caracteres não numéricos exceto ponto decimal
+                        price_str = ''.join(char for char in value if char.isdigit() or char == '.')
+                        price_value = float(price_str)
+                    else:
+                        price_value = float(value)
+                        
+                    # Formatar no padrão brasileiro
+                    vals.append(self.format_price(price_value))
+                except (ValueError, TypeError):
+                    # Se não conseguir converter, manter o valor original
+                    vals.append(str(value))
+            else:
+                vals.append(value)
+        return vals
+
+    def _render_rows(self, df):
+        """
+        Atualiza a Treeview a partir do DataFrame filtrado aplicando apenas as diferenças:
+        linhas iguais não são tocadas, alteradas recebem novos valores, e as que entram ou
+        saem do resultado são inseridas ou removidas. Seleção e rolagem são mantidas.
+        """
+        if self.catalog_fingerprint is None or len(self.catalog_fingerprint) != len(self.df):
+            self.catalog_fingerprint = FrameFingerprint(self.df)
+        
+        # Chave e hash de cada linha filtrada, tirados da impressão digital do catálogo completo
+        positions = self.df.index.get_indexer(df.index)
+        keys = self.catalog_fingerprint.row_hashes.index[positions]
+        hashes = self.catalog_fingerprint.row_hashes.to_numpy()[positions]
+        wanted = dict(zip(keys, hashes))
+        
+        # Remover as linhas que saíram do resultado
+        removed = [key for key in self.rendered_rows if key not in wanted]
+        if removed:
+            self.tree.delete(*(self.rendered_rows.pop(key)[0] for key in removed))
+        
+        # Linhas novas ou com conteúdo diferente precisam ser formatadas
+        to_format = [i for i, key in enumerate(keys)
+                     if key not in self.rendered_rows or self.rendered_rows[key][1] != hashes[i]]
+        formatted = {}
+        if to_format:
+            rows = df.iloc[to_format].itertuples(index=False, name=None)
+            formatted = {i: self.format_row_values(values) for i, values in zip(to_format, rows)}
+        
+        highlight = []
+        inserted = updated = retagged = 0
+        for i, key in enumerate(keys):
+            # Determinar a tag com base no número da linha (par ou ímpar)
+            tag = 'odd' if i % 2 == 1 else 'even'
+            state = self.rendered_rows.get(key)
+            if state is None:
+                self.row_ids += 1
+                iid = f"row{self.row_ids}"
+                self.tree.insert('', i, iid=iid, values=formatted[i], tags=(tag,))
+                self.rendered_rows[key] = [iid, hashes[i], tag]
+                inserted += 1
+                if key in self.pending_highlight:
+                    highlight.append(iid)
+            elif i in formatted:
+                self.tree.item(state[0], values=formatted[i], tags=(tag,))
+                state[1], state[2] = hashes[i], tag
+                updated += 1
+                highlight.append(state[0])
+            elif state[2] != tag:
+                self.tree.item(state[0], tags=(tag,))
+                state[2] = tag
+                retagged += 1
+        self.pending_highlight = set()
+        
+        # Se a ordem do catálogo mudou, reposicionar as linhas
+        wanted_order = tuple(self.rendered_rows[key][0] for key in keys)
+        if self.tree.get_children() != wanted_order:
+            for i, iid in enumerate(wanted_order):
+                self.tree.move(iid, '', i)
+        
+        if HIGHLIGHT_CHANGES and highlight:
+            self.highlight_rows(highlight)
+        return {'inserted': inserted, 'updated': updated, 'removed': len(removed), 'retagged': retagged}
+
+    def highlight_rows(self, iids):
+        """Destaca as linhas por alguns instantes e depois restaura a cor alternada"""
+        for iid in iids:
+            self.tree.item(iid, tags=(self.tree.item(iid, 'tags')[0], 'changed'))
+        
+        def clear():
+            for iid in iids:
+                if self.tree.exists(iid):
+                    tags = self.tree.item(iid, 'tags')
+                    self.tree.item(iid, tags=tuple(t for t in tags if t != 'changed'))
+        
+        self.root.after(HIGHLIGHT_DURATION, clear)
             
-        # Cancelar qualquer verificação anterior que possa estar pendente
-        if self.file_check_id is not None:
-            try:
-                self.root.after_cancel(self.file_check_id)
-            except Exception as e:
-                debug_print(f"Erro ao cancelar verificação anterior de arquivo: {str(e)}")
+    def setup_scheduler(self):
+        """Registra as tarefas periódicas no agendador único do aplicativo"""
+        # Verificação periódica do status do usuário (apenas no modo online)
+        if not OFFLINE_MODE and self.session:
+            self.scheduler.add_job(
+                'status', self.check_user_status, self.check_interval,
+                threaded=True, on_done=self._apply_status_result
+            )
         
-        # Se não estiver configurado para usar arquivo remoto, usar intervalo maior
-        if not USE_REMOTE_FILE:
-            # Verificar a cada 30 minutos mesmo quando não está usando arquivo remoto
-            # (caso a configuração mude durante a execução)
-            check_interval = 1800000  # 30 minutos
-            debug_print(f"Modo remoto desativado. Agendando verificação de atualização em 30 minutos")
+        # Verificação periódica de atualizações do arquivo
+        if USE_REMOTE_FILE:
+            # Download e validação em segundo plano; a troca dos dados acontece na thread da interface
+            self.scheduler.add_job(
+                'file_update', self.fetch_remote_catalog, self.file_check_interval,
+                threaded=True, on_done=self.apply_remote_catalog, on_error=self.on_remote_catalog_error
+            )
         else:
-            # Usar o intervalo normal quando estiver usando arquivo remoto
-            check_interval = self.file_check_interval
-            debug_print(f"Agendando próxima verificação de atualização do arquivo em {check_interval/60000} minutos")
-            
-        self.file_check_id = self.root.after(check_interval, self.check_file_updates)
+            # Releitura das planilhas locais (só as abas alteradas são lidas de novo); disparada pelo
+            # observador de arquivos, com uma verificação a cada 30 minutos como reserva
+            self.scheduler.add_job(
+                'file_update', self.load_local_catalog, 1800000, network=False,
+                threaded=True, on_done=self.apply_remote_catalog, on_error=self.on_local_catalog_error
+            )
+        
+        # Suspender as tarefas enquanto a janela estiver minimizada
+        self.scheduler.bind_window_state(self.root)
+        self.scheduler.start()
+    
+    def start_catalog_notifier(self):
+        """Conecta ao WebSocket do servidor para receber avisos de alteração do catálogo"""
+        cookies = self.session.cookies.get_dict() if self.session else None
+        self.catalog_notifier = CatalogNotifier(
+            CATALOG_WS_URL,
+            on_update=lambda catalog_hash, version: self.scheduler.post(self.on_catalog_updated, catalog_hash, version),
+            on_state=lambda connected: self.scheduler.post(self.on_catalog_push_state, connected),
+            cookies=cookies
+        )
+        if not self.catalog_notifier.start():
+            self.catalog_notifier = None
+    
+    def start_file_watcher(self):
+        """Observa a planilha local, os arquivos adicionais e a pasta 'files' do DataService"""
+        self.file_watcher = FileWatcher(
+            on_change=lambda path, digest: self.scheduler.post(self.on_local_file_changed, path, digest),
+            files=[self.excel_file_path] + list(EXTRA_CATALOG_FILES),
+            directories=[DataService().files_dir]
+        )
+        self.file_watcher.start()
+    
+    def on_local_file_changed(self, path, digest):
+        """Planilha salva com conteúdo diferente: reler em segundo plano"""
+        if self.is_closing:
+            return
+        debug_print(f"Arquivo local alterado: {path}")
+        self.status_var.set(f"{os.path.basename(path)} foi alterado, atualizando...")
+        self.scheduler.run_now('file_update')
+    
+    def load_local_catalog(self):
+        """
+        Relê as planilhas locais (executado em segundo plano).
+        
+        Returns:
+            tuple: (DataFrame, hash, impressão digital, fontes), ou (None, hash, None, None)
+                   se o conteúdo for o mesmo já exibido
+        """
+        sources = [self.excel_file_path] + list(EXTRA_CATALOG_FILES)
+        digest = sources_digest(sources)
+        if digest == self.catalog_hash:
+            return None, digest, None, None
+        df = load_catalog(sources, exclude=tuple(self.hidden_columns))
+        return df, digest, FrameFingerprint(df), sources
+    
+    def on_local_catalog_error(self, error):
+        """Mantém os dados atuais se a planilha alterada não puder ser lida (ex.: ainda sendo gravada)"""
+        if self.is_closing:
+            return
+        debug_print(f"Erro ao reler o arquivo local: {str(error)}")
+        self.status_var.set(f"Não foi possível ler o arquivo alterado: {str(error)}")
+    
+    def on_catalog_updated(self, catalog_hash, version):
+        """Recarrega os dados quando o servidor anuncia um catálogo diferente do carregado"""
+        if catalog_hash and catalog_hash == self.catalog_hash:
+            debug_print(f"Catálogo anunciado ({version}) já está carregado, ignorando")
+            return
+        debug_print(f"Catálogo alterado no servidor ({version}), recarregando...")
+        self.scheduler.run_now('file_update')
+    
+    def on_catalog_push_state(self, connected):
+        """Com o WebSocket conectado, a verificação periódica fica mais espaçada (apenas reserva)"""
+        interval = PUSH_FALLBACK_INTERVAL if connected else self.file_check_interval
+        debug_print(f"Notificações de catálogo {'conectadas' if connected else 'desconectadas'}; "
+                    f"verificação periódica a cada {interval / 60000:.0f} minutos")
+        self.scheduler.set_interval('file_update', interval)
     
     def check_file_updates(self):
-        """Verifica se há atualizações no arquivo Excel do servidor e carrega diretamente da URL"""
+        """Solicita a verificação de atualizações do arquivo no servidor (executada em segundo plano)"""
         # Não executar a verificação se a aplicação estiver sendo encerrada
         if self.is_closing:
             debug_print("Aplicação está sendo encerrada, pulando verificação de atualização do arquivo")
-            return
+            return True
             
         # Não executar a verificação se não estiver configurado para usar arquivo remoto
         if not USE_REMOTE_FILE:
             debug_print("Modo de arquivo remoto desativado, pulando verificação de atualizações")
-            # Agendar próxima verificação mesmo assim (caso o modo seja ativado depois)
-            self.schedule_file_update_check()
-            return
+            return True
             
         debug_print("Verificando arquivo atualizado do servidor...")
-        
-        try:
-            # Atualizar a barra de status
-            self.status_var.set("Verificando atualizações do servidor...")
-            self.root.update_idletasks()
-            
-            # Tentar carregar diretamente da URL
-            df = self.load_data_from_url(EXCEL_URL)
-            
-            if df is not None:
-                debug_print("Dados atualizados carregados com sucesso da URL")
-                
-                # Atualizar o DataFrame com os novos dados
-                self.df = df
-                
-                # Atualizar a interface
-                self.build_filters()
-                self.update_table()
-                
-                self.status_var.set(f"Dados atualizados com sucesso. {len(self.df)} registros encontrados.")
-            else:
-                debug_print("Não foi possível carregar atualizações da URL")
-                self.status_var.set("Não foi possível verificar atualizações do servidor")
-        except Exception as e:
-            debug_print(f"Erro ao verificar atualizações: {str(e)}")
-            self.status_var.set(f"Erro ao verificar atualizações: {str(e)}")
-            
-        # Agendar próxima verificação
-        self.schedule_file_update_check()
+        self.status_var.set("Verificando atualizações do servidor...")
+        self.scheduler.run_now('file_update')
+        return True
 
     def on_closing(self):
         """Método chamado quando o usuário fecha a janela principal"""
@@ -1091,23 +2096,24 @@ class CSVFilterApp:
         # Definir a flag para indicar que a aplicação está sendo encerrada
         self.is_closing = True
         
-        # Cancelar a verificação de status agendada
-        if self.status_check_id is not None:
-            try:
-                self.root.after_cancel(self.status_check_id)
-                debug_print(f"Verificação de status cancelada: {self.status_check_id}")
-                self.status_check_id = None
-            except Exception as e:
-                debug_print(f"Erro ao cancelar verificação de status: {str(e)}")
-                
-        # Cancelar a verificação de atualização de arquivo agendada
-        if self.file_check_id is not None:
-            try:
-                self.root.after_cancel(self.file_check_id)
-                debug_print(f"Verificação de atualização de arquivo cancelada: {self.file_check_id}")
-                self.file_check_id = None
-            except Exception as e:
-                debug_print(f"Erro ao cancelar verificação de atualização de arquivo: {str(e)}")
+        # Cancelar todas as tarefas agendadas e a assinatura de notificações
+        self.scheduler.stop()
+        if self.catalog_notifier is not None:
+            self.catalog_notifier.stop()
+        if self.file_watcher is not None:
+            self.file_watcher.stop()
+        if self.watchdog is not None:
+            self.watchdog.stop()
+        
+        # Interromper uma exportação em andamento (o arquivo parcial é descartado)
+        if self.exporter is not None:
+            self.exporter.cancel()
+        
+        # Encerrar os processos de leitura das planilhas e as threads do filtro
+        get_loader().shutdown()
+        get_executor().shutdown()
+        if self.price_history is not None:
+            self.price_history.close()
         
         # Limpar arquivos temporários
         self.cleanup_temp_files()
@@ -1120,12 +2126,20 @@ class CSVFilterApp:
         sys.exit(0)
         
     def cleanup_temp_files(self):
-        """Limpa os arquivos temporários criados pelo aplicativo"""
+        """
+        Limpa os arquivos temporários criados pelo aplicativo.
+        O cache persistente é mantido (apenas reduzido à cota), para a próxima inicialização não começar do zero.
+        """
         try:
-            # Verificar se o arquivo está em uma pasta temporária
-            import tempfile
-            temp_dir = tempfile.gettempdir()
-            temp_app_dir = os.path.join(temp_dir, 'meuagendamentopro')
+            cache = get_cache()
+            cache.clean_temp_files()
+            cache.evict(keep=(CATALOG_CACHE_NAME,))
+        except Exception as e:
+            debug_print(f"Erro durante manutenção do cache: {str(e)}")
+        
+        try:
+            # Pasta temporária usada por versões anteriores do aplicativo
+            temp_app_dir = os.path.join(tempfile.gettempdir(), 'meuagendamentopro')
             
             if os.path.exists(temp_app_dir):
                 debug_print(f"Limpando arquivos temporários em: {temp_app_dir}")
@@ -1150,115 +2164,115 @@ class CSVFilterApp:
             debug_print(f"Erro durante limpeza de arquivos temporários: {str(e)}")
     
     def check_user_status(self):
-        """Verifica se o usuário ainda está ativo no sistema"""
-        # Não executar a verificação se a aplicação estiver sendo encerrada
-        if self.is_closing:
-            debug_print("Aplicação está sendo encerrada, pulando verificação de status")
-            return
-            
+        """
+        Verifica se o usuário ainda está ativo no sistema.
+        Executada pelo agendador em segundo plano; erros de conexão são propagados para o backoff.
+        """
+        # Verificar se temos as credenciais e dados do usuário
+        if self.is_closing or not self.credentials or not self.user_data or not self.session:
+            debug_print("Credenciais ou dados do usuário não disponíveis, pulando verificação")
+            return ('skipped', None)
+        
         debug_print("Verificando status do usuário...")
+        result = self._heartbeat_request() if HEARTBEAT_MODE else ('expired', None)
+        if result[0] == 'expired':
+            # Somente quando o cookie é rejeitado refazemos o login completo
+            result = self._relogin_request()
+        return result
+    
+    def _heartbeat_request(self):
+        """Consulta o endpoint de status reaproveitando os cookies e as conexões da sessão autenticada"""
+        with span('auth', mode='heartbeat') as sp:
+            response = self.session.get(STATUS_URL, headers={'Accept': 'application/json'}, timeout=STATUS_TIMEOUT)
+            sp.set(status=response.status_code)
+        
+        if response.status_code == 401:
+            debug_print("Cookie de sessão rejeitado pelo servidor, será feito um novo login")
+            return ('expired', None)
+        if response.status_code == 200:
+            try:
+                return self._classify_user_data(response.json())
+            except ValueError:
+                return ('error', "Resposta de status não é JSON")
+        return ('error', f"Status inesperado na verificação: {response.status_code}")
+    
+    def _relogin_request(self):
+        """Refaz o login na sessão principal, renovando o cookie (apenas quando ele é rejeitado)"""
+        login_data = {
+            'username': self.credentials['username'],
+            'password': self.credentials['password']
+        }
+        headers = {
+            'Content-Type': 'application/json',
+            'Accept': 'application/json'
+        }
+        with span('auth', mode='relogin') as sp:
+            response = self.session.post(AUTH_URL, json=login_data, headers=headers, timeout=STATUS_TIMEOUT)
+            sp.set(status=response.status_code)
         
-        try:
-            # Verificar se temos as credenciais e dados do usuário
-            if not self.credentials or not self.user_data:
-                debug_print("Credenciais ou dados do usuário não disponíveis, pulando verificação")
-                self.schedule_status_check()
-                return
-            
-            username = self.user_data.get('username')
-            if not username:
-                debug_print("Nome de usuário não disponível, pulando verificação")
-                self.schedule_status_check()
-                return
-            
-            # Verificar se o usuário ainda está ativo tentando fazer login com as credenciais reais
-            debug_print(f"Verificando status do usuário {username} usando as credenciais reais")
-            
-            # Criar uma nova sessão para o teste de login
-            test_session = requests.Session()
-            
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json'
-            }
-            
-            # Usar as credenciais reais para verificar o status
+        if response.status_code == 401:
             try:
-                # Usar as credenciais armazenadas durante o login inicial
-                login_data = {
-                    'username': self.credentials['username'],
-                    'password': self.credentials['password']
-                }
-                
-                debug_print(f"Verificando status com login real para: {username}")
-                login_resp = test_session.post(AUTH_URL, json=login_data, headers=headers)
-                
-                debug_print(f"Status da resposta: {login_resp.status_code}")
-                
-                # Se o login falhar com 401, verificar a mensagem de erro
-                if login_resp.status_code == 401:
-                    try:
-                        error_data = login_resp.json()
-                        error_message = error_data.get('error', 'Credenciais inválidas')
-                        debug_print(f"Mensagem de erro: {error_message}")
-                        
-                        # Verificar se a mensagem de erro indica que o usuário foi bloqueado
-                        if 'bloqueada' in error_message.lower():
-                            debug_print(f"Usuário bloqueado! Mensagem: {error_message}")
-                            messagebox.showerror(
-                                'Conta Bloqueada', 
-                                'Sua conta foi bloqueada pelo administrador. O aplicativo será encerrado.'
-                            )
-                            self.root.destroy()
-                            import sys
-                            sys.exit(1)
-                            return
-                        else:
-                            # Se a mensagem de erro não indicar que a conta está bloqueada,
-                            # mas ainda assim falhou com as credenciais corretas, algo está errado
-                            debug_print("Erro de login com credenciais corretas - possível alteração de senha")
-                    except Exception as json_err:
-                        debug_print(f"Erro ao analisar resposta JSON de erro: {str(json_err)}")
-                elif login_resp.status_code == 200:
-                    # Se o login for bem-sucedido, verificar se o usuário está ativo nos dados retornados
-                    try:
-                        user_data = login_resp.json()
-                        if user_data.get('isActive') is False:
-                            debug_print("Usuário bloqueado segundo dados do login!")
-                            messagebox.showerror(
-                                'Conta Bloqueada', 
-                                'Sua conta foi bloqueada pelo administrador. O aplicativo será encerrado.'
-                            )
-                            self.root.destroy()
-                            import sys
-                            sys.exit(1)
-                            return
-                        else:
-                            debug_print("Login bem-sucedido, usuário ainda está ativo")
-                            # Atualizar os dados do usuário com os mais recentes
-                            self.user_data = user_data
-                    except Exception as json_err:
-                        debug_print(f"Erro ao analisar resposta JSON de login: {str(json_err)}")
-            except Exception as req_err:
-                debug_print(f"Erro ao verificar status via login: {str(req_err)}")
-            
-            # Se chegamos até aqui, assumimos que o usuário ainda está ativo
-            debug_print("Nenhum bloqueio detectado, assumindo que o usuário ainda está ativo")
-            
-            # Agendar próxima verificação
-            self.schedule_status_check()
-                
-        except requests.exceptions.ConnectionError as conn_err:
-            debug_print(f"Erro de conexão ao verificar status: {str(conn_err)}")
-            # Continuar agendando verificações mesmo com erro
-            self.schedule_status_check()
-        except Exception as e:
-            debug_print(f"Erro ao verificar status do usuário: {str(e)}")
-            # Continuar agendando verificações mesmo com erro
-            self.schedule_status_check()
-
+                error_message = response.json().get('error', 'Credenciais inválidas')
+            except ValueError:
+                error_message = 'Credenciais inválidas'
+            # Verificar se a mensagem de erro indica que o usuário foi bloqueado
+            if 'bloqueada' in error_message.lower():
+                return ('blocked', error_message)
+            return ('invalid', error_message)
+        if response.status_code == 200:
+            try:
+                return self._classify_user_data(response.json())
+            except ValueError:
+                return ('error', "Resposta de login não é JSON")
+        return ('error', f"Status inesperado no login: {response.status_code}")
+    
+    def _classify_user_data(self, user_data):
+        """Interpreta os dados do usuário retornados pelo servidor"""
+        if user_data.get('isActive') is False:
+            return ('blocked', 'Usuário bloqueado segundo dados do servidor')
+        return ('active', user_data)
+    
+    def _apply_status_result(self, result):
+        """Aplica na thread da interface o resultado da verificação de status"""
+        if self.is_closing:
+            return
+        status, payload = result
+        
+        if status == 'blocked':
+            debug_print(f"Usuário bloqueado! Mensagem: {payload}")
+            messagebox.showerror(
+                'Conta Bloqueada', 
+                'Sua conta foi bloqueada pelo administrador. O aplicativo será encerrado.'
+            )
+            self.root.destroy()
+            sys.exit(1)
+        
+        if status == 'active':
+            debug_print("Usuário ainda está ativo")
+            # Atualizar os dados do usuário com os mais recentes
+            self.user_data = payload
+            # Sessão estável: espaçar gradualmente as verificações até o limite máximo
+            self.check_interval = min(int(self.check_interval * 1.5), HEARTBEAT_MAX_INTERVAL)
+        else:
+            # Em caso de dúvida, voltar ao intervalo mínimo
+            self.check_interval = HEARTBEAT_MIN_INTERVAL
+        self.scheduler.set_interval('status', self.check_interval)
+        
+        if status == 'invalid':
+            # A mensagem não indica bloqueio, mas o login falhou com as credenciais salvas
+            debug_print(f"Erro de login com credenciais salvas - possível alteração de senha: {payload}")
+        elif status == 'error':
+            debug_print(payload)
+            # Respostas inesperadas do servidor contam como falha para o backoff
+            return False
 
 if __name__ == '__main__':
+    # Necessário para os processos de leitura das planilhas no executável (PyInstaller/Windows)
+    multiprocessing.freeze_support()
+    
+    # Ativar o rastreamento de desempenho (spans em memória e em arquivo JSONL)
+    TRACE_BUFFER = tracing.configure(TRACING_ENABLED, TRACE_LOG_PATH)
+    
     # Verificar se o arquivo XLSX existe antes de iniciar apenas se CHECK_FILE_ON_STARTUP estiver ativado
     if CHECK_FILE_ON_STARTUP and not os.path.exists(XLSX_FILE_PATH):
         messagebox.showerror('Erro', f'Arquivo não encontrado: {os.path.basename(XLSX_FILE_PATH)}\n\nO arquivo deve estar na pasta "files".')
@@ -1269,7 +2283,7 @@ if __name__ == '__main__':
     if OFFLINE_MODE:
         debug_print("Iniciando em modo offline (sem autenticação)")
         # Criar uma sessão vazia e dados de usuário padrão
-        session = requests.Session()
+        session = create_session()
         user_data = {"username": "Usuário Local"}
         root = tk.Tk()
         CSVFilterApp(root, session, user_data, None)
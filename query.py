@@ -0,0 +1,644 @@
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from parallel_filter import PARALLEL_MIN_ROWS, ArrowUnsupported, arrow_installed, arrow_supports, arrow_text, arrow_text_mask
+
+# Configurações globais
+DEBUG = os.environ.get('MEUAGENDAMENTO_DEBUG') == '1'  # Ativar com MEUAGENDAMENTO_DEBUG=1 (nunca em produção)
+
+# Quantidade de máscaras memorizadas por consulta/termo (cada uma ocupa 1 byte por linha)
+MASK_CACHE_SIZE = 128
+
+# Palavras reservadas (apenas em maiúsculas, para não conflitar com buscas comuns como "e")
+OR_KEYWORDS = ('OR', 'OU')
+AND_KEYWORDS = ('AND', 'E')
+NOT_KEYWORDS = ('NOT', 'NAO', 'NÃO')
+
+def debug_print(message):
+    """Função para imprimir mensagens de debug apenas quando DEBUG está ativado"""
+    if DEBUG:
+        print(f"[DEBUG] {message}")
+
+
+class QueryError(ValueError):
+    """Consulta com sintaxe inválida ou que referencia uma coluna inexistente"""
+
+
+def fold(text):
+    """Texto sem acentos, sem espaços nas pontas e em maiúsculas (para comparar nomes de colunas)"""
+    text = unicodedata.normalize('NFKD', str(text))
+    return ''.join(char for char in text if not unicodedata.combining(char)).strip().upper()
+
+
+def resolve_column(field, columns):
+    """
+    Encontra a coluna referenciada na consulta, ignorando acentos e maiúsculas.
+    Aceita o nome completo ou o início do nome (ex.: 'preco' -> 'PREÇO', 'desc' -> 'DESCRIÇÃO DO SITE ').
+
+    Returns:
+        O nome real da coluna ou None
+    """
+    target = fold(field)
+    folded = [(fold(col), col) for col in columns]
+    for name, col in folded:
+        if name == target:
+            return col
+    for name, col in folded:
+        if name.startswith(target):
+            return col
+    return None
+
+
+# Pontos apenas como separador de milhar, sem vírgula ('1.000', 'R$ 1.500'): formato brasileiro
+_THOUSANDS_ONLY = r'-?[1-9]\d{0,2}(?:\.\d{3})+'
+
+
+def parse_number(text):
+    """Converte um número digitado no formato brasileiro ou americano ('1.029,90', '1.500', '99.9', 'R$ 50')"""
+    text = re.sub(r'[^\d,.\-]', '', str(text))
+    if ',' in text or re.fullmatch(_THOUSANDS_ONLY, text):
+        text = text.replace('.', '').replace(',', '.')
+    try:
+        return float(text)
+    except ValueError:
+        raise QueryError(f"Valor numérico inválido: {text or '(vazio)'}")
+
+
+def to_numeric(series):
+    """Converte uma coluna em números (float), aceitando textos como 'R$ 1.029,90'; inválidos viram NaN"""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype=float, na_value=np.nan)
+    text = series.astype(str).str.replace(r'[^\d,.\-]', '', regex=True)
+    brazilian = text.str.contains(',', regex=False) | text.str.fullmatch(_THOUSANDS_ONLY)
+    text = text.where(~brazilian, text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    return pd.to_numeric(text, errors='coerce').to_numpy(dtype=float)
+
+
+# ----------------------------------------------------------------------
+# Árvore da consulta
+# ----------------------------------------------------------------------
+class Term:
+    """
+    Condição simples. field=None pesquisa em todas as colunas.
+
+    Operações: contains, prefix, regex, exact (texto igual), eq, lt, le, gt, ge (numéricas)
+    """
+
+    def __init__(self, field, op, value):
+        self.field = field
+        self.op = op
+        self.value = value
+        self.key = f"T({fold(field) if field is not None else ''}|{op}|{value})"
+
+    def fields(self):
+        return [self.field] if self.field is not None else []
+
+    def __repr__(self):
+        return self.key
+
+
+class Not:
+    def __init__(self, child):
+        self.child = child
+        self.key = f"N({child.key})"
+
+    def fields(self):
+        return self.child.fields()
+
+    def __repr__(self):
+        return self.key
+
+
+class BoolOp:
+    """E/OU entre várias condições"""
+
+    def __init__(self, op, children):
+        self.op = op  # 'and' ou 'or'
+        self.children = children
+        self.key = f"{op.upper()}({','.join(child.key for child in children)})"
+
+    def fields(self):
+        return [field for child in self.children for field in child.fields()]
+
+    def __repr__(self):
+        return self.key
+
+
+# ----------------------------------------------------------------------
+# Leitura (tokens e análise)
+# ----------------------------------------------------------------------
+_TOKEN = re.compile(r'''
+    (?P<space>\s+)
+  | (?P<lparen>\()
+  | (?P<rparen>\))
+  | (?P<field>[^\s:<>=!()"/\-][^\s:<>=!()"]*)\s*(?P<op>:|<=|>=|!=|<|>|=)\s*
+        (?:"(?P<fquoted>[^"]*)"?|/(?P<fregex>[^/]*)/?|(?P<fvalue>[^\s()]*))
+  | "(?P<quoted>[^"]*)"?
+  | /(?P<regex>[^/]+)/
+  | (?P<minus>-)(?=\S)
+  | (?P<word>[^\s()]+)
+''', re.VERBOSE)
+
+_COMPARISON_OPS = {'<': 'lt', '<=': 'le', '>': 'gt', '>=': 'ge'}
+
+
+def _value_term(field, raw, quoted=None, regex=None):
+    """Condição de texto: "frase", /regex/, prefixo* ou trecho"""
+    if regex is not None:
+        try:
+            re.compile(regex)
+        except re.error as e:
+            raise QueryError(f"Expressão regular inválida: {regex} ({e})")
+        return Term(field, 'regex', regex)
+    if quoted is not None:
+        return Term(field, 'contains', quoted.lower())
+    if raw.endswith('*') and len(raw) > 1:
+        return Term(field, 'prefix', raw[:-1].lower())
+    return Term(field, 'contains', raw.lower())
+
+
+def tokenize(text):
+    tokens = []
+    for match in _TOKEN.finditer(text):
+        kind = match.lastgroup
+        if match.group('space'):
+            continue
+        if match.group('lparen'):
+            tokens.append(('(', None))
+        elif match.group('rparen'):
+            tokens.append((')', None))
+        elif match.group('field') is not None:
+            field, op = match.group('field'), match.group('op')
+            quoted, regex, value = match.group('fquoted'), match.group('fregex'), match.group('fvalue')
+            if op == ':':
+                if not (quoted or regex or value):
+                    continue  # 'coluna:' ainda sem valor (usuário digitando)
+                tokens.append(('term', _value_term(field, value or '', quoted, regex)))
+            elif op in _COMPARISON_OPS:
+                if not value:
+                    continue
+                tokens.append(('term', Term(field, _COMPARISON_OPS[op], parse_number(value))))
+            else:
+                # '=' e '!=': comparação numérica se o valor for número, senão igualdade de texto
+                raw = quoted if quoted is not None else value
+                if not raw:
+                    continue
+                try:
+                    term = Term(field, 'eq', parse_number(raw)) if quoted is None and re.search(r'\d', raw) \
+                        else Term(field, 'exact', raw.lower())
+                except QueryError:
+                    term = Term(field, 'exact', raw.lower())
+                tokens.append(('term', term if op == '=' else Not(term)))
+        elif match.group('quoted') is not None:
+            if match.group('quoted'):
+                tokens.append(('term', _value_term(None, '', quoted=match.group('quoted'))))
+        elif match.group('regex') is not None:
+            tokens.append(('term', _value_term(None, '', regex=match.group('regex'))))
+        elif match.group('minus'):
+            tokens.append(('not', None))
+        elif kind == 'word':
+            word = match.group('word')
+            if word in OR_KEYWORDS:
+                tokens.append(('or', None))
+            elif word in AND_KEYWORDS:
+                tokens.append(('and', None))
+            elif word in NOT_KEYWORDS:
+                tokens.append(('not', None))
+            elif word == '-':
+                continue  # '-' solto: negação ainda sem termo (usuário digitando)
+            else:
+                tokens.append(('term', _value_term(None, word)))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise QueryError("Parêntese ')' sem abertura correspondente")
+        return node
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() == 'or':
+            self.take()
+            children.append(self.parse_and())
+        children = [child for child in children if child is not None]
+        if not children:
+            return None
+        return children[0] if len(children) == 1 else BoolOp('or', children)
+
+    def parse_and(self):
+        children = []
+        while self.peek() not in (None, 'or', ')'):
+            if self.peek() == 'and':
+                self.take()
+                continue
+            node = self.parse_not()
+            if node is not None:
+                children.append(node)
+        if not children:
+            return None
+        return children[0] if len(children) == 1 else BoolOp('and', children)
+
+    def parse_not(self):
+        if self.peek() == 'not':
+            self.take()
+            child = self.parse_not()
+            return Not(child) if child is not None else None
+        return self.parse_atom()
+
+    def parse_atom(self):
+        if self.peek() in (None, ')'):
+            return None  # Negação no fim da consulta ou do grupo (usuário digitando)
+        kind, value = self.take()
+        if kind == '(':
+            node = self.parse_or()
+            if self.peek() == ')':
+                self.take()  # Parêntese de fechamento é opcional no fim (consulta sendo digitada)
+            return node
+        if kind == 'term':
+            return value
+        raise QueryError("Consulta incompleta")
+
+
+@lru_cache(maxsize=256)
+def compile_query(text):
+    """
+    Converte o texto da consulta em uma árvore de condições (memorizado por texto).
+
+    Sintaxe:
+        palavra            trecho em qualquer coluna
+        "frase exata"      trecho com espaços
+        coluna:valor       trecho na coluna (aceita início do nome, sem acentos: preco, desc, plat)
+        coluna:valor*      palavra que começa com 'valor'
+        coluna:/regex/     expressão regular (sem diferenciar maiúsculas)
+        preço<100          comparações numéricas: < <= > >= = !=
+        A OR B, A OU B     qualquer uma das condições (o padrão entre termos é E)
+        NOT A, -A          negação; parênteses agrupam
+
+    Returns:
+        Nó da árvore, ou None para uma consulta vazia
+
+    Raises:
+        QueryError: Sintaxe inválida
+    """
+    return _Parser(tokenize(text)).parse()
+
+
+# ----------------------------------------------------------------------
+# Avaliação vetorizada com memorização por termo
+# ----------------------------------------------------------------------
+class SortedIndex:
+    """
+    Coluna numérica ordenada uma vez por carga: intervalos (ex.: preço entre 500 e 1500)
+    viram duas buscas binárias (O(log n)) em vez de comparar todas as linhas.
+    """
+
+    def __init__(self, values):
+        self.size = len(values)
+        # Ordem estável; valores inválidos (NaN) ficam no fim e nunca entram em intervalos
+        self.order = np.argsort(values, kind='stable')
+        self.values = values[self.order]
+        self.valid = int(np.count_nonzero(~np.isnan(values)))
+
+    def bounds(self):
+        """Menor e maior valor (None se a coluna não tem números)"""
+        if not self.valid:
+            return None, None
+        return float(self.values[0]), float(self.values[self.valid - 1])
+
+    def span(self, low=None, high=None, include_low=True, include_high=True):
+        """Faixa [início, fim) das posições ordenadas dentro do intervalo"""
+        values = self.values[:self.valid]
+        start = 0 if low is None else int(np.searchsorted(values, low, side='left' if include_low else 'right'))
+        end = self.valid if high is None else int(np.searchsorted(values, high, side='right' if include_high else 'left'))
+        return start, max(start, end)
+
+    def mask(self, low=None, high=None, include_low=True, include_high=True):
+        """Máscara booleana (na ordem original das linhas) dos valores dentro do intervalo"""
+        start, end = self.span(low, high, include_low, include_high)
+        result = np.zeros(self.size, dtype=bool)
+        result[self.order[start:end]] = True
+        return result
+
+
+def normalize_key(value):
+    """Código do produto normalizado para busca exata (sem espaços nas pontas, maiúsculas)"""
+    return str(value).strip().upper()
+
+
+def split_keys(text):
+    """Separa códigos colados ou digitados (um por linha, ou separados por ';' ou tabulação)"""
+    return [key for key in (normalize_key(part) for part in re.split(r'[;\t\r\n]+', text)) if key]
+
+
+class KeyIndex:
+    """
+    Índice hash de uma coluna: código normalizado -> posições das linhas.
+
+    Montado uma vez por carga; cada código é encontrado em O(1), sem percorrer a coluna.
+    """
+
+    def __init__(self, series):
+        self.size = len(series)
+        # Células vazias viram '' (com NaN o factorize daria o código -1, fora dos grupos abaixo)
+        codes, uniques = pd.factorize(series.astype(str).fillna('').str.strip().str.upper())
+        self.codes = {key: code for code, key in enumerate(uniques) if key}
+        # Linhas agrupadas por código: as do código c ficam em order[starts[c]:starts[c + 1]]
+        self.order = np.argsort(codes, kind='stable')
+        self.starts = np.r_[0, np.cumsum(np.bincount(codes, minlength=len(uniques)))]
+
+    def _positions(self, key):
+        code = self.codes.get(normalize_key(key))
+        if code is None:
+            return None
+        return self.order[self.starts[code]:self.starts[code + 1]]
+
+    def lookup(self, key):
+        """Posições das linhas com o código (vazio se não existe)"""
+        found = self._positions(key)
+        return found if found is not None else np.empty(0, dtype=np.int64)
+
+    def mask(self, keys):
+        """
+        Máscara das linhas de todos os códigos, em uma única passagem.
+
+        Returns:
+            tuple: (máscara booleana, lista dos códigos não encontrados)
+        """
+        result = np.zeros(self.size, dtype=bool)
+        missing = []
+        for key in keys:
+            found = self._positions(key)
+            if found is None:
+                missing.append(key)
+            else:
+                result[found] = True
+        return result, missing
+
+
+def _text_mask(text, op, value):
+    """Máscara de uma operação de texto sobre a coluna (ou um trecho dela) em minúsculas"""
+    if op == 'contains':
+        result = text.str.contains(value, regex=False)
+    elif op == 'prefix':
+        result = text.str.contains(r'\b' + re.escape(value), regex=True)
+    elif op == 'regex':
+        result = text.str.contains(value, regex=True, flags=re.IGNORECASE)
+    elif op == 'exact':
+        result = text.str.strip() == value
+    else:
+        raise QueryError(f"Operação desconhecida: {op}")
+    return result.fillna(False).to_numpy(dtype=bool)
+
+
+class QueryContext:
+    """
+    Avalia consultas sobre um DataFrame como máscaras NumPy.
+
+    As máscaras de cada termo e subexpressão ficam memorizadas: ao editar um termo da
+    consulta, apenas ele é avaliado novamente. As colunas em minúsculas e numéricas
+    são preparadas uma única vez por DataFrame.
+
+    Com um executor (ChunkedExecutor), catálogos grandes são avaliados por blocos de
+    linhas em vários núcleos (ver combined_mask).
+    """
+
+    def __init__(self, df, executor=None):
+        self.df = df
+        self.executor = executor
+        self._text = {}
+        self._arrow = {}
+        self._numbers = {}
+        self._sorted = {}
+        self._keys = {}
+        self._masks = OrderedDict()
+        self.evaluated = 0  # Termos avaliados de fato (não vindos da memória)
+
+    def text(self, col):
+        """
+        Coluna como texto em minúsculas (preparada uma vez).
+
+        Em strings do Python (dtype object), para que as expressões sigam o re do Python como na
+        avaliação por blocos: no texto do pandas 3 com pyarrow, \\b e \\w ignoram acentos (RE2).
+        """
+        if col not in self._text:
+            self._text[col] = self.df[col].astype(str).str.lower().astype(object)
+        return self._text[col]
+
+    def arrow_text(self, col):
+        """Coluna em minúsculas no formato Arrow, para a avaliação por blocos (preparada uma vez)"""
+        if col not in self._arrow:
+            self._arrow[col] = arrow_text(self.text(col))
+        return self._arrow[col]
+
+    def numbers(self, col):
+        """Coluna como números float (preparada uma vez)"""
+        if col not in self._numbers:
+            self._numbers[col] = to_numeric(self.df[col])
+        return self._numbers[col]
+
+    def sorted_index(self, col):
+        """Índice ordenado da coluna numérica (preparado uma vez)"""
+        if col not in self._sorted:
+            self._sorted[col] = SortedIndex(self.numbers(col))
+        return self._sorted[col]
+
+    def key_index(self, col):
+        """Índice hash dos códigos da coluna (preparado uma vez)"""
+        if col not in self._keys:
+            self._keys[col] = KeyIndex(self.df[col])
+        return self._keys[col]
+
+    def range_mask(self, col, low=None, high=None):
+        """Máscara das linhas com low <= valor <= high (limites None = abertos); memorizada como os termos"""
+        if low is None and high is None:
+            return None
+        key = f"R({col}|{low}|{high})"
+        cached = self._masks.get(key)
+        if cached is not None:
+            self._masks.move_to_end(key)
+            return cached
+        self.evaluated += 1
+        return self._remember(key, self.sorted_index(col).mask(low, high))
+
+    def _remember(self, key, result):
+        self._masks[key] = result
+        if len(self._masks) > MASK_CACHE_SIZE:
+            self._masks.popitem(last=False)
+        return result
+
+    def column(self, field):
+        col = resolve_column(field, self.df.columns)
+        if col is None:
+            raise QueryError(f"Coluna desconhecida: {field}")
+        return col
+
+    def mask(self, node):
+        """Máscara booleana (uma posição por linha) da condição; None = sem filtro"""
+        if node is None:
+            return None
+        cached = self._masks.get(node.key)
+        if cached is not None:
+            self._masks.move_to_end(node.key)
+            return cached
+        return self._remember(node.key, self._evaluate(node))
+
+    def _evaluate(self, node):
+        if isinstance(node, Not):
+            return ~self.mask(node.child)
+        if isinstance(node, BoolOp):
+            masks = [self.mask(child) for child in node.children]
+            return np.logical_and.reduce(masks) if node.op == 'and' else np.logical_or.reduce(masks)
+        self.evaluated += 1
+        if node.field is None:
+            # Sem coluna: qualquer coluna de texto
+            result = np.zeros(len(self.df), dtype=bool)
+            for col in self.df.columns:
+                result |= self._term_mask(col, node)
+            return result
+        return self._term_mask(self.column(node.field), node)
+
+    def _term_mask(self, col, node):
+        op, value = node.op, node.value
+        if op in ('lt', 'le', 'gt', 'ge', 'eq'):
+            # Comparações numéricas usam a busca binária no índice ordenado
+            index = self.sorted_index(col)
+            if op == 'lt':
+                return index.mask(high=value, include_high=False)
+            if op == 'le':
+                return index.mask(high=value)
+            if op == 'gt':
+                return index.mask(low=value, include_low=False)
+            if op == 'ge':
+                return index.mask(low=value)
+            return index.mask(value, value)
+        if arrow_installed and arrow_supports(op, value):
+            try:
+                # Mesmo caminho da avaliação por blocos: o resultado não depende do tamanho do catálogo
+                return arrow_text_mask(self.arrow_text(col), op, value)
+            except ArrowUnsupported:
+                pass
+        return _text_mask(self.text(col), op, value)
+
+    # ------------------------------------------------------------------
+    # Avaliação por blocos de linhas (catálogos grandes)
+    # ------------------------------------------------------------------
+    def combined_mask(self, nodes, masks=(), on_partial=None):
+        """
+        Interseção das condições e das máscaras já calculadas; None = sem filtro.
+
+        A partir de PARALLEL_MIN_ROWS linhas, se houver termos ainda não memorizados,
+        o catálogo é dividido em blocos avaliados no executor, e on_partial(máscara, fim)
+        é chamado a cada bloco concluído, em ordem: as posições antes de 'fim' já têm
+        o resultado final (permite exibir a primeira página antes do fim da avaliação).
+        As máscaras completas de cada termo são memorizadas como na avaliação comum.
+        """
+        nodes = [node for node in nodes if node is not None]
+        masks = [m for m in masks if m is not None]
+        if not nodes and not masks:
+            return None
+        pending = any(node.key not in self._masks for node in nodes)
+        if pending and self.executor is not None and len(self.df) >= PARALLEL_MIN_ROWS:
+            return self._chunked_mask(nodes, masks, on_partial)
+        result = np.ones(len(self.df), dtype=bool)
+        for m in [self.mask(node) for node in nodes] + masks:
+            result &= m
+        return result
+
+    def _chunked_mask(self, nodes, masks, on_partial):
+        # Preparação na thread atual: colunas usadas pelos termos de texto e termos
+        # numéricos (a busca binária no índice ordenado já é rápida por inteiro)
+        ready = {}
+        for node in nodes:
+            self._prepare(node, ready)
+
+        def evaluate(start, end):
+            local = {}
+            chunk = np.ones(end - start, dtype=bool)
+            for node in nodes:
+                chunk &= self._chunk_mask(node, start, end, ready, local)
+            for m in masks:
+                chunk &= m[start:end]
+            return chunk, local
+
+        result = np.zeros(len(self.df), dtype=bool)
+        parts = {}
+        for start, end, (chunk, local) in self.executor.imap(evaluate, len(self.df)):
+            result[start:end] = chunk
+            for key, part in local.items():
+                parts.setdefault(key, []).append(part)
+            if on_partial is not None:
+                on_partial(result, end)
+        for key, chunks in parts.items():
+            self._remember(key, np.concatenate(chunks))
+        debug_print(f"Consulta avaliada em blocos: {len(self.df)} linhas, {len(parts)} máscaras novas, "
+                    f"{self.executor.workers} threads")
+        return result
+
+    def _prepare(self, node, ready):
+        """Separa as máscaras já disponíveis e prepara as colunas de texto usadas pela condição"""
+        cached = self._masks.get(node.key)
+        if cached is not None:
+            ready[node.key] = cached
+        elif isinstance(node, Not):
+            self._prepare(node.child, ready)
+        elif isinstance(node, BoolOp):
+            for child in node.children:
+                self._prepare(child, ready)
+        elif node.op in ('lt', 'le', 'gt', 'ge', 'eq'):
+            ready[node.key] = self.mask(node)
+        else:
+            self.evaluated += 1
+            for col in (self.df.columns if node.field is None else [self.column(node.field)]):
+                self.text(col)
+                if arrow_installed and arrow_supports(node.op, node.value):
+                    self.arrow_text(col)
+
+    def _chunk_mask(self, node, start, end, ready, local):
+        """Máscara da condição nas linhas [start, end); executada nas threads do executor"""
+        if node.key in ready:
+            return ready[node.key][start:end]
+        if node.key in local:
+            return local[node.key]
+        if isinstance(node, Not):
+            result = ~self._chunk_mask(node.child, start, end, ready, local)
+        elif isinstance(node, BoolOp):
+            parts = [self._chunk_mask(child, start, end, ready, local) for child in node.children]
+            result = np.logical_and.reduce(parts) if node.op == 'and' else np.logical_or.reduce(parts)
+        elif node.field is None:
+            result = np.zeros(end - start, dtype=bool)
+            for col in self.df.columns:
+                result |= self._chunk_text_mask(col, node, start, end)
+        else:
+            result = self._chunk_text_mask(self.column(node.field), node, start, end)
+        local[node.key] = result
+        return result
+
+    def _chunk_text_mask(self, col, node, start, end):
+        if col in self._arrow and arrow_supports(node.op, node.value):
+            try:
+                # As funções do Arrow liberam o GIL: os blocos rodam de fato em paralelo
+                return arrow_text_mask(self._arrow[col].slice(start, end - start), node.op, node.value)
+            except ArrowUnsupported:
+                pass  # Expressão fora do RE2: avaliada pelo Python
+        return _text_mask(self._text[col].iloc[start:end], node.op, node.value)
@@ -0,0 +1,253 @@
+import os
+import re
+import json
+import time
+import base64
+import threading
+
+import requests
+
+from excel_engine import read_excel
+from file_watcher import file_digest
+from http_transport import create_session
+from tracing import span
+
+# Configurações globais
+DEBUG = os.environ.get('MEUAGENDAMENTO_DEBUG') == '1'  # Ativar com MEUAGENDAMENTO_DEBUG=1 (nunca em produção)
+
+# Tentativas por download (cada uma continua de onde a anterior parou). Só há nova tentativa se a
+# anterior recebeu bytes: servidor fora do ar ou inacessível falha logo, sem somar esperas
+RESUME_ATTEMPTS = 5
+RESUME_BACKOFF = 1.0  # Espera de 1 s, 2 s, 4 s... entre as tentativas
+RESUME_DEADLINE = 60  # Nenhuma tentativa nova começa depois disso (segundos desde o início do download)
+# Bloco lido por vez: numa queda, o bloco incompleto é perdido (e pedido de novo na continuação)
+DOWNLOAD_CHUNK = 16 * 1024
+PART_SUFFIX = '.part'  # Bytes já recebidos
+META_SUFFIX = '.part.json'  # Identidade da versão sendo baixada (URL, ETag, Last-Modified, tamanho)
+
+_CONTENT_RANGE = re.compile(r'bytes (\d+)-(\d+)/(\d+|\*)')
+
+_session = None
+_session_lock = threading.Lock()
+
+def debug_print(message):
+    """Função para imprimir mensagens de debug apenas quando DEBUG está ativado"""
+    if DEBUG:
+        print(f"[DEBUG] {message}")
+
+
+class DownloadError(Exception):
+    """Download incompleto, corrompido (hash diferente) ou com conteúdo inválido"""
+
+
+def validate_catalog_file(file_path):
+    """Confere se o arquivo baixado é uma planilha (e não uma página de erro); levanta DownloadError"""
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        head = f.read(100)
+    # Verificar se o conteúdo é JSON (indica erro do servidor)
+    if head.lstrip().startswith(b'{'):
+        raise DownloadError(f"O servidor retornou JSON em vez de um arquivo Excel: {head!r}")
+    # Arquivo Excel válido deve ser maior que isso (evita páginas de erro)
+    if size < 100:
+        raise DownloadError(f"O servidor retornou um arquivo muito pequeno ({size} bytes)")
+    try:
+        with span('parse', mode='validate'):
+            read_excel(file_path, nrows=1)  # Tenta ler apenas a primeira linha para validar
+    except Exception as e:
+        raise DownloadError(f"O arquivo baixado não é um Excel válido: {str(e)}")
+
+
+def server_digest(headers):
+    """SHA-256 informado pelo servidor (Repr-Digest, Digest ou X-Content-SHA256), em hexadecimal"""
+    for header in ('Repr-Digest', 'Digest'):
+        for item in headers.get(header, '').split(','):
+            algorithm, _, value = item.strip().partition('=')
+            if algorithm.lower() == 'sha-256' and value:
+                try:
+                    return base64.b64decode(value.strip(':')).hex()
+                except ValueError:
+                    continue
+    value = headers.get('X-Content-SHA256', '').strip().lower()
+    return value or None
+
+
+def _identity(response):
+    """Identidade da versão entregue pelo servidor (para continuar o download depois)"""
+    etag = response.headers.get('ETag')
+    length = response.headers.get('Content-Length', '')
+    return {
+        'url': response.url,
+        'etag': etag if etag and not etag.startswith('W/') else None,  # ETag fraco não vale para If-Range
+        'last_modified': response.headers.get('Last-Modified'),
+        'length': int(length) if length.isdigit() else None,
+        'sha256': server_digest(response.headers),
+    }
+
+
+def _load_meta(part_path, meta_path, url):
+    """Identidade do download parcial, se ele ainda servir para esta URL"""
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('request_url') != url or not os.path.exists(part_path):
+        return None
+    return meta
+
+
+def discard_partial(dest):
+    """Remove o download parcial de um destino"""
+    for path in (dest + PART_SUFFIX, dest + META_SUFFIX):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def get_download_session():
+    """
+    Sessão compartilhada dos downloads, sem as novas tentativas do transporte: quem decide
+    quando tentar de novo é download_resumable (somente continuações, com prazo total)
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session(retries=0)
+        return _session
+
+
+def download_resumable(url, dest, session=None, timeout=None, attempts=RESUME_ATTEMPTS,
+                       expected_sha256=None, validate=None, commit=None, deadline=RESUME_DEADLINE):
+    """
+    Baixa url para dest, continuando de onde parou após falhas (nesta chamada ou em uma anterior).
+
+    Os bytes recebidos ficam em dest + '.part', com a identidade da versão (ETag/Last-Modified
+    e tamanho) em dest + '.part.json'. Cada nova tentativa pede só o restante (Range) com
+    If-Range: se o arquivo mudou no servidor, ele responde com a versão nova inteira e o
+    parcial é descartado. O arquivo completo é conferido (tamanho e SHA-256, do servidor
+    ou o esperado) e só então substitui dest de forma atômica.
+
+    Uma falha de conexão só gera nova tentativa quando a anterior recebeu bytes e o prazo
+    (deadline) ainda não acabou; caso contrário é repassada ao chamador na hora, com o
+    parcial mantido para a próxima chamada.
+
+    Args:
+        url: Endereço do arquivo
+        dest: Caminho final
+        session: Sessão autenticada (None = get_download_session(); uma sessão informada mantém
+                 as novas tentativas do próprio transporte)
+        timeout: Timeout de cada requisição (None = o padrão do transporte)
+        attempts: Tentativas antes de desistir (o parcial é mantido para a próxima chamada)
+        deadline: Tempo máximo (segundos) para começar uma nova tentativa
+        expected_sha256: Hash esperado do conteúdo (ex.: o enviado nas notificações do catálogo)
+        validate: Função chamada com o caminho do arquivo completo; levanta DownloadError se inválido
+        commit: Função que move o arquivo completo para o destino (padrão: os.replace para dest)
+
+    Returns:
+        str: SHA-256 do conteúdo baixado
+
+    Raises:
+        requests.exceptions.RequestException: Falha de conexão sem progresso, tentativas ou prazo
+            esgotados, ou erro HTTP
+        DownloadError: Conteúdo diferente do esperado ou inválido (o parcial é descartado)
+    """
+    session = session or get_download_session()
+    part_path, meta_path = dest + PART_SUFFIX, dest + META_SUFFIX
+    meta = _load_meta(part_path, meta_path, url)
+    give_up_at = time.monotonic() + deadline
+    with span('download', url=url, mode='resumable') as sp:
+        for attempt in range(attempts):
+            offset = os.path.getsize(part_path) if meta else 0
+            written = 0  # Bytes recebidos nesta tentativa
+            validator = meta and (meta.get('etag') or meta.get('last_modified'))
+            # Ranges valem sobre os bytes sem compressão de transporte (a planilha já é um zip)
+            headers = {'Accept-Encoding': 'identity'}
+            if offset and validator:
+                headers['Range'] = f'bytes={offset}-'
+                headers['If-Range'] = validator
+            try:
+                with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                    if response.status_code == 416:
+                        # Parcial maior que o arquivo do servidor: outra versão, recomeçar
+                        debug_print(f"Faixa recusada pelo servidor, recomeçando o download de {url}")
+                        discard_partial(dest)
+                        meta = None
+                        continue
+                    response.raise_for_status()
+                    if response.status_code == 206:
+                        mode = _check_resume(response, meta, offset)
+                        if mode is None:
+                            discard_partial(dest)
+                            meta = None
+                            continue
+                        sp.set(resumed_at=offset)
+                    else:
+                        # Conteúdo inteiro: primeira tentativa, servidor sem Range ou versão nova
+                        if offset:
+                            debug_print(f"Versão nova no servidor, descartando {offset} bytes já baixados")
+                        meta = _identity(response)
+                        meta['request_url'] = url
+                        with open(meta_path, 'w', encoding='utf-8') as f:
+                            json.dump(meta, f)
+                        mode = 'wb'
+                    with open(part_path, mode) as f:
+                        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK):
+                            f.write(chunk)
+                            written += len(chunk)
+                break
+            except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.Timeout) as e:
+                received = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+                debug_print(f"Download interrompido em {received} bytes (tentativa {attempt + 1}): {str(e)}")
+                delay = RESUME_BACKOFF * 2 ** attempt
+                # Sem bytes novos (servidor inacessível) ou sem tempo: não adianta insistir agora
+                if not written or attempt == attempts - 1 or \
+                        time.monotonic() + delay > give_up_at:
+                    raise
+                time.sleep(delay)
+        else:
+            raise DownloadError(f"Não foi possível baixar {url} em {attempts} tentativas")
+
+        size = os.path.getsize(part_path)
+        if meta.get('length') is not None and size != meta['length']:
+            discard_partial(dest)
+            raise DownloadError(f"Tamanho do download ({size}) diferente do informado ({meta['length']})")
+        digest = file_digest(part_path)
+        expected = meta.get('sha256') or expected_sha256
+        if expected and digest != expected:
+            discard_partial(dest)
+            raise DownloadError(f"Hash do download diferente do esperado ({digest[:12]} != {expected[:12]})")
+        if validate is not None:
+            try:
+                validate(part_path)
+            except DownloadError:
+                discard_partial(dest)
+                raise
+        sp.set(bytes=size, attempts=attempt + 1)
+
+    if commit is not None:
+        commit(part_path)
+    else:
+        os.replace(part_path, dest)
+    discard_partial(dest)
+    return digest
+
+
+def _check_resume(response, meta, offset):
+    """Confere se a resposta parcial continua a mesma versão; retorna o modo de gravação ou None"""
+    match = _CONTENT_RANGE.match(response.headers.get('Content-Range', ''))
+    if match is None or int(match.group(1)) != offset:
+        debug_print("Content-Range inesperado, recomeçando o download")
+        return None
+    total = match.group(3)
+    if meta.get('length') is not None and total != '*' and int(total) != meta['length']:
+        debug_print("Tamanho do arquivo mudou no servidor, recomeçando o download")
+        return None
+    # Servidores que ignoram If-Range: a ETag da resposta denuncia a versão nova
+    etag = response.headers.get('ETag')
+    if meta.get('etag') and etag and etag != meta['etag']:
+        debug_print("ETag mudou no servidor, recomeçando o download")
+        return None
+    return 'ab'
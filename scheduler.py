@@ -0,0 +1,354 @@
+import os
+import time
+import queue
+import random
+import threading
+
+from tracing import span
+
+# Configurações globais
+DEBUG = os.environ.get('MEUAGENDAMENTO_DEBUG') == '1'  # Ativar com MEUAGENDAMENTO_DEBUG=1 (nunca em produção)
+
+def debug_print(message):
+    """Função para imprimir mensagens de debug apenas quando DEBUG está ativado"""
+    if DEBUG:
+        print(f"[DEBUG] {message}")
+
+
+class Job:
+    """Tarefa periódica registrada no agendador, com suas estatísticas de execução"""
+
+    def __init__(self, name, func, interval, jitter, network, threaded, on_done, on_error):
+        self.name = name
+        self.func = func
+        self.interval = interval  # Intervalo normal em milissegundos
+        self.jitter = jitter  # Fração aleatória aplicada a cada intervalo (0.1 = ±10%)
+        self.network = network  # Tarefas de rede respeitam o circuito de modo offline
+        self.threaded = threaded  # Se True, func roda em uma thread e on_done na thread da interface
+        self.on_done = on_done
+        self.on_error = on_error
+        self.after_id = None
+        self.due_at = None  # Instante (monotônico) da próxima execução
+        self.running = False
+        self.consecutive_failures = 0
+        # Estatísticas
+        self.runs = 0
+        self.failures = 0
+        self.coalesced = 0
+        self.skipped_offline = 0
+        self.total_duration = 0.0
+        self.last_duration = None
+        self.last_run = None
+        self.last_error = None
+
+    def stats(self):
+        """Retorna as estatísticas de execução da tarefa"""
+        return {
+            'name': self.name,
+            'interval_ms': self.interval,
+            'runs': self.runs,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'coalesced': self.coalesced,
+            'skipped_offline': self.skipped_offline,
+            'avg_duration_ms': round(self.total_duration / self.runs * 1000, 1) if self.runs else None,
+            'last_duration_ms': round(self.last_duration * 1000, 1) if self.last_duration is not None else None,
+            'last_run': self.last_run,
+            'last_error': self.last_error,
+            'next_in_s': round(max(0.0, self.due_at - time.monotonic()), 1) if self.due_at else None,
+            'running': self.running,
+        }
+
+
+class BackgroundScheduler:
+    """
+    Agendador único das tarefas periódicas do aplicativo, construído sobre root.after.
+
+    - Intervalos com variação aleatória (jitter) para que clientes iniciados juntos não
+      consultem o servidor ao mesmo tempo
+    - Backoff exponencial por tarefa e um circuito compartilhado: após várias falhas de rede
+      seguidas, as tarefas de rede ficam suspensas e apenas uma sonda é enviada por vez
+    - Execuções sobrepostas da mesma tarefa são agrupadas (coalescing)
+    - Pausa enquanto a janela está minimizada e retoma ao restaurá-la
+    """
+
+    POLL_INTERVAL = 200  # Intervalo (ms) de leitura das chamadas vindas de outras threads
+
+    def __init__(self, root, failure_threshold=3, base_backoff=30000, max_backoff=1800000):
+        self.root = root
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.jobs = {}
+        self.paused = False
+        self.stopped = False
+        # Estado do circuito de rede: 'closed' (online) ou 'open' (offline)
+        self.circuit = 'closed'
+        self.network_failures = 0
+        self.circuit_retry_at = 0.0
+        self.probe_in_flight = False
+        self._inbox = queue.Queue()  # Chamadas enviadas por outras threads para a thread da interface
+        self._poll_id = None
+
+    # ------------------------------------------------------------------
+    # Registro e controle das tarefas
+    # ------------------------------------------------------------------
+    def add_job(self, name, func, interval, jitter=0.1, network=True, threaded=False,
+                on_done=None, on_error=None, initial_delay=None):
+        """
+        Registra uma tarefa periódica.
+
+        Args:
+            name: Nome único da tarefa
+            func: Função executada; deve lançar exceção ou retornar False em caso de falha
+            interval: Intervalo entre execuções (em milissegundos)
+            jitter: Fração de variação aleatória do intervalo
+            network: Se a tarefa depende do servidor (participa do circuito offline)
+            threaded: Se True, func roda em uma thread separada
+            on_done: Função chamada na thread da interface com o resultado de func
+            on_error: Função chamada na thread da interface com o erro, em caso de falha
+            initial_delay: Atraso da primeira execução; por padrão um valor aleatório
+                           entre metade e o intervalo completo
+        """
+        job = Job(name, func, interval, jitter, network, threaded, on_done, on_error)
+        self.jobs[name] = job
+        if initial_delay is None:
+            initial_delay = int(interval * random.uniform(0.5, 1.0))
+        self._schedule(job, initial_delay)
+        return job
+
+    def post(self, func, *args):
+        """Agenda func(*args) na thread da interface; pode ser chamado de qualquer thread"""
+        self._inbox.put((func, args))
+
+    def set_interval(self, name, interval):
+        """Altera o intervalo normal de uma tarefa (vale a partir do próximo agendamento)"""
+        job = self.jobs.get(name)
+        if job is not None:
+            job.interval = interval
+
+    def run_now(self, name):
+        """Executa a tarefa imediatamente, substituindo a execução agendada"""
+        job = self.jobs.get(name)
+        if job is None or self.stopped:
+            return
+        self._cancel(job)
+        self._fire(job, forced=True)
+
+    def pause(self):
+        """Suspende os temporizadores (ex.: janela minimizada)"""
+        if self.paused or self.stopped:
+            return
+        debug_print("Agendador pausado")
+        self.paused = True
+        for job in self.jobs.values():
+            if job.after_id is not None:
+                try:
+                    self.root.after_cancel(job.after_id)
+                except Exception as e:
+                    debug_print(f"Erro ao cancelar tarefa {job.name}: {str(e)}")
+                job.after_id = None
+
+    def resume(self):
+        """Retoma os temporizadores; tarefas vencidas durante a pausa rodam em seguida"""
+        if not self.paused or self.stopped:
+            return
+        debug_print("Agendador retomado")
+        self.paused = False
+        now = time.monotonic()
+        for job in self.jobs.values():
+            if job.running:
+                continue
+            remaining = int((job.due_at - now) * 1000) if job.due_at else 0
+            # Espalhar as tarefas vencidas por alguns segundos para não dispararem juntas
+            delay = remaining if remaining > 0 else random.randint(500, 5000)
+            self._schedule(job, delay, apply_jitter=False)
+
+    def stop(self):
+        """Cancela todas as tarefas (usado no encerramento do aplicativo)"""
+        self.stopped = True
+        for job in self.jobs.values():
+            self._cancel(job)
+        if self._poll_id is not None:
+            try:
+                self.root.after_cancel(self._poll_id)
+            except Exception as e:
+                debug_print(f"Erro ao cancelar leitura de chamadas: {str(e)}")
+            self._poll_id = None
+
+    def stats(self):
+        """Retorna as estatísticas de todas as tarefas e o estado do circuito"""
+        return {
+            'circuit': self.circuit,
+            'paused': self.paused,
+            'jobs': [job.stats() for job in self.jobs.values()],
+        }
+
+    def bind_window_state(self, window):
+        """Pausa o agendador quando a janela é minimizada e retoma quando é restaurada"""
+        def on_unmap(event):
+            if event.widget is window:
+                self.pause()
+
+        def on_map(event):
+            if event.widget is window:
+                self.resume()
+
+        window.bind('<Unmap>', on_unmap, add='+')
+        window.bind('<Map>', on_map, add='+')
+
+    # ------------------------------------------------------------------
+    # Funcionamento interno
+    # ------------------------------------------------------------------
+    def _jittered(self, delay, jitter):
+        if jitter <= 0:
+            return int(delay)
+        return max(0, int(delay * random.uniform(1 - jitter, 1 + jitter)))
+
+    def _schedule(self, job, delay, apply_jitter=True):
+        if self.stopped:
+            return
+        if apply_jitter:
+            delay = self._jittered(delay, job.jitter)
+        job.due_at = time.monotonic() + delay / 1000
+        if self.paused:
+            return
+        self._cancel(job)
+        job.after_id = self.root.after(delay, self._fire, job)
+
+    def _cancel(self, job):
+        if job.after_id is not None:
+            try:
+                self.root.after_cancel(job.after_id)
+            except Exception as e:
+                debug_print(f"Erro ao cancelar tarefa {job.name}: {str(e)}")
+            job.after_id = None
+
+    def _next_delay(self, job):
+        if job.consecutive_failures == 0:
+            return job.interval
+        backoff = self.base_backoff * (2 ** (job.consecutive_failures - 1))
+        return min(self.max_backoff, max(job.interval if job.network else 0, backoff))
+
+    def _fire(self, job, forced=False):
+        job.after_id = None
+        if self.stopped:
+            return
+
+        # Agrupar com a execução anterior que ainda não terminou
+        if job.running:
+            job.coalesced += 1
+            debug_print(f"Tarefa {job.name} ainda em execução, execução agrupada")
+            return
+
+        # Circuito aberto: apenas uma sonda por vez após o tempo de espera
+        if job.network and self.circuit == 'open' and not forced:
+            if self.probe_in_flight or time.monotonic() < self.circuit_retry_at:
+                job.skipped_offline += 1
+                wait = max(1000, int((self.circuit_retry_at - time.monotonic()) * 1000))
+                self._schedule(job, max(wait, job.interval))
+                return
+            self.probe_in_flight = True
+            debug_print(f"Circuito aberto: tarefa {job.name} usada como sonda de conexão")
+
+        job.running = True
+        job.last_run = time.time()
+        started = time.perf_counter()
+
+        if job.threaded:
+            def worker():
+                try:
+                    with span('job', job=job.name):
+                        result = job.func()
+                    self.post(self._finish, job, started, True, result)
+                except Exception as e:
+                    self.post(self._finish, job, started, False, e)
+
+            threading.Thread(target=worker, name=f"job-{job.name}", daemon=True).start()
+            return
+
+        try:
+            with span('job', job=job.name):
+                result = job.func()
+            self._finish(job, started, True, result)
+        except Exception as e:
+            self._finish(job, started, False, e)
+
+    def start(self):
+        """Inicia a leitura periódica das chamadas enviadas por outras threads"""
+        if self._poll_id is None and not self.stopped:
+            self._poll_id = self.root.after(self.POLL_INTERVAL, self._poll_inbox)
+
+    def _poll_inbox(self):
+        self._poll_id = None
+        if self.stopped:
+            return
+        while True:
+            try:
+                func, args = self._inbox.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                func(*args)
+            except Exception as e:
+                debug_print(f"Erro ao executar chamada recebida de outra thread: {str(e)}")
+        self.start()
+
+    def _finish(self, job, started, ok, value):
+        job.running = False
+        duration = time.perf_counter() - started
+        job.runs += 1
+        job.last_duration = duration
+        job.total_duration += duration
+
+        if ok and job.on_done is not None:
+            try:
+                done = job.on_done(value)
+                if done is False:
+                    ok, value = False, None
+            except Exception as e:
+                ok, value = False, e
+        elif ok and value is False:
+            ok = False
+
+        if self.stopped:
+            return
+
+        if ok:
+            job.consecutive_failures = 0
+            job.last_error = None
+            if job.network:
+                self._network_success()
+        else:
+            job.failures += 1
+            job.consecutive_failures += 1
+            job.last_error = str(value) if value is not None else 'falha'
+            debug_print(f"Tarefa {job.name} falhou ({job.consecutive_failures}x seguidas): {job.last_error}")
+            if job.on_error is not None:
+                try:
+                    job.on_error(value)
+                except Exception as e:
+                    debug_print(f"Erro ao tratar falha da tarefa {job.name}: {str(e)}")
+            if job.network:
+                self._network_failure()
+
+        self._schedule(job, self._next_delay(job))
+
+    def _network_success(self):
+        if self.circuit == 'open':
+            debug_print("Conexão restabelecida, circuito fechado")
+        self.circuit = 'closed'
+        self.network_failures = 0
+        self.probe_in_flight = False
+
+    def _network_failure(self):
+        self.network_failures += 1
+        self.probe_in_flight = False
+        if self.network_failures >= self.failure_threshold:
+            excess = self.network_failures - self.failure_threshold
+            wait = min(self.max_backoff, self.base_backoff * (2 ** excess))
+            wait = self._jittered(wait, 0.2)
+            if self.circuit != 'open':
+                debug_print(f"Servidor indisponível, circuito aberto por {wait / 1000:.0f} segundos")
+            self.circuit = 'open'
+            self.circuit_retry_at = time.monotonic() + wait / 1000
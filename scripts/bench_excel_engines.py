@@ -0,0 +1,63 @@
+"""
+Compara o tempo de leitura do catálogo com cada leitor de Excel instalado.
+
+Uso:
+    python scripts/bench_excel_engines.py [arquivo.xlsx] [--repeat 5]
+
+Mostra, para cada leitor (calamine, openpyxl, xlrd), o melhor tempo e a mediana
+de várias leituras, além do leitor escolhido automaticamente por excel_engine.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_engine import installed_engines, read_excel, select_engines, sniff_format  # noqa: E402
+
+
+def measure(path, engine, repeat):
+    times = []
+    rows = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        df = read_excel(path, engine=engine)
+        times.append(time.perf_counter() - started)
+        rows = len(df)
+    return min(times), statistics.median(times), rows
+
+
+def main():
+    default_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'files', 'dados.xlsx')
+    parser = argparse.ArgumentParser(description='Comparação de desempenho dos leitores de Excel')
+    parser.add_argument('file', nargs='?', default=default_file)
+    parser.add_argument('--repeat', type=int, default=5, help='Leituras por leitor')
+    args = parser.parse_args()
+
+    file_format = sniff_format(args.file)
+    print(f"Arquivo: {args.file} ({os.path.getsize(args.file) / 1024:.0f} KB, formato: {file_format})")
+    print(f"Leitores instalados: {', '.join(installed_engines())}")
+    print(f"Escolha automática: {(select_engines(file_format) or ['nenhum'])[0]}")
+    print()
+    print(f"{'leitor':<10} {'melhor (ms)':>12} {'mediana (ms)':>13} {'linhas':>8}")
+
+    results = {}
+    # Apenas os leitores capazes de abrir este formato (xlrd não lê .xlsx)
+    for engine in select_engines(file_format):
+        try:
+            results[engine] = measure(args.file, engine, args.repeat)
+        except Exception as e:
+            print(f"{engine:<10} {'-':>12} {'-':>13} {'-':>8}  ({str(e)[:60]})")
+
+    baseline = results.get('openpyxl')
+    for engine, (best, median, rows) in results.items():
+        line = f"{engine:<10} {best * 1000:>12.1f} {median * 1000:>13.1f} {rows:>8}"
+        if baseline and engine != 'openpyxl':
+            line += f"  ({baseline[1] / median:.1f}x em relação ao openpyxl)"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+"""
+Mede downloads e atualizações do catálogo sob diferentes condições de rede.
+
+Uso:
+    python scripts/bench_network_profiles.py [arquivo.xlsx] [--profiles "normal;3g;latency=0.2,bandwidth=65536"] [--repeat 3] [--no-app]
+
+Sobe o servidor local (scripts/stand_in_http_server.py) com o catálogo original e uma
+versão com preços alterados, entregues alternadamente, e para cada perfil de rede mede:
+  - download_excel_file (download do aplicativo com validação e cache);
+  - file_helper.download_xlsx_from_server (download com URLs alternativas);
+  - a atualização completa do CSVFilterApp (download e leitura em segundo plano, troca dos
+    dados na interface) e a responsividade da interface durante ela: o atraso de um
+    batimento agendado a cada 20 ms com root.after (máximo e percentil 95).
+A parte do CSVFilterApp requer um display (em servidores: xvfb-run). O cache usado fica
+em um diretório temporário, sem tocar no cache do usuário.
+Termina com erro (código 1) se algum download aceito gravar um conteúdo que não é nenhuma
+das versões servidas (ex.: a página de erro do perfil 'json' salva como catálogo).
+"""
+import os
+import sys
+import time
+import hashlib
+import argparse
+import tempfile
+import threading
+import statistics
+
+import numpy as np
+import pandas as pd
+
+# Cache isolado (antes de importar os módulos do aplicativo)
+os.environ['MEUAGENDAMENTO_CACHE_DIR'] = tempfile.mkdtemp(prefix='bench_rede_')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import file_helper  # noqa: E402
+import produtros_v2 as app_module  # noqa: E402
+from sheet_loader import load_catalog  # noqa: E402
+from stand_in_http_server import PROFILES, Profile, make_server  # noqa: E402
+
+PROBE_INTERVAL = 20  # ms entre os batimentos que medem a responsividade da interface
+# Resultado de um download aceito cujo conteúdo não é nenhuma das versões servidas (falha do benchmark)
+INVALID = 'inválido/corrompido'
+BASIC_DATA_COLUMNS = ['Código', 'Produto', 'Preço', 'Estoque', 'Categoria']
+
+
+def digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def write_variant(path, directory):
+    """Cópia do catálogo com 10% dos preços alterados (cada download entrega um conteúdo diferente)"""
+    df = load_catalog([path])
+    price_col = next((col for col in df.columns if str(col).upper().strip() == 'PREÇO'), None)
+    if price_col is not None:
+        rng = np.random.default_rng(0)
+        changed = rng.choice(len(df), size=max(1, len(df) // 10), replace=False)
+        df.loc[df.index[changed], price_col] = rng.integers(1, 9000, size=len(changed))
+    variant = os.path.join(directory, 'dados_variante.xlsx')
+    df.to_excel(variant, index=False)
+    return variant
+
+
+def summarize(label, results):
+    """Imprime os tempos e resultados de uma medição; retorna quantos downloads foram inválidos"""
+    times = [elapsed for elapsed, _ in results]
+    outcomes = {}
+    for _, outcome in results:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    print(f"  {label:<28} mediana {statistics.median(times) * 1000:>8.0f} ms  máx {max(times) * 1000:>8.0f} ms  "
+          + ', '.join(f"{k}: {v}" for k, v in sorted(outcomes.items())))
+    return outcomes.get(INVALID, 0)
+
+
+def file_state(path):
+    """Identidade do arquivo no disco (muda a cada substituição, mesmo com o mesmo conteúdo)"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def is_basic_data(path):
+    """Arquivo de dados básicos que o file_helper grava quando nenhum download funciona"""
+    try:
+        return list(pd.read_excel(path).columns) == BASIC_DATA_COLUMNS
+    except Exception:
+        return False
+
+
+def bench_download_excel_file(expected, repeat):
+    results = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        path = app_module.download_excel_file(use_local_fallback=False)
+        elapsed = time.perf_counter() - started
+        if path is None:
+            outcome = 'falhou'
+        else:
+            # Arquivo gravado que não é nenhuma das versões servidas: download corrompido aceito
+            outcome = 'ok' if digest(path) in expected else INVALID
+        results.append((elapsed, outcome))
+    return results
+
+
+def bench_download_xlsx(base_url, expected, repeat):
+    results = []
+    target = file_helper.get_file_path()
+    for _ in range(repeat):
+        before = file_state(target)
+        started = time.perf_counter()
+        ok, path = file_helper.download_xlsx_from_server(file_urls=[f"{base_url}/api/files"])
+        elapsed = time.perf_counter() - started
+        if not ok:
+            outcome = 'falhou'
+        elif digest(path) in expected:
+            # Download recusado: o file_helper mantém o arquivo de um download anterior
+            outcome = 'ok' if file_state(path) != before else 'mantido o anterior'
+        elif is_basic_data(path):
+            # Sem download nem arquivo anterior, o file_helper grava dados básicos
+            outcome = 'dados básicos'
+        else:
+            outcome = INVALID
+        results.append((elapsed, outcome))
+    return results
+
+
+class LagProbe:
+    """Atraso de um batimento agendado com root.after (quanto a interface demorou a responder)"""
+
+    def __init__(self, root):
+        self.root = root
+        self.lags = []
+        self._expected = None
+        self._after_id = None
+
+    def start(self):
+        self._expected = time.perf_counter() + PROBE_INTERVAL / 1000
+        self._after_id = self.root.after(PROBE_INTERVAL, self._beat)
+
+    def _beat(self):
+        now = time.perf_counter()
+        self.lags.append(max(0.0, now - self._expected))
+        self._expected = now + PROBE_INTERVAL / 1000
+        self._after_id = self.root.after(PROBE_INTERVAL, self._beat)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+
+
+def bench_app_refresh(app, repeat):
+    """Atualização como a do agendador: download e leitura em uma thread, troca na thread da interface"""
+    results, lags = [], []
+    for _ in range(repeat):
+        done = threading.Event()
+        outcome = {}
+
+        def finish(result, error):
+            if error is None:
+                app.apply_remote_catalog(result)
+                outcome['value'] = 'ok' if result[0] is not None else 'sem alterações'
+            else:
+                app.on_remote_catalog_error(error)
+                outcome['value'] = type(error).__name__
+            done.set()
+
+        def worker():
+            try:
+                app.scheduler.post(finish, app.fetch_remote_catalog(), None)
+            except Exception as e:
+                app.scheduler.post(finish, None, e)
+
+        probe = LagProbe(app.root)
+        probe.start()
+        started = time.perf_counter()
+        threading.Thread(target=worker, daemon=True).start()
+        while not done.is_set():
+            app.root.update()
+            time.sleep(0.001)
+        results.append((time.perf_counter() - started, outcome['value']))
+        probe.stop()
+        lags.extend(probe.lags)
+    return results, lags
+
+
+def create_app(path):
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"\nSem display, CSVFilterApp não medido ({e}). Use xvfb-run.")
+        return None
+    root.withdraw()
+    # Modo local na abertura (sem login); as atualizações medidas usam o servidor local
+    app_module.USE_REMOTE_FILE = False
+    app_module.CATALOG_PUSH_ENABLED = False
+    app_module.STALL_WATCHDOG_ENABLED = False
+    # Histórico de preços no diretório temporário do teste, nunca no do usuário
+    app_module.PRICE_HISTORY_PATH = os.path.join(os.environ['MEUAGENDAMENTO_CACHE_DIR'], 'history', 'precos.sqlite')
+    app_module.CSVFilterApp.start_file_watcher = lambda self: None
+    app = app_module.CSVFilterApp(root, excel_file_path=path)
+    app.root.update()
+    return app
+
+
+def main():
+    default_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'files', 'dados.xlsx')
+    parser = argparse.ArgumentParser(description='Downloads e atualizações sob diferentes perfis de rede')
+    parser.add_argument('file', nargs='?', default=default_file)
+    parser.add_argument('--profiles', default=';'.join(PROFILES),
+                        help='Perfis testados, separados por ponto e vírgula (nomes ou valores avulsos)')
+    parser.add_argument('--repeat', type=int, default=3, help='Medições por perfil')
+    parser.add_argument('--no-app', action='store_true', help='Não medir o CSVFilterApp (sem display)')
+    args = parser.parse_args()
+
+    variant = write_variant(args.file, os.environ['MEUAGENDAMENTO_CACHE_DIR'])
+    expected = {digest(args.file), digest(variant)}
+    server = make_server([args.file, variant], rotate=True, verbose=False)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    app_module.EXCEL_URL = f"{base_url}/api/dados/dados.xlsx"
+    # O file_helper avisa com uma janela quando recorre aos dados básicos
+    file_helper.messagebox.showinfo = lambda *a, **k: None
+
+    print(f"Servidor local: {base_url} ({os.path.getsize(args.file) / 1024:.0f} KB por download)")
+    app = None if args.no_app else create_app(args.file)
+    invalid = 0
+    for name in args.profiles.split(';'):
+        server.state.profile = Profile.parse(name.strip())
+        print(f"\nPerfil: {server.state.profile}")
+        invalid += summarize('download_excel_file', bench_download_excel_file(expected, args.repeat))
+        invalid += summarize('download_xlsx_from_server', bench_download_xlsx(base_url, expected, args.repeat))
+        if app is not None:
+            results, lags = bench_app_refresh(app, args.repeat)
+            summarize('CSVFilterApp (atualização)', results)
+            if lags:
+                print(f"  {'interface (atraso)':<28} máx {max(lags) * 1000:>8.0f} ms  "
+                      f"p95 {np.percentile(lags, 95) * 1000:>8.0f} ms  ({len(lags)} batimentos)")
+    print(f"\nContadores do servidor: {server.state.counts}")
+    if app is not None:
+        app.scheduler.stop()
+        if app.price_history is not None:
+            app.price_history.close()
+        app.root.destroy()
+    server.shutdown()
+    if invalid:
+        print(f"\nFALHA: {invalid} download(s) gravaram um conteúdo que não é nenhuma das versões servidas")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
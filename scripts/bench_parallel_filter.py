@@ -0,0 +1,108 @@
+"""
+Mede o ganho da avaliação do filtro por blocos em vários núcleos.
+
+Uso:
+    python scripts/bench_parallel_filter.py [arquivo.xlsx] [--rows 1000000] [--repeat 3] [--workers 1,2,4,8]
+
+Replica o catálogo até a quantidade de linhas pedida e, para cada consulta, mede:
+  - a avaliação comum (o catálogo inteiro de uma vez, uma thread), como referência;
+  - a avaliação por blocos com 1 a N threads (N = núcleos da máquina, por padrão);
+  - o tempo até a primeira página (FIRST_PAGE_ROWS linhas com resultado final).
+A preparação das colunas (minúsculas e Arrow) é feita uma vez e não entra nos tempos,
+como no aplicativo, onde ela acontece uma vez por carga do catálogo.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parallel_filter import CHUNK_ROWS, MAX_WORKERS, ChunkedExecutor, arrow_installed  # noqa: E402
+from produtros_v2 import FIRST_PAGE_ROWS  # noqa: E402
+from query import QueryContext, compile_query  # noqa: E402
+from sheet_loader import load_catalog  # noqa: E402
+
+QUERIES = ['samsung', 'cabo usb -capa', '(galaxy OU iphone) preço<2000', '/ga.*xy/']
+
+
+def measure(context, node, repeat):
+    """Melhor tempo e mediana da avaliação, e mediana do tempo até a primeira página"""
+    totals, firsts = [], []
+    for _ in range(repeat):
+        context._masks.clear()  # Avaliação sempre do zero (sem máscaras memorizadas)
+        first = []
+        started = time.perf_counter()
+
+        def on_partial(mask, end):
+            if not first and np.count_nonzero(mask[:end]) >= FIRST_PAGE_ROWS:
+                first.append(time.perf_counter() - started)
+
+        context.combined_mask([node], on_partial=on_partial)
+        totals.append(time.perf_counter() - started)
+        firsts.append(first[0] if first else totals[-1])
+    return min(totals), statistics.median(totals), statistics.median(firsts)
+
+
+def main():
+    default_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'files', 'dados.xlsx')
+    parser = argparse.ArgumentParser(description='Escalabilidade do filtro por blocos')
+    parser.add_argument('file', nargs='?', default=default_file)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Linhas do catálogo sintético')
+    parser.add_argument('--repeat', type=int, default=3, help='Avaliações por consulta')
+    parser.add_argument('--workers', default=None, help='Threads testadas, separadas por vírgula (padrão: 1, 2, 4... até os núcleos)')
+    args = parser.parse_args()
+
+    base = load_catalog([args.file])
+    rng = np.random.default_rng(0)
+    df = base.iloc[rng.integers(0, len(base), args.rows)].reset_index(drop=True)
+    if args.workers:
+        workers = [int(w) for w in args.workers.split(',')]
+    else:
+        workers = sorted({1, MAX_WORKERS} | {2 ** i for i in range(1, 8) if 2 ** i < MAX_WORKERS})
+
+    print(f"Catálogo: {len(df)} linhas ({len(base)} originais), blocos de {CHUNK_ROWS} linhas")
+    print(f"Núcleos: {MAX_WORKERS}; Arrow: {'sim' if arrow_installed else 'não (blocos em sequência)'}")
+
+    started = time.perf_counter()
+    sequential = QueryContext(df)
+    for col in df.columns:
+        sequential.text(col)
+    contexts = {}
+    for count in workers:
+        context = QueryContext(df, ChunkedExecutor(workers=count))
+        # Colunas já preparadas são compartilhadas entre os contextos
+        context._text, context._numbers = sequential._text, sequential._numbers
+        contexts[count] = context
+    first = contexts[workers[0]]
+    for col in df.columns:
+        first.arrow_text(col)
+    for context in contexts.values():
+        context._arrow = first._arrow
+    print(f"Preparação das colunas: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    for query in QUERIES:
+        node = compile_query(query)
+        print(f"\nConsulta: {query}")
+        print(f"{'threads':<10} {'melhor (ms)':>12} {'mediana (ms)':>13} {'1ª página (ms)':>15} {'ganho':>7}")
+        times = []
+        for _ in range(args.repeat):
+            sequential._masks.clear()
+            started = time.perf_counter()
+            sequential.mask(node)
+            times.append(time.perf_counter() - started)
+        reference = statistics.median(times)
+        print(f"{'comum':<10} {min(times) * 1000:>12.1f} {reference * 1000:>13.1f} {'-':>15} {'1.0x':>7}")
+        for count, context in contexts.items():
+            best, median, first_page = measure(context, node, args.repeat)
+            print(f"{count:<10} {best * 1000:>12.1f} {median * 1000:>13.1f} {first_page * 1000:>15.1f} "
+                  f"{reference / median:>6.1f}x")
+    for context in contexts.values():
+        context.executor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
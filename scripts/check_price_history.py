@@ -0,0 +1,94 @@
+"""
+Verifica se ocultar ou exibir colunas não altera o histórico de preços.
+
+Uso:
+    python scripts/check_price_history.py [arquivo.xlsx] [--changes 25]
+
+Grava o catálogo em um histórico temporário e repete a gravação como a janela principal
+faz (DataFrame sem as colunas ocultas e os arquivos do catálogo em sources):
+  - com DESCRIÇÃO DO SITE oculta e depois exibida novamente: nenhuma alteração;
+  - com preços alterados na planilha e a descrição oculta: apenas as linhas alteradas;
+  - um DataFrame sem a descrição e sem os arquivos (chave diferente da gravada): ignorado.
+
+Em todos os casos a quantidade de séries deve continuar igual à de linhas do catálogo.
+Termina com código 1 se alguma verificação falhar.
+"""
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+
+import openpyxl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fingerprint import DETAIL_KEY_COLUMNS  # noqa: E402
+from price_history import PriceHistory  # noqa: E402
+from sheet_loader import load_catalog, normalize_column  # noqa: E402
+
+
+def change_prices(path, dest, count):
+    """Copia a planilha alterando o preço de 'count' linhas espalhadas pela primeira aba"""
+    wb = openpyxl.load_workbook(path)
+    ws = wb.worksheets[0]
+    header = [normalize_column(cell.value) for cell in ws[1]]
+    column = header.index('PREÇO') + 1
+    step = max(1, (ws.max_row - 1) // count)
+    rows = list(range(2, ws.max_row + 1, step))[:count]
+    for i, row in enumerate(rows):
+        ws.cell(row=row, column=column, value=100000 + i)
+    wb.save(dest)
+    return len(rows)
+
+
+def main():
+    default_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'files', 'dados.xlsx')
+    parser = argparse.ArgumentParser(description='Teste do histórico de preços com colunas ocultas')
+    parser.add_argument('file', nargs='?', default=default_file)
+    parser.add_argument('--changes', type=int, default=25, help='Preços alterados na segunda versão')
+    args = parser.parse_args()
+
+    hidden = tuple(DETAIL_KEY_COLUMNS)
+    workdir = tempfile.mkdtemp(prefix='check_price_history_')
+    history = PriceHistory(os.path.join(workdir, 'precos.sqlite'))
+    failures = []
+
+    def check(label, result, expected):
+        series = history.stats()['series']
+        ok = result == expected and series == rows
+        print(f"{label:<45} {str(result):>8} alterações (esperado {expected}), {series} séries")
+        if not ok:
+            failures.append(label)
+
+    try:
+        full = load_catalog([args.file])
+        rows = len(full)
+        visible = load_catalog([args.file], exclude=hidden)
+        if len(visible.columns) == len(full.columns):
+            print(f"{args.file} não tem a coluna {hidden[0]}")
+            return 1
+
+        check('catálogo completo', history.submit(full, 'v1', sources=[args.file]).result(), rows)
+        check('descrição oculta', history.submit(visible, 'v2', sources=[args.file]).result(), 0)
+        check('descrição exibida novamente', history.submit(full, 'v3', sources=[args.file]).result(), 0)
+
+        changed_file = os.path.join(workdir, os.path.basename(args.file))
+        changed = change_prices(args.file, changed_file, args.changes)
+        changed_visible = load_catalog([changed_file], exclude=hidden)
+        check('preços alterados, descrição oculta',
+              history.submit(changed_visible, 'v4', sources=[changed_file]).result(), changed)
+        check('sem descrição e sem arquivos (ignorado)', history.record(changed_visible, 'v5'), None)
+    finally:
+        history.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if failures:
+        print(f"FALHOU: {', '.join(failures)}")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
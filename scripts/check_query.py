@@ -0,0 +1,120 @@
+"""
+Verifica casos-limite da busca avançada (query.py).
+
+Uso:
+    python scripts/check_query.py [arquivo.xlsx]
+
+Confere que:
+  - consultas incompletas, como ficam enquanto o usuário digita (negação sem termo no
+    fim, '-' solto), são aceitas sem erro e ignoram a parte incompleta;
+  - o índice de códigos (KeyIndex) encontra as linhas certas com células vazias na coluna;
+  - buscas por prefixo acentuado (desc:ó*) têm o mesmo resultado na avaliação comum e na
+    avaliação por blocos, e o mesmo do re do Python (o catálogo é replicado até
+    PARALLEL_MIN_ROWS linhas para usar os blocos).
+Termina com código 1 se alguma verificação falhar.
+"""
+import os
+import re
+import sys
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parallel_filter import PARALLEL_MIN_ROWS, ChunkedExecutor  # noqa: E402
+from query import KeyIndex, QueryContext, QueryError, compile_query  # noqa: E402
+from sheet_loader import load_catalog  # noqa: E402
+
+# Consulta sendo digitada -> consulta equivalente (None = sem filtro)
+INCOMPLETE = {
+    'NOT': None,
+    'NAO': None,
+    '-': None,
+    'iphone NÃO': 'iphone',
+    'cabo AND NOT': 'cabo',
+    'x OR NOT': 'x',
+    '(cabo NOT': 'cabo',
+    '- cabo': 'cabo',
+    'cabo -': 'cabo',
+}
+
+# Prefixos (coluna, início da palavra) comparados entre a avaliação comum, por blocos e o re do Python
+PREFIXES = [('DESCRIÇÃO DO SITE', 'ó'), ('DESCRIÇÃO DO SITE', 'câm'), ('DESCRIÇÃO DO SITE', 'é'),
+            ('PRODUTO', 'ár'), ('DESCRIÇÃO DO SITE', 'sa')]
+
+
+def check_incomplete(failures):
+    for text, expected in INCOMPLETE.items():
+        try:
+            node = compile_query(text)
+        except (QueryError, IndexError) as e:
+            node = f"{type(e).__name__}: {e}"
+        wanted = compile_query(expected) if expected is not None else None
+        ok = getattr(node, 'key', node) == getattr(wanted, 'key', wanted)
+        print(f"{text!r:<20} {str(node):<40} {'ok' if ok else f'esperado {wanted}'}")
+        if not ok:
+            failures.append(text)
+
+
+def check_blank_codes(failures):
+    # Células vazias (None/NaN) antes e entre os códigos, como na junção de abas com colunas diferentes
+    codes = pd.Series([None, 'A1', ' b2', np.nan, 'a1 ', 'C3', ''])
+    index = KeyIndex(codes)
+    expected = {'A1': [1, 4], 'B2': [2], 'C3': [5], 'ZZ': [], '': []}
+    for key, positions in expected.items():
+        found = sorted(index.lookup(key).tolist())
+        ok = found == positions
+        print(f"KeyIndex {key!r:<6} {str(found):<12} {'ok' if ok else f'esperado {positions}'}")
+        if not ok:
+            failures.append(f"KeyIndex {key}")
+    mask, missing = index.mask(['a1', 'C3', 'ZZ'])
+    if np.flatnonzero(mask).tolist() != [1, 4, 5] or missing != ['ZZ']:
+        print(f"KeyIndex.mask: {np.flatnonzero(mask).tolist()}, não encontrados {missing}")
+        failures.append('KeyIndex.mask')
+
+
+def check_accented_prefixes(path, failures):
+    base = load_catalog([path])
+    repeats = -(-PARALLEL_MIN_ROWS // len(base))
+    df = pd.concat([base] * repeats, ignore_index=True)
+    executor = ChunkedExecutor()
+    try:
+        for col, prefix in PREFIXES:
+            match = next((c for c in df.columns if str(c).upper().strip() == col), None)
+            if match is None:
+                continue
+            node = compile_query(f"{col.split()[0].lower()}:{prefix}*")
+            plain = QueryContext(df).combined_mask([node])
+            chunked = QueryContext(df, executor).combined_mask([node])
+            pattern = re.compile(r'\b' + re.escape(prefix))
+            expected = np.array([bool(pattern.search(str(v).lower())) for v in base[match]] * repeats)
+            ok = (plain == expected).all() and (chunked == expected).all()
+            print(f"{node.key:<30} comum {int(plain.sum()):>7}  blocos {int(chunked.sum()):>7}  "
+                  f"re {int(expected.sum()):>7}  {'ok' if ok else 'DIFERENTE'}")
+            if not ok:
+                failures.append(node.key)
+    finally:
+        executor.shutdown()
+
+
+def main():
+    default_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'files', 'dados.xlsx')
+    parser = argparse.ArgumentParser(description='Casos-limite da busca avançada')
+    parser.add_argument('file', nargs='?', default=default_file)
+    args = parser.parse_args()
+
+    failures = []
+    check_incomplete(failures)
+    check_blank_codes(failures)
+    check_accented_prefixes(args.file, failures)
+    if failures:
+        print(f"FALHOU: {', '.join(map(repr, failures))}")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Verifica se atualizações repetidas do catálogo devolvem a memória a um patamar estável.
+
+Uso:
+    python scripts/check_refresh_memory.py [--refreshes 200] [--warmup 20] [--max-growth-kb 512]
+
+Abre a janela principal (modo local, sem login nem servidor), simula N atualizações
+do catálogo (preços alterados, linhas incluídas/removidas e, periodicamente, colunas
+ocultadas/exibidas, que recriam os filtros) e compara, entre o fim do aquecimento e o
+fim do teste:
+  - a memória alocada pelo Python (tracemalloc);
+  - a quantidade de comandos e variáveis do interpretador Tcl (binds e traces esquecidos).
+
+Termina com código 1 se algum deles crescer além do limite. Requer um display
+(em servidores: xvfb-run python scripts/check_refresh_memory.py).
+"""
+import os
+import gc
+import sys
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import tkinter as tk
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import produtros_v2 as app_module  # noqa: E402
+from fingerprint import FrameFingerprint  # noqa: E402
+from sheet_loader import load_catalog, normalize_column  # noqa: E402
+
+
+def tcl_counts(root):
+    """Comandos e variáveis globais registrados no interpretador Tcl"""
+    return len(root.tk.splitlist(root.tk.call('info', 'commands'))), len(root.tk.splitlist(root.tk.call('info', 'vars')))
+
+
+def variant(base, step, rng, hidden=()):
+    """
+    Versão do catálogo para a atualização 'step': preços alterados e linhas incluídas ou removidas.
+    Sem as colunas ocultas, como viria do download (com elas, apply_remote_catalog recarregaria
+    as fontes originais e a atualização simulada seria descartada).
+    """
+    df = base[[col for col in base.columns if normalize_column(col) not in hidden]].copy()
+    price_col = next(col for col in df.columns if str(col).upper().strip() == 'PREÇO')
+    changed = rng.choice(len(df), size=max(1, len(df) // 50), replace=False)
+    df.loc[df.index[changed], price_col] = rng.integers(1, 9000, size=len(changed))
+    # Linhas removidas e incluídas alternadamente
+    if step % 2:
+        df = df.drop(df.index[rng.choice(len(df), size=5, replace=False)])
+    else:
+        df = pd.concat([df, df.iloc[:5]], ignore_index=True)
+    return df.reset_index(drop=True)
+
+
+def refresh(app, base, step, rng):
+    """Uma atualização simulada; retorna False se ela foi descartada (dados exibidos não são os dela)"""
+    # A cada 5 atualizações, uma coluna é ocultada ou exibida (recria os filtros e o menu de colunas)
+    if step % 5 == 0:
+        app.toggle_column('DESCRIÇÃO DO SITE')
+    df = variant(base, step, rng, app.hidden_columns)
+    app.apply_remote_catalog((df, f"simulado-{step}", FrameFingerprint(df), app.catalog_sources))
+    applied = app.df is df
+    # Filtro digitado e apagado (traces das variáveis e máscaras da consulta)
+    var = next(iter(app.filter_vars.values()), None)
+    if var is not None:
+        var.set('a')
+        var.set('')
+    app.root.update()
+    return applied
+
+
+def main():
+    default_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'files', 'dados.xlsx')
+    parser = argparse.ArgumentParser(description='Teste de vazamento de memória nas atualizações do catálogo')
+    parser.add_argument('file', nargs='?', default=default_file)
+    parser.add_argument('--refreshes', type=int, default=200, help='Atualizações medidas (múltiplo de 10)')
+    parser.add_argument('--warmup', type=int, default=20, help='Atualizações antes da medição (múltiplo de 10)')
+    parser.add_argument('--max-growth-kb', type=float, default=512, help='Crescimento máximo aceito (KB)')
+    parser.add_argument('--max-tcl-growth', type=int, default=5, help='Comandos/variáveis Tcl a mais aceitos')
+    args = parser.parse_args()
+
+    # Modo local, sem servidor, notificações, observador de arquivos nem watchdog
+    app_module.USE_REMOTE_FILE = False
+    app_module.CATALOG_PUSH_ENABLED = False
+    app_module.STALL_WATCHDOG_ENABLED = False
+    app_module.CSVFilterApp.start_file_watcher = lambda self: None
+    # Histórico de preços em um diretório temporário, nunca no do usuário
+    history_dir = tempfile.mkdtemp(prefix='check_refresh_memory_')
+    app_module.PRICE_HISTORY_PATH = os.path.join(history_dir, 'precos.sqlite')
+
+    root = tk.Tk()
+    root.withdraw()
+    app = app_module.CSVFilterApp(root, excel_file_path=args.file)
+    app.catalog_sources = [args.file]
+    base = load_catalog([args.file])
+    app.df = base
+    app.catalog_fingerprint = FrameFingerprint(base)
+    app.build_filters()
+    app.update_table()
+
+    rng = np.random.default_rng(0)
+    tracemalloc.start(25)
+    discarded = 0
+    for step in range(args.warmup):
+        discarded += not refresh(app, base, step, rng)
+    gc.collect()
+    baseline = tracemalloc.take_snapshot()
+    baseline_size = tracemalloc.get_traced_memory()[0]
+    baseline_tcl = tcl_counts(root)
+
+    # Com um múltiplo de 10, o teste termina na mesma posição do ciclo em que o aquecimento
+    # terminou (mesmas colunas visíveis e mesma quantidade de linhas)
+    for step in range(args.warmup, args.warmup + args.refreshes):
+        discarded += not refresh(app, base, step, rng)
+    gc.collect()
+    final = tracemalloc.take_snapshot()
+    final_size = tracemalloc.get_traced_memory()[0]
+    final_tcl = tcl_counts(root)
+
+    growth_kb = (final_size - baseline_size) / 1024
+    print(f"Atualizações medidas: {args.refreshes} (após {args.warmup} de aquecimento)")
+    print(f"Memória do Python: {baseline_size / 1024:.0f} KB -> {final_size / 1024:.0f} KB ({growth_kb:+.0f} KB)")
+    print(f"Comandos Tcl: {baseline_tcl[0]} -> {final_tcl[0]}; variáveis Tcl: {baseline_tcl[1]} -> {final_tcl[1]}")
+    print("\nMaiores diferenças de alocação:")
+    for stat in final.compare_to(baseline, 'traceback')[:10]:
+        frame = stat.traceback[-1]
+        print(f"  {stat.size_diff / 1024:+8.1f} KB {stat.count_diff:+6d} blocos  {frame.filename}:{frame.lineno}")
+
+    failures = []
+    if discarded:
+        failures.append(f"{discarded} atualizações simuladas não foram aplicadas (o teste não exercitou a troca)")
+    if growth_kb > args.max_growth_kb:
+        failures.append(f"memória cresceu {growth_kb:.0f} KB (limite {args.max_growth_kb:.0f} KB)")
+    if final_tcl[0] - baseline_tcl[0] > args.max_tcl_growth:
+        failures.append(f"{final_tcl[0] - baseline_tcl[0]} comandos Tcl a mais (binds/traces não liberados)")
+    if final_tcl[1] - baseline_tcl[1] > args.max_tcl_growth:
+        failures.append(f"{final_tcl[1] - baseline_tcl[1]} variáveis Tcl a mais")
+
+    app.scheduler.stop()
+    if app.price_history is not None:
+        app.price_history.close()
+    root.destroy()
+    shutil.rmtree(history_dir, ignore_errors=True)
+    if failures:
+        print("\nFALHOU: " + '; '.join(failures))
+        sys.exit(1)
+    print("\nOK: memória estável")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,322 @@
+"""
+Servidor HTTP local que imita as rotas usadas pelo aplicativo, com falhas de rede simuladas.
+
+Uso:
+    python scripts/stand_in_http_server.py --port 8080 --file files/dados.xlsx --profile 3g
+
+No aplicativo, aponte EXCEL_URL para http://localhost:8080/api/dados/dados.xlsx e
+AUTH_URL/STATUS_URL para http://localhost:8080/api/login e /api/user. Rotas:
+  GET  .../dados.xlsx     planilha (qualquer caminho terminado em dados.xlsx, como os do file_helper)
+  POST /api/login         login (qualquer senha; usuário 'bloqueado' recebe 401 de conta bloqueada)
+  GET  /api/user          status do usuário (401 sem o cookie do login)
+  GET  /_profile/<nome>   troca o perfil de rede com o servidor rodando
+  GET  /_publish          publica a próxima versão (com vários --file), como uma atualização no servidor
+
+A planilha é servida com ETag, Last-Modified e Repr-Digest (SHA-256) e aceita Range com
+If-Range: a continuação de um download interrompido recebe só o restante, e um pedido de
+continuação de uma versão antiga recebe a versão atual inteira.
+
+Perfis (--profile): normal, 3g, lento, truncado, json, instavel, fora; ou valores avulsos,
+ex.: --profile "latency=0.2,bandwidth=65536,error_rate=0.1". Com --rotate e vários --file,
+cada download entrega o próximo arquivo (catálogo sempre diferente, para medir atualizações).
+Digitar o nome de um perfil no terminal também troca o perfil.
+"""
+import os
+import re
+import sys
+import json
+import time
+import base64
+import random
+import hashlib
+import secrets
+import argparse
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+SEND_CHUNK = 16 * 1024
+RANGE_HEADER = re.compile(r'bytes=(\d+)-$')
+
+# Perfis de rede: latência (s) antes da resposta, variação da latência (s), banda (bytes/s, 0 = sem limite),
+# fração do corpo enviada antes de fechar a conexão (0 = completo; só nas respostas inteiras, a
+# continuação com Range chega completa), chance de erro e status do erro,
+# e resposta JSON de erro com status 200 no lugar da planilha
+PROFILES = {
+    'normal': {},
+    '3g': {'latency': 0.3, 'jitter': 0.1, 'bandwidth': 48 * 1024},
+    'lento': {'latency': 1.5, 'jitter': 0.5, 'bandwidth': 16 * 1024},
+    'truncado': {'truncate': 0.5},
+    'json': {'json_error': True},
+    'instavel': {'error_rate': 0.5, 'error_status': 503},
+    'fora': {'error_rate': 1.0, 'error_status': 502},
+}
+
+
+class Profile:
+    def __init__(self, name='normal', latency=0.0, jitter=0.0, bandwidth=0, truncate=0.0,
+                 error_rate=0.0, error_status=503, json_error=False):
+        self.name = name
+        self.latency = float(latency)
+        self.jitter = float(jitter)
+        self.bandwidth = int(bandwidth)
+        self.truncate = float(truncate)
+        self.error_rate = float(error_rate)
+        self.error_status = int(error_status)
+        self.json_error = json_error in (True, 'true', '1')
+
+    @classmethod
+    def parse(cls, text):
+        """Perfil pelo nome ou por valores avulsos ('latency=0.2,bandwidth=65536')"""
+        if text in PROFILES:
+            return cls(text, **PROFILES[text])
+        values = dict(item.split('=', 1) for item in text.split(',') if '=' in item)
+        try:
+            return cls(text, **values)
+        except TypeError as e:
+            raise ValueError(f"Perfil inválido: {text} ({e})")
+
+    def __repr__(self):
+        return (f"{self.name} (latência {self.latency}s±{self.jitter}, banda {self.bandwidth or '-'} B/s, "
+                f"truncar {self.truncate or '-'}, erros {self.error_rate:.0%} -> {self.error_status}"
+                f"{', JSON' if self.json_error else ''})")
+
+
+class ServedFile:
+    """Conteúdo servido com a identidade usada nos downloads retomáveis (ETag, data, SHA-256)"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.body = f.read()
+        digest = hashlib.sha256(self.body).digest()
+        self.etag = f'"{digest.hex()[:16]}"'
+        self.last_modified = formatdate(os.path.getmtime(path), usegmt=True)
+        self.repr_digest = f"sha-256=:{base64.b64encode(digest).decode()}:"
+
+
+class StandInState:
+    """Arquivos servidos, perfil atual e contadores (compartilhados entre as conexões)"""
+
+    def __init__(self, files, profile, rotate=False, verbose=True):
+        self.contents = [ServedFile(path) for path in files]
+        self.profile = profile
+        self.rotate = rotate
+        self.verbose = verbose
+        self.sessions = set()
+        self.counts = {'requests': 0, 'downloads': 0, 'resumed': 0, 'errors': 0, 'truncated': 0}
+        self._next = 0
+        self._current = 0
+        self._lock = threading.Lock()
+
+    def count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    def next_content(self):
+        """Arquivo de um download novo (com --rotate, o seguinte da lista)"""
+        with self._lock:
+            self._current = self._next % len(self.contents)
+            if self.rotate:
+                self._next += 1
+            return self.contents[self._current]
+
+    def publish(self):
+        """Passa a servir o próximo arquivo da lista (nova versão do catálogo no servidor)"""
+        with self._lock:
+            self._current = (self._current + 1) % len(self.contents)
+            self._next = self._current
+            return self.contents[self._current]
+
+    def current_content(self):
+        """Arquivo do último download (o que uma continuação com Range espera)"""
+        return self.contents[self._current]
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, como o servidor real
+    server_version = 'StandIn/1.0'
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        if self.state.verbose:
+            sys.stderr.write(f"[{self.state.profile.name}] {format % args}\n")
+
+    def _send(self, status, body, content_type='application/json', headers=()):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in headers:
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, data, headers=()):
+        self._send(status, json.dumps(data).encode(), headers=headers)
+
+    def _apply_profile(self):
+        """Latência e erros do perfil; retorna True se a resposta já foi enviada (erro simulado)"""
+        profile = self.state.profile
+        self.state.count('requests')
+        delay = profile.latency + random.uniform(-profile.jitter, profile.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if profile.error_rate and random.random() < profile.error_rate:
+            self.state.count('errors')
+            self._send(profile.error_status, b'<html><body>Erro simulado</body></html>', 'text/html')
+            return True
+        return False
+
+    def _write_body(self, body, truncate=True):
+        """Envia o corpo respeitando a banda do perfil e, no perfil truncado, fecha a conexão no meio"""
+        profile = self.state.profile
+        limit = int(len(body) * profile.truncate) if profile.truncate and truncate else len(body)
+        for start in range(0, limit, SEND_CHUNK):
+            chunk = body[start:min(start + SEND_CHUNK, limit)]
+            self.wfile.write(chunk)
+            if profile.bandwidth:
+                time.sleep(len(chunk) / profile.bandwidth)
+        if limit < len(body):
+            self.state.count('truncated')
+            self.close_connection = True
+
+    def _session_id(self):
+        for item in self.headers.get('Cookie', '').split(';'):
+            key, _, value = item.strip().partition('=')
+            if key == 'connect.sid':
+                return value
+        return None
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path.startswith('/_profile/'):
+            try:
+                self.state.profile = Profile.parse(path[len('/_profile/'):])
+            except ValueError as e:
+                return self._send_json(400, {'error': str(e)})
+            print(f"Perfil: {self.state.profile}")
+            return self._send_json(200, {'profile': self.state.profile.name})
+        if path == '/_publish':
+            served = self.state.publish()
+            return self._send_json(200, {'etag': served.etag})
+        if self._apply_profile():
+            return
+        if path == '/api/user':
+            if self._session_id() not in self.state.sessions:
+                return self._send_json(401, {'error': 'Não autenticado'})
+            return self._send_json(200, {'username': 'teste', 'name': 'Usuário de Teste', 'isActive': True})
+        if path.endswith('/dados.xlsx'):
+            if self.state.profile.json_error:
+                return self._send_json(200, {'error': 'Erro interno ao gerar a planilha'})
+            return self._send_file()
+        self._send_json(404, {'error': 'Não encontrado'})
+
+    def _send_file(self):
+        """Planilha inteira, ou o restante dela (206) se o Range pedir a mesma versão (If-Range)"""
+        match = RANGE_HEADER.match(self.headers.get('Range', ''))
+        if_range = self.headers.get('If-Range')
+        current = self.state.current_content()
+        if match and if_range in (None, current.etag, current.last_modified):
+            start = int(match.group(1))
+            if start >= len(current.body):
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{len(current.body)}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.state.count('resumed')
+            self.send_response(206)
+            self._file_headers(current)
+            self.send_header('Content-Range', f"bytes {start}-{len(current.body) - 1}/{len(current.body)}")
+            self.send_header('Content-Length', str(len(current.body) - start))
+            self.end_headers()
+            return self._write_body(current.body[start:], truncate=False)
+        served = self.state.next_content()
+        self.state.count('downloads')
+        self.send_response(200)
+        self._file_headers(served)
+        self.send_header('Content-Length', str(len(served.body)))
+        self.end_headers()
+        self._write_body(served.body)
+
+    def _file_headers(self, served):
+        self.send_header('Content-Type', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', served.etag)
+        self.send_header('Last-Modified', served.last_modified)
+        self.send_header('Repr-Digest', served.repr_digest)
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            data = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            data = {}
+        if self._apply_profile():
+            return
+        if path != '/api/login':
+            return self._send_json(404, {'error': 'Não encontrado'})
+        username = data.get('username', '')
+        if username == 'bloqueado':
+            return self._send_json(401, {'error': 'Conta bloqueada pelo administrador'})
+        if not username or not data.get('password'):
+            return self._send_json(401, {'error': 'Credenciais inválidas'})
+        session_id = secrets.token_hex(16)
+        self.state.sessions.add(session_id)
+        self._send_json(200, {'username': username, 'name': username.title(), 'isActive': True},
+                        headers=[('Set-Cookie', f'connect.sid={session_id}; Path=/; HttpOnly')])
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clientes que desistem no meio (timeouts, perfil truncado) são esperados aqui
+        if isinstance(sys.exc_info()[1], (ConnectionError, TimeoutError)):
+            return
+        super().handle_error(request, client_address)
+
+
+def make_server(files, profile='normal', host='127.0.0.1', port=0, rotate=False, verbose=True):
+    """
+    Cria o servidor (sem iniciá-lo). Com port=0 a porta é escolhida pelo sistema
+    (server.server_address[1]); o perfil pode ser trocado em server.state.profile.
+    """
+    server = StandInServer((host, port), StandInHandler)
+    server.state = StandInState(files, Profile.parse(profile) if isinstance(profile, str) else profile,
+                                rotate, verbose)
+    return server
+
+
+def main():
+    default_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'files', 'dados.xlsx')
+    parser = argparse.ArgumentParser(description='Servidor HTTP local com falhas de rede simuladas')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--file', action='append', help='Planilha servida (pode repetir)')
+    parser.add_argument('--profile', default='normal', help=f"Perfil de rede ({', '.join(PROFILES)}) ou valores avulsos")
+    parser.add_argument('--rotate', action='store_true', help='Alternar entre os arquivos a cada download')
+    args = parser.parse_args()
+
+    server = make_server(args.file or [default_file], args.profile, args.host, args.port, args.rotate)
+    print(f"Servidor em http://{args.host}:{server.server_address[1]} - perfil: {server.state.profile}")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Cada linha digitada troca o perfil
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            server.state.profile = Profile.parse(line)
+            print(f"Perfil: {server.state.profile} - contadores: {server.state.counts}")
+        except ValueError as e:
+            print(str(e))
+
+
+if __name__ == '__main__':
+    main()
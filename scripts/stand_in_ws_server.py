@@ -0,0 +1,179 @@
+"""
+Servidor WebSocket local que simula os avisos de catálogo do servidor real.
+
+Uso:
+    python scripts/stand_in_ws_server.py --port 8765 --file files/dados.xlsx
+
+No aplicativo, aponte CATALOG_WS_URL para ws://localhost:8765/ws. A cada alteração
+do arquivo informado (ou a cada --interval segundos, com um hash aleatório quando
+nenhum arquivo é informado) é enviado o evento {"type": "catalog_updated", ...}.
+Digitar uma linha no terminal força o envio imediato de um evento.
+"""
+import os
+import sys
+import json
+import time
+import base64
+import struct
+import socket
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+clients = set()
+clients_lock = threading.Lock()
+
+
+def encode_frame(payload, opcode=0x1):
+    """Monta um frame WebSocket sem máscara (servidor -> cliente)"""
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header += bytes([length])
+    elif length < 65536:
+        header += bytes([126]) + struct.pack('!H', length)
+    else:
+        header += bytes([127]) + struct.pack('!Q', length)
+    return header + payload
+
+
+def read_exact(conn, size):
+    data = b''
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError('conexão encerrada')
+        data += chunk
+    return data
+
+
+def read_frame(conn):
+    """Lê um frame do cliente (sempre mascarado) e retorna (opcode, payload)"""
+    first, second = read_exact(conn, 2)
+    opcode = first & 0x0F
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack('!H', read_exact(conn, 2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', read_exact(conn, 8))[0]
+    mask = read_exact(conn, 4) if second & 0x80 else b'\x00\x00\x00\x00'
+    payload = bytearray(read_exact(conn, length))
+    for i in range(length):
+        payload[i] ^= mask[i % 4]
+    return opcode, bytes(payload)
+
+
+def handshake(conn):
+    request = b''
+    while b'\r\n\r\n' not in request:
+        chunk = conn.recv(4096)
+        if not chunk:
+            raise ConnectionError('handshake incompleto')
+        request += chunk
+    headers = {}
+    for line in request.decode('latin-1').split('\r\n')[1:]:
+        if ':' in line:
+            key, value = line.split(':', 1)
+            headers[key.strip().lower()] = value.strip()
+    accept = base64.b64encode(hashlib.sha1((headers['sec-websocket-key'] + WS_GUID).encode()).digest()).decode()
+    conn.sendall((
+        'HTTP/1.1 101 Switching Protocols\r\n'
+        'Upgrade: websocket\r\n'
+        'Connection: Upgrade\r\n'
+        f'Sec-WebSocket-Accept: {accept}\r\n\r\n'
+    ).encode())
+
+
+def handle_client(conn, addr):
+    try:
+        handshake(conn)
+        with clients_lock:
+            clients.add(conn)
+        print(f"Cliente conectado: {addr}")
+        while True:
+            opcode, payload = read_frame(conn)
+            if opcode == 0x8:  # close
+                conn.sendall(encode_frame(payload, opcode=0x8))
+                break
+            if opcode == 0x9:  # ping
+                conn.sendall(encode_frame(payload, opcode=0xA))
+    except Exception as e:
+        print(f"Cliente {addr} desconectado: {e}")
+    finally:
+        with clients_lock:
+            clients.discard(conn)
+        conn.close()
+
+
+def broadcast(catalog_hash):
+    message = json.dumps({
+        'type': 'catalog_updated',
+        'data': {'hash': catalog_hash, 'version': datetime.now().isoformat()}
+    }).encode()
+    with clients_lock:
+        targets = list(clients)
+    for conn in targets:
+        try:
+            conn.sendall(encode_frame(message))
+        except OSError:
+            pass
+    print(f"Evento catalog_updated enviado para {len(targets)} cliente(s): {catalog_hash[:12]}")
+
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def watch(path, interval):
+    """Envia um evento quando o arquivo muda (ou periodicamente, sem arquivo)"""
+    last = file_hash(path) if path and os.path.exists(path) else None
+    while True:
+        time.sleep(interval)
+        if path:
+            if not os.path.exists(path):
+                continue
+            current = file_hash(path)
+            if current != last:
+                last = current
+                broadcast(current)
+        else:
+            broadcast(hashlib.sha256(os.urandom(16)).hexdigest())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor WebSocket local de avisos de catálogo')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--file', help='Arquivo observado (hash enviado nas notificações)')
+    parser.add_argument('--interval', type=float, default=5.0, help='Intervalo de verificação em segundos')
+    args = parser.parse_args()
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((args.host, args.port))
+    server.listen()
+    print(f"Servidor WebSocket em ws://{args.host}:{args.port}/ws")
+
+    threading.Thread(target=watch, args=(args.file, args.interval), daemon=True).start()
+
+    def accept_loop():
+        while True:
+            conn, addr = server.accept()
+            threading.Thread(target=handle_client, args=(conn, addr), daemon=True).start()
+
+    threading.Thread(target=accept_loop, daemon=True).start()
+
+    # Cada linha digitada força um evento (com o hash do arquivo, se houver)
+    for _ in sys.stdin:
+        if args.file and os.path.exists(args.file):
+            broadcast(file_hash(args.file))
+        else:
+            broadcast(hashlib.sha256(os.urandom(16)).hexdigest())
+
+
+if __name__ == '__main__':
+    main()
@@ -51,7 +51,7 @@ import clinicalNotesRoutes from "./routes/clinical-notes-routes";
 import clientAppointmentsRoutes from "./routes/client-appointments";
 import appointmentLookupRoutes from "./routes/appointment-lookup";
 import { sessionCheckRoute } from "./routes/session-check";
-import excelDataRoutes from "./routes/excel-data";
+import excelDataRoutes, { watchCatalogFile } from "./routes/excel-data";
 
 export async function registerRoutes(app: Express): Promise<Server> {
   // Configurar autenticação
@@ -1075,6 +1075,11 @@ export async function registerRoutes(app: Express): Promise<Server> {
   // Tornar a função broadcastUpdate disponível para outras partes do código
   (global as any).broadcastUpdate = broadcastUpdate;
   
+  // Avisar os clientes (incluindo o visualizador de produtos) quando o catálogo mudar
+  watchCatalogFile((hash) => {
+    broadcastUpdate('catalog_updated', { hash, version: new Date().toISOString() });
+  });
+  
   // Endpoint para verificação de email via POST (usado pelo frontend)
   app.post("/api/verify-email", async (req: Request, res: Response) => {
     try {
@@ -1,6 +1,7 @@
 import { Router } from 'express';
 import path from 'path';
 import fs from 'fs';
+import crypto from 'crypto';
 import { fileURLToPath } from 'url';
 import { dirname } from 'path';
 
@@ -41,4 +42,32 @@ router.get('/dados/dados.xlsx', (req, res) => {
   res.redirect('/api/dados.xlsx');
 });
 
+// Observa o arquivo do catálogo e chama onChange com o hash SHA-256 do novo conteúdo.
+// O cliente Python compara esse hash com o dos dados carregados e só recarrega se for diferente.
+export function watchCatalogFile(onChange: (hash: string) => void) {
+  const excelFilePath = path.resolve(__dirname, '../../files/dados.xlsx');
+  let lastHash: string | null = null;
+
+  const publishIfChanged = () => {
+    fs.readFile(excelFilePath, (err, content) => {
+      if (err) {
+        return;
+      }
+      const hash = crypto.createHash('sha256').update(content).digest('hex');
+      const isFirstRead = lastHash === null;
+      if (hash === lastHash) {
+        return;
+      }
+      lastHash = hash;
+      if (!isFirstRead) {
+        console.log(`Catálogo atualizado (hash ${hash.slice(0, 12)}), notificando clientes`);
+        onChange(hash);
+      }
+    });
+  };
+
+  publishIfChanged();
+  fs.watchFile(excelFilePath, { interval: 5000 }, publishIfChanged);
+}
+
 export default router;
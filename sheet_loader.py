@@ -0,0 +1,352 @@
+import os
+import io
+import json
+import pickle
+import hashlib
+import zipfile
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from tracing import span
+from cache_manager import get_cache
+from excel_engine import ExcelFormatError, read_excel, select_engines, sniff_format
+
+# Configurações globais
+DEBUG = os.environ.get('MEUAGENDAMENTO_DEBUG') == '1'  # Ativar com MEUAGENDAMENTO_DEBUG=1 (nunca em produção)
+
+# Coluna adicionada quando o catálogo vem de mais de uma aba ou arquivo (ex.: um por fornecedor)
+SOURCE_COLUMN = 'ORIGEM'
+
+# Abas já lidas ficam no cache do aplicativo, uma entrada por coluna, e só são lidas de novo
+# quando mudam; assim cada carregamento busca no disco apenas as colunas pedidas
+SHEET_CACHE_DIR = 'sheets'
+
+# Número máximo de processos usados para ler abas em paralelo
+MAX_WORKERS = max(1, min(4, (os.cpu_count() or 1)))
+
+_NS_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_NS_PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+def debug_print(message):
+    """Função para imprimir mensagens de debug apenas quando DEBUG está ativado"""
+    if DEBUG:
+        print(f"[DEBUG] {message}")
+
+
+class CatalogSource:
+    """Um arquivo do catálogo: caminho em disco ou conteúdo baixado, com um nome para a coluna de origem"""
+
+    def __init__(self, data, label=None):
+        self.data = data  # Caminho do arquivo ou conteúdo em bytes
+        if label is None:
+            label = os.path.splitext(os.path.basename(data))[0] if isinstance(data, str) else 'catalogo'
+        self.label = label
+
+    @property
+    def is_bytes(self):
+        return isinstance(self.data, (bytes, bytearray, memoryview))
+
+    def read(self):
+        if self.is_bytes:
+            return bytes(self.data)
+        with open(self.data, 'rb') as f:
+            return f.read()
+
+
+def sheet_versions(content):
+    """
+    Identifica a versão de cada aba sem ler os dados: em um .xlsx cada aba é um arquivo
+    dentro do zip, com CRC próprio. As strings ficam em um arquivo compartilhado por todas
+    as abas, então alterar textos invalida todas; alterar apenas preços invalida só a aba alterada.
+
+    Returns:
+        dict: {nome da aba: versão} ou None se não for possível (ex.: .xls)
+    """
+    try:
+        with zipfile.ZipFile(io.BytesIO(content)) as z:
+            workbook = ET.fromstring(z.read('xl/workbook.xml'))
+            rels = ET.fromstring(z.read('xl/_rels/workbook.xml.rels'))
+            targets = {rel.get('Id'): rel.get('Target') for rel in rels.iter(f'{_NS_PKG_REL}Relationship')}
+            names = set(z.namelist())
+            shared = z.getinfo('xl/sharedStrings.xml').CRC if 'xl/sharedStrings.xml' in names else 0
+            versions = {}
+            for sheet in workbook.iter(f'{_NS_MAIN}sheet'):
+                target = targets.get(sheet.get(f'{_NS_REL}id'), '')
+                part = target.lstrip('/') if target.startswith('/') else f'xl/{target}'
+                info = z.getinfo(part)
+                versions[sheet.get('name')] = f"{info.CRC:08x}-{info.file_size}-{shared:08x}"
+            return versions
+    except Exception as e:
+        debug_print(f"Não foi possível identificar as abas pelo zip: {str(e)}")
+        return None
+
+
+def list_sheets(content):
+    """Nomes das abas do arquivo, na ordem da planilha"""
+    versions = sheet_versions(content)
+    if versions is not None:
+        return list(versions)
+    engines = select_engines(sniff_format(content))
+    if not engines:
+        raise ExcelFormatError("O conteúdo não é um arquivo Excel (.xlsx ou .xls)")
+    with pd.ExcelFile(io.BytesIO(content), engine=engines[0]) as workbook:
+        return list(workbook.sheet_names)
+
+
+def normalize_column(name):
+    """Nome da coluna para comparação (ignora espaços nas pontas e maiúsculas/minúsculas)"""
+    return str(name).strip().upper()
+
+
+def _parse_sheet(content, sheet_name):
+    """Lê uma aba (executada nos processos auxiliares, por isso em nível de módulo)"""
+    return read_excel(content, sheet_name=sheet_name)
+
+
+class SheetLoader:
+    """
+    Lê catálogos divididos em várias abas e/ou arquivos.
+
+    - As abas são lidas em paralelo em processos separados (a leitura de XLSX usa CPU
+      e é limitada pelo GIL em threads)
+    - Cada aba lida fica em cache (memória e disco) coluna a coluna; só as abas alteradas
+      são lidas de novo, e apenas as colunas pedidas são carregadas do cache
+    - O resultado é um único DataFrame; com mais de uma aba ou arquivo, a coluna ORIGEM
+      indica de onde veio cada linha
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, cache=None):
+        self.max_workers = max_workers
+        self._cache = cache
+        self._memory = {}  # Abas da última leitura: chave do cache -> {coluna: Series} (colunas já carregadas)
+        self._columns = {}  # Abas da última leitura: chave do cache -> colunas da aba, na ordem da planilha
+        self._pool = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.RLock()  # A interface e o agendador podem carregar ao mesmo tempo
+        self.last_stats = {}
+        self._last_parts = []
+
+    @property
+    def cache(self):
+        return self._cache if self._cache is not None else get_cache()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+
+    def shutdown(self):
+        """Encerra os processos auxiliares (usado no encerramento do aplicativo)"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _cache_key(self, content, sheet_name, version):
+        # Sem versão por aba (ex.: .xls), a aba é identificada pelo conteúdo completo do arquivo
+        if version is None:
+            version = hashlib.sha256(content).hexdigest()
+        return hashlib.sha256(f"{sheet_name}|{version}".encode('utf-8')).hexdigest()
+
+    def _cached_columns(self, key):
+        """Colunas (na ordem da planilha) de uma aba já lida, ou None se ela não está no cache"""
+        if key in self._columns:
+            return self._columns[key]
+        try:
+            data = self.cache.read_bytes(f"{SHEET_CACHE_DIR}/{key}/columns.json")
+            if data is None:
+                return None
+            self._columns[key] = json.loads(data)
+            return self._columns[key]
+        except Exception as e:
+            debug_print(f"Índice de colunas ilegível, lendo a aba novamente: {str(e)}")
+            return None
+
+    def _cached_column(self, key, columns, name):
+        """Uma coluna da aba, da memória ou do disco (None se a entrada sumiu do cache)"""
+        stored = self._memory.setdefault(key, {})
+        if name in stored:
+            return stored[name]
+        entry = f"{SHEET_CACHE_DIR}/{key}/{columns.index(name)}.pkl"
+        try:
+            data = self.cache.read_bytes(entry)
+            if data is None:
+                return None
+            stored[name] = pickle.loads(data)
+            return stored[name]
+        except Exception as e:
+            debug_print(f"Coluna em cache ilegível, lendo a aba novamente: {str(e)}")
+            self.cache.remove(entry)
+            return None
+
+    def _store(self, key, df):
+        df = df.rename(columns=str)
+        self._columns[key] = list(df.columns)
+        self._memory[key] = {name: df[name] for name in df.columns}
+        try:
+            for i, name in enumerate(df.columns):
+                data = pickle.dumps(df[name], protocol=pickle.HIGHEST_PROTOCOL)
+                self.cache.write_bytes(f"{SHEET_CACHE_DIR}/{key}/{i}.pkl", data)
+            # O índice de colunas é gravado por último: sem ele a aba não é considerada em cache
+            columns = json.dumps(list(df.columns), ensure_ascii=False).encode('utf-8')
+            self.cache.write_bytes(f"{SHEET_CACHE_DIR}/{key}/columns.json", columns)
+        except Exception as e:
+            debug_print(f"Erro ao salvar aba no cache: {str(e)}")
+
+    def _sheet_frame(self, key, columns, wanted, excluded):
+        """Monta o DataFrame da aba apenas com as colunas pedidas (None se falta alguma no cache)"""
+        selected = [name for name in columns
+                    if (wanted is None or normalize_column(name) in wanted) and normalize_column(name) not in excluded]
+        data = {}
+        for name in selected:
+            series = self._cached_column(key, columns, name)
+            if series is None:
+                return None
+            data[name] = series
+        if not data:
+            return pd.DataFrame(index=pd.RangeIndex(self._row_count(key, columns)))
+        return pd.DataFrame(data)
+
+    def _row_count(self, key, columns):
+        # Quantidade de linhas de uma aba sem colunas pedidas (usa a primeira coluna)
+        if not columns:
+            return 0
+        first = self._cached_column(key, columns, columns[0])
+        return 0 if first is None else len(first)
+
+    def available_columns(self, sources):
+        """
+        Todas as colunas dos arquivos (na ordem da primeira ocorrência), inclusive as que
+        não foram carregadas por projeção. Lê apenas os índices de colunas do cache.
+        """
+        with self._load_lock:
+            result = self.load(sources, columns=())
+            names = []
+            for _, _, key in self._last_parts:
+                for name in self._columns.get(key, []):
+                    if name not in names:
+                        names.append(name)
+        if SOURCE_COLUMN in result.columns:
+            names.append(SOURCE_COLUMN)
+        return names
+
+    def _parse_all(self, tasks):
+        """Lê as abas pendentes: em paralelo quando há mais de uma, na própria thread quando há só uma"""
+        if len(tasks) > 1 and self.max_workers > 1:
+            try:
+                pool = self._get_pool()
+                futures = [pool.submit(_parse_sheet, content, sheet_name) for content, sheet_name in tasks]
+                return [future.result() for future in futures]
+            except ExcelFormatError:
+                raise
+            except Exception as e:
+                # Processos indisponíveis (ex.: ambiente restrito): ler sequencialmente
+                debug_print(f"Leitura paralela indisponível, lendo em sequência: {str(e)}")
+                self.shutdown()
+        return [_parse_sheet(content, sheet_name) for content, sheet_name in tasks]
+
+    def load(self, sources, columns=None, exclude=()):
+        """
+        Lê todas as abas de todos os arquivos e junta em um único DataFrame.
+
+        Args:
+            sources: Lista de CatalogSource (ou caminhos/bytes)
+            columns: Colunas desejadas (ignorando espaços e maiúsculas); None carrega todas.
+                     As demais continuam no cache e podem ser carregadas depois sem reler a planilha.
+            exclude: Colunas que não devem ser carregadas (ex.: colunas ocultas na tabela)
+
+        Returns:
+            DataFrame: Linhas de todas as abas, na ordem dos arquivos e das abas
+
+        Raises:
+            ExcelFormatError: Algum arquivo não é um Excel válido
+        """
+        sources = [s if isinstance(s, CatalogSource) else CatalogSource(s) for s in sources]
+        wanted = None if columns is None else {normalize_column(c) for c in columns}
+        excluded = {normalize_column(c) for c in exclude or ()}
+        with self._load_lock, span('load_sheets', files=len(sources),
+                                   columns=len(columns) if columns is not None else 'all') as sp:
+            parts = []  # (origem, aba, chave do cache)
+            pending = {}  # chave do cache -> (conteúdo, aba)
+            frames = {}
+            previous, previous_columns = self._memory, self._columns
+            self._memory, self._columns = {}, {}
+            for source in sources:
+                content = source.read()
+                if sniff_format(content) is None:
+                    raise ExcelFormatError(f"{source.label}: o conteúdo não é um arquivo Excel (.xlsx ou .xls)")
+                versions = sheet_versions(content) or {}
+                for sheet_name in list_sheets(content):
+                    key = self._cache_key(content, sheet_name, versions.get(sheet_name))
+                    parts.append((source.label, sheet_name, key))
+                    if key in frames or key in pending:
+                        continue
+                    # Reaproveitar as colunas já em memória da leitura anterior
+                    if key in previous:
+                        self._memory[key] = previous[key]
+                        self._columns[key] = previous_columns[key]
+                    cached_columns = self._cached_columns(key)
+                    frame = self._sheet_frame(key, cached_columns, wanted, excluded) if cached_columns is not None else None
+                    if frame is not None:
+                        frames[key] = frame
+                    else:
+                        pending[key] = (content, sheet_name)
+
+            if pending:
+                # A leitura é sempre completa (os leitores percorrem todas as células de qualquer forma);
+                # todas as colunas vão para o cache e apenas as pedidas entram no resultado
+                parsed = self._parse_all(list(pending.values()))
+                for key, df in zip(pending, parsed):
+                    self._store(key, df)
+                    frames[key] = self._sheet_frame(key, self._columns[key], wanted, excluded)
+            self._last_parts = parts
+            self.last_stats = {'sheets': len(parts), 'parsed': len(pending), 'cached': len(parts) - len(pending)}
+            sp.set(**self.last_stats)
+            debug_print(f"Abas do catálogo: {self.last_stats}")
+
+            # Origem de cada linha: a aba (um arquivo), o arquivo (uma aba por arquivo) ou ambos
+            sheets_per_file = {}
+            for label, _, _ in parts:
+                sheets_per_file[label] = sheets_per_file.get(label, 0) + 1
+            pieces = []
+            for label, sheet_name, key in parts:
+                df = frames[key]
+                if df.empty and len(df.columns) == 0 and len(df.index) == 0:
+                    continue
+                if len(parts) > 1 and normalize_column(SOURCE_COLUMN) not in excluded:
+                    if len(sources) == 1:
+                        origin = sheet_name
+                    elif sheets_per_file[label] == 1:
+                        origin = label
+                    else:
+                        origin = f"{label}/{sheet_name}"
+                    df = df.assign(**{SOURCE_COLUMN: origin})
+                pieces.append(df)
+            if not pieces:
+                return pd.DataFrame()
+            if len(pieces) == 1:
+                return pieces[0].copy()
+            return pd.concat(pieces, ignore_index=True)
+
+
+_loader = None
+_loader_lock = threading.Lock()
+
+
+def get_loader():
+    """Retorna o leitor de abas compartilhado pelos módulos do aplicativo"""
+    global _loader
+    with _loader_lock:
+        if _loader is None:
+            _loader = SheetLoader()
+        return _loader
+
+
+def load_catalog(sources, columns=None, exclude=()):
+    """Atalho para get_loader().load()"""
+    return get_loader().load(sources, columns, exclude)
@@ -0,0 +1,157 @@
+import os
+import sys
+import time
+import threading
+import traceback
+from collections import deque
+from datetime import datetime
+
+from tracing import JsonlFileSink, tracer
+
+# Configurações globais
+DEBUG = os.environ.get('MEUAGENDAMENTO_DEBUG') == '1'  # Ativar com MEUAGENDAMENTO_DEBUG=1 (nunca em produção)
+
+# Intervalo (ms) do batimento agendado com root.after na thread da interface
+HEARTBEAT_INTERVAL = 200
+# A interface é considerada travada se o batimento atrasar mais que isso (segundos)
+STALL_THRESHOLD = 0.5
+# Quadros da pilha registrados por travamento
+STACK_LIMIT = 40
+
+def debug_print(message):
+    """Função para imprimir mensagens de debug apenas quando DEBUG está ativado"""
+    if DEBUG:
+        print(f"[DEBUG] {message}")
+
+
+def _is_library_frame(filename):
+    """Quadros do tkinter e da biblioteca padrão (não identificam o callback do aplicativo)"""
+    path = filename.replace('\\', '/')
+    return '/tkinter/' in path or path.startswith('<') or os.path.basename(path) in ('threading.py', 'tracing.py')
+
+
+def describe_callback(stack):
+    """
+    Nome do callback do aplicativo que está ocupando a thread da interface: o primeiro
+    quadro do aplicativo chamado pelo laço do Tk (ex.: 'CSVFilterApp.update_table').
+    """
+    # Quadros abaixo do mainloop; sem ele (ex.: travamento antes do laço), a pilha inteira
+    start = next((i for i, (frame, _) in enumerate(stack) if '/tkinter/' in frame.f_code.co_filename.replace('\\', '/')), -1)
+    for frame, _lineno in stack[start + 1:]:
+        code = frame.f_code
+        if _is_library_frame(code.co_filename) or code.co_name == '<module>':
+            continue
+        owner = frame.f_locals.get('self')
+        return f"{type(owner).__name__}.{code.co_name}" if owner is not None else code.co_name
+    return None
+
+
+def describe_spans(spans):
+    """Operações em andamento com seus atributos (ex.: 'update_table(rows=100000) > render(rows=500)')"""
+    parts = []
+    for s in spans:
+        attrs = ', '.join(f"{k}={v}" for k, v in s.attrs.items())
+        parts.append(f"{s.name}({attrs})" if attrs else s.name)
+    return ' > '.join(parts) or None
+
+
+class StallWatchdog:
+    """
+    Detecta travamentos do laço de eventos do Tk.
+
+    Um batimento agendado com root.after marca o horário a cada HEARTBEAT_INTERVAL;
+    uma thread confere esse horário e, se ele atrasar mais que STALL_THRESHOLD, copia
+    a pilha da thread da interface (sys._current_frames) e os spans ativos nela
+    (operação e tamanho dos dados). Quando o batimento volta, o travamento é registrado
+    com a duração total no log rotativo e na lista exibida pelo aplicativo.
+
+    Sem travamentos, o custo é um callback e uma verificação de horário por batimento.
+    """
+
+    def __init__(self, root, log_path=None, threshold=STALL_THRESHOLD, interval=HEARTBEAT_INTERVAL,
+                 capacity=100):
+        """
+        Args:
+            root: Janela principal do Tk
+            log_path: Arquivo JSONL dos travamentos (com rotação por tamanho); None = apenas memória
+            threshold: Atraso do batimento (segundos) considerado travamento
+            interval: Intervalo do batimento (milissegundos)
+            capacity: Travamentos mantidos em memória para o visualizador
+        """
+        self.root = root
+        self.threshold = threshold
+        self.interval = interval
+        self.stalls = deque(maxlen=capacity)
+        self._sink = JsonlFileSink(log_path) if log_path else None
+        self._main_thread = threading.main_thread().ident
+        self._last_beat = time.monotonic()
+        self._current = None  # Travamento em andamento (capturado, ainda sem duração final)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._after_id = None
+        self._thread = None
+
+    def start(self):
+        """Inicia o batimento (na thread da interface) e a thread de verificação"""
+        self._stop.clear()
+        self._last_beat = time.monotonic()
+        self._beat()
+        self._thread = threading.Thread(target=self._run, name='stall-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def _beat(self):
+        now = time.monotonic()
+        with self._lock:
+            self._last_beat = now
+            stall, self._current = self._current, None
+        if stall is not None:
+            self._finish(stall, now)
+        if not self._stop.is_set():
+            self._after_id = self.root.after(self.interval, self._beat)
+
+    def _run(self):
+        # Verificação a cada meio limite: o travamento é capturado enquanto ainda acontece
+        while not self._stop.wait(self.threshold / 2):
+            with self._lock:
+                late = time.monotonic() - self._last_beat - self.interval / 1000
+                if late < self.threshold or self._current is not None:
+                    continue
+                self._current = self._capture()
+
+    def _capture(self):
+        """Pilha e spans ativos da thread da interface no momento do travamento"""
+        frame = sys._current_frames().get(self._main_thread)
+        stack = list(traceback.walk_stack(frame))[::-1] if frame is not None else []  # Do mais externo ao mais interno
+        spans = tracer.active_spans(self._main_thread)
+        return {
+            'started': self._last_beat + self.interval / 1000,
+            'callback': describe_callback(stack),
+            'operation': describe_spans(spans),
+            'stack': traceback.format_list(traceback.StackSummary.extract(stack[-STACK_LIMIT:], capture_locals=False)),
+        }
+
+    def _finish(self, stall, now):
+        record = {
+            'ts': datetime.now().isoformat(timespec='seconds'),
+            'duration_ms': round((now - stall['started']) * 1000),
+            'callback': stall['callback'],
+            'operation': stall['operation'],
+            'stack': ''.join(stall['stack']),
+        }
+        debug_print(f"Interface travada por {record['duration_ms']} ms em {record['callback']} ({record['operation']})")
+        self.stalls.append(record)
+        if self._sink is not None:
+            self._sink.write(record)
+
+    def records(self):
+        """Travamentos registrados, do mais antigo ao mais recente"""
+        return list(self.stalls)
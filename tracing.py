@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import threading
+import itertools
+from collections import deque
+
+# Configurações globais
+DEBUG = os.environ.get('MEUAGENDAMENTO_DEBUG') == '1'  # Ativar com MEUAGENDAMENTO_DEBUG=1 (nunca em produção)
+
+def debug_print(message):
+    """Função para imprimir mensagens de debug apenas quando DEBUG está ativado"""
+    if DEBUG:
+        print(f"[DEBUG] {message}")
+
+
+class _NullSpan:
+    """Span vazio usado quando o rastreamento está desativado (custo praticamente zero)"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """Trecho de execução medido com relógio monotônico e ligado ao span pai"""
+    __slots__ = ('tracer', 'name', 'span_id', 'parent_id', 'depth', 'attrs', 'start', 'duration', 'error')
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.span_id = next(tracer._ids)
+        self.parent_id = None
+        self.depth = 0
+        self.attrs = attrs
+        self.start = None
+        self.duration = None
+        self.error = None
+
+    def set(self, **attrs):
+        """Adiciona atributos ao span (ex.: número de registros, bytes baixados)"""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        if stack:
+            self.parent_id = stack[-1].span_id
+            self.depth = len(stack)
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        stack = self.tracer._stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        self.tracer._emit(self)
+        return False
+
+    def to_record(self):
+        """Converte o span em um dicionário serializável"""
+        return {
+            'ts': time.time(),
+            'name': self.name,
+            'id': self.span_id,
+            'parent': self.parent_id,
+            'depth': self.depth,
+            'duration_ms': round(self.duration * 1000, 3),
+            'thread': threading.current_thread().name,
+            'attrs': self.attrs,
+            'error': self.error,
+        }
+
+
+class RingBufferSink:
+    """Mantém os últimos registros em memória para visualização na interface"""
+
+    def __init__(self, capacity=500):
+        self._records = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        with self._lock:
+            self._records.append(record)
+
+    def records(self):
+        """Retorna uma cópia dos registros armazenados, do mais antigo ao mais recente"""
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+
+class JsonlFileSink:
+    """Grava os registros em um arquivo JSONL com rotação por tamanho"""
+
+    def __init__(self, path, max_bytes=1024 * 1024, backup_count=3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        except Exception as e:
+            debug_print(f"Erro ao criar diretório de rastreamento: {str(e)}")
+
+    def _rotate(self):
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            dst = f"{self.path}.{i + 1}"
+            if os.path.exists(src):
+                os.replace(src, dst)
+        os.replace(self.path, f"{self.path}.1")
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+        with self._lock:
+            try:
+                if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+                    self._rotate()
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+            except Exception as e:
+                debug_print(f"Erro ao gravar registro de rastreamento: {str(e)}")
+
+
+class Tracer:
+    """Ponto central de rastreamento: cria spans e os envia para os destinos (sinks)"""
+
+    def __init__(self, enabled=False, sinks=None):
+        self.enabled = enabled
+        self.sinks = list(sinks or [])
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._stacks = {}  # Pilha de spans de cada thread (para consulta a partir de outra thread)
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+            self._stacks[threading.get_ident()] = stack
+        return stack
+
+    def span(self, name, **attrs):
+        """Cria um span para uso com 'with'. Desativado, retorna um span vazio."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, attrs)
+
+    def current_span(self):
+        """Retorna o span ativo na thread atual (ou None)"""
+        if not self.enabled:
+            return None
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    def active_spans(self, thread_id):
+        """Spans em andamento em outra thread, do mais externo ao mais interno (ex.: para o watchdog)"""
+        return list(self._stacks.get(thread_id, ()))
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def remove_sink(self, sink):
+        if sink in self.sinks:
+            self.sinks.remove(sink)
+
+    def _emit(self, span):
+        record = span.to_record()
+        for sink in self.sinks:
+            try:
+                sink.write(record)
+            except Exception as e:
+                debug_print(f"Erro no destino de rastreamento: {str(e)}")
+
+
+# Instância global compartilhada pelos módulos do aplicativo
+tracer = Tracer()
+
+
+def span(name, **attrs):
+    """Atalho para tracer.span()"""
+    return tracer.span(name, **attrs)
+
+
+def configure(enabled=True, jsonl_path=None, ring_capacity=500):
+    """
+    Ativa ou desativa o rastreamento global.
+
+    Args:
+        enabled: Se False, os spans não têm custo além de uma chamada de função
+        jsonl_path: Caminho do arquivo JSONL (opcional)
+        ring_capacity: Quantidade de registros mantidos em memória
+
+    Returns:
+        RingBufferSink: Buffer em memória para exibição na interface (ou None)
+    """
+    tracer.enabled = enabled
+    tracer.sinks = []
+    if not enabled:
+        return None
+    ring = RingBufferSink(ring_capacity)
+    tracer.add_sink(ring)
+    if jsonl_path:
+        tracer.add_sink(JsonlFileSink(jsonl_path))
+    return ring